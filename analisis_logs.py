@@ -0,0 +1,239 @@
+"""
+Resumen de los logs del cliente (logs/) sin cargar los archivos en memoria.
+
+Cada archivo se lee linea por linea con generadores. Se entiende el formato de
+log.setup_logging ('fecha [NIVEL] logger: mensaje') y el formato anterior
+('fecha - logger - [NIVEL] mensaje'); las lineas sin fecha son continuacion del registro
+anterior. Por cada partido (desde 'El token del equipo es: ...') se cuentan frames por
+segundo, acciones enviadas por tipo, errores del servidor, mensajes no interpretados y
+"Otro mensaje recibido".
+
+Los archivos se procesan en paralelo y el resultado de cada uno se guarda en
+cache/analisis_logs.json con su tamaño y fecha de modificacion: al repetir el analisis
+solo se leen los archivos nuevos o modificados. Los archivos *_error_* se omiten porque
+repiten los registros de ERROR del archivo principal.
+
+Con varios equipos en un mismo proceso (runner.py) las lineas sin token se asignan al
+ultimo partido que aparecio en el archivo, por lo que los frames de cada equipo son aproximados.
+
+Uso:
+    python analisis_logs.py [logs/] [--procesos N] [--salida resumen.json] [--sin-cache]
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+ARCHIVO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'analisis_logs.json')
+VERSION_CACHE = 1
+
+# Formato actual: '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+_LINEA = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)(?:,\d+)? \[(\w+)\] ([\w.]+): (.*)$')
+# Formato anterior: '%(asctime)s - %(name)s - [%(levelname)s] %(message)s'
+_LINEA_ANTERIOR = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)(?:,\d+)? - ([\w.]+) - \[(\w+)\] (.*)$')
+# La accion se loguea como repr de pydantic (mensaje_id='X') o como JSON ("mensaje_id": "X")
+_MENSAJE_ID = re.compile(r'''mensaje_id(?:='|": ")(\w+)''')
+_TOKEN = re.compile(r'TOKEN-[\w-]+')
+
+ACCIONES = ('CORRER', 'PATEAR', 'PASAR_PELOTA', 'MARCAR_ADVERSARIO')
+COLUMNAS = ('archivo', 'token', 'inicio', 'fin', 'duracion_s', 'frames', 'fps', 'reaccionar', 'tienes_la_pelota',
+            *(accion.lower() for accion in ACCIONES), 'errores_servidor', 'no_interpretados', 'otros_mensajes',
+            'tasa_errores', 'tasa_otros')
+
+class RegistroLog(NamedTuple):
+    fecha: str
+    nivel: str
+    logger: str
+    mensaje: str
+
+def leer_registros(ruta: str) -> Iterator[RegistroLog]:
+    """Recorre los registros de un archivo de log, uniendo las lineas de continuacion."""
+    actual: Optional[List[str]] = None
+    with open(ruta, encoding='utf-8', errors='replace') as archivo:
+        for linea in archivo:
+            linea = linea.rstrip('\n')
+            encontrada = _LINEA.match(linea)
+            if encontrada:
+                fecha, nivel, logger, mensaje = encontrada.groups()
+            else:
+                encontrada = _LINEA_ANTERIOR.match(linea)
+                if encontrada:
+                    fecha, logger, nivel, mensaje = encontrada.groups()
+            if encontrada:
+                if actual is not None:
+                    yield RegistroLog(*actual[:3], '\n'.join(actual[3:]))
+                actual = [fecha, nivel, logger, mensaje]
+            elif actual is not None:
+                actual.append(linea)
+    if actual is not None:
+        yield RegistroLog(*actual[:3], '\n'.join(actual[3:]))
+
+def _nuevo_partido(archivo: str, token: Optional[str], fecha: str) -> dict:
+    return {'archivo': archivo, 'token': token, 'inicio': fecha, 'fin': fecha, 'reaccionar': 0, 'tienes_la_pelota': 0,
+            **{accion.lower(): 0 for accion in ACCIONES},
+            'errores_servidor': 0, 'no_interpretados': 0, 'otros_mensajes': 0}
+
+def analizar_archivo(ruta: str) -> List[dict]:
+    """
+    Resume un archivo de log.
+
+    returns:
+        List[dict]: Una fila por partido (ver COLUMNAS). Las lineas anteriores al primer token van a un partido sin token.
+    """
+    partidos: Dict[Optional[str], dict] = {}
+    actual: Optional[dict] = None
+    archivo = os.path.basename(ruta)
+
+    for registro in leer_registros(ruta):
+        mensaje = registro.mensaje
+        if mensaje.startswith('El token del equipo es: '):
+            token = mensaje.rsplit(' ', 1)[-1]
+            actual = partidos.setdefault(token, _nuevo_partido(archivo, token, registro.fecha))
+            continue
+
+        partido = actual
+        if mensaje.startswith('Accion enviada') or mensaje.startswith('Mensaje de error del servidor'):
+            # Estas lineas traen el token: se asignan a su partido aunque haya varios equipos en el archivo
+            token = _TOKEN.search(mensaje)
+            if token and token.group(0) in partidos:
+                partido = partidos[token.group(0)]
+        if partido is None:
+            partido = actual = partidos.setdefault(None, _nuevo_partido(archivo, None, registro.fecha))
+        partido['fin'] = registro.fecha
+
+        if mensaje == 'Reaccionar':
+            partido['reaccionar'] += 1
+        elif mensaje.startswith('Tienes la pelota'):
+            partido['tienes_la_pelota'] += 1
+        elif mensaje.startswith('Accion enviada'):
+            accion = _MENSAJE_ID.search(mensaje)
+            if accion and accion.group(1) in ACCIONES:
+                partido[accion.group(1).lower()] += 1
+        elif mensaje.startswith('Mensaje de error del servidor'):
+            partido['errores_servidor'] += 1
+        elif mensaje.startswith('Otro mensaje recibido'):
+            partido['otros_mensajes'] += 1
+        elif 'no interpretado' in mensaje:
+            partido['no_interpretados'] += 1
+
+    filas = []
+    for partido in partidos.values():
+        duracion = (datetime.datetime.fromisoformat(partido['fin']) - datetime.datetime.fromisoformat(partido['inicio'])).total_seconds()
+        frames = partido['reaccionar'] + partido['tienes_la_pelota']
+        partido.update(duracion_s=duracion,
+                       frames=frames,
+                       fps=frames / duracion if duracion else 0.0,
+                       tasa_errores=partido['errores_servidor'] / frames if frames else 0.0,
+                       tasa_otros=partido['otros_mensajes'] / frames if frames else 0.0)
+        if frames or partido['token']:
+            filas.append({columna: partido[columna] for columna in COLUMNAS})
+    return filas
+
+def cargar_cache(archivo: str = ARCHIVO_CACHE) -> Dict[str, dict]:
+    try:
+        with open(archivo, encoding='utf-8') as entrada:
+            cache = json.load(entrada)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('archivos', {}) if cache.get('version') == VERSION_CACHE else {}
+
+def guardar_cache(archivos: Dict[str, dict], archivo: str = ARCHIVO_CACHE):
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    temporal = f'{archivo}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as salida:
+        json.dump({'version': VERSION_CACHE, 'archivos': archivos}, salida)
+    os.replace(temporal, archivo)
+
+def buscar_logs(rutas: List[str]) -> List[str]:
+    archivos = []
+    for ruta in rutas:
+        candidatos = glob.glob(os.path.join(ruta, '*.log')) if os.path.isdir(ruta) else glob.glob(ruta)
+        archivos.extend(c for c in candidatos if '_error_' not in os.path.basename(c))
+    return sorted(set(archivos))
+
+def analizar(archivos: List[str], procesos: int = 0, usar_cache: bool = True) -> Dict[str, List[dict]]:
+    """
+    Resume todos los archivos, en paralelo y reutilizando el cache de los que no cambiaron.
+
+    returns:
+        Dict[str, List[dict]]: Filas de cada archivo, por ruta absoluta.
+    """
+    cache = cargar_cache() if usar_cache else {}
+    resultados: Dict[str, List[dict]] = {}
+    pendientes = []
+    claves = {}
+    for archivo in archivos:
+        ruta = os.path.abspath(archivo)
+        estado = os.stat(ruta)
+        claves[ruta] = {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+        guardado = cache.get(ruta)
+        if guardado and guardado['tamano'] == estado.st_size and guardado['mtime_ns'] == estado.st_mtime_ns:
+            resultados[ruta] = guardado['filas']
+        else:
+            pendientes.append(ruta)
+
+    if pendientes:
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        if procesos == 1:
+            nuevos = [analizar_archivo(ruta) for ruta in pendientes]
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                nuevos = list(ejecutor.map(analizar_archivo, pendientes, chunksize=max(1, len(pendientes) // (procesos * 4))))
+        for ruta, filas in zip(pendientes, nuevos):
+            resultados[ruta] = filas
+            cache[ruta] = {**claves[ruta], 'filas': filas}
+        if usar_cache:
+            guardar_cache(cache)
+    return {ruta: resultados[ruta] for ruta in claves}
+
+def columnas(resultados: Dict[str, List[dict]]) -> Dict[str, list]:
+    """Pasa las filas de todos los archivos a formato columnar: una lista por columna."""
+    tabla: Dict[str, list] = {columna: [] for columna in COLUMNAS}
+    for filas in resultados.values():
+        for fila in filas:
+            for columna in COLUMNAS:
+                tabla[columna].append(fila[columna])
+    return tabla
+
+def imprimir(tabla: Dict[str, list]):
+    mostrar = ('archivo', 'token', 'duracion_s', 'frames', 'fps', 'correr', 'patear', 'marcar_adversario',
+               'errores_servidor', 'otros_mensajes', 'tasa_errores')
+    anchos = {columna: max([len(columna)] + [len(_formato(valor)) for valor in tabla[columna]]) for columna in mostrar}
+    print('  '.join(columna.ljust(anchos[columna]) for columna in mostrar))
+    for i in range(len(tabla['archivo'])):
+        print('  '.join(_formato(tabla[columna][i]).ljust(anchos[columna]) for columna in mostrar))
+
+def _formato(valor) -> str:
+    if isinstance(valor, float):
+        return f'{valor:.2f}'
+    if isinstance(valor, str) and valor.startswith('TOKEN-'):
+        return valor[:14]
+    return str(valor)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rutas', nargs='*', default=['logs'], help='Directorios o globs de archivos .log.')
+    parser.add_argument('--procesos', type=int, default=0, help='0 usa uno por core.')
+    parser.add_argument('--salida', help='Guarda el resumen columnar en un JSON.')
+    parser.add_argument('--sin-cache', action='store_true', help='Lee todos los archivos y no actualiza el cache.')
+    args = parser.parse_args()
+
+    archivos = buscar_logs(args.rutas)
+    if not archivos:
+        parser.error('No se encontraron archivos de log.')
+    tabla = columnas(analizar(archivos, args.procesos, usar_cache=not args.sin_cache))
+    imprimir(tabla)
+
+    frames = sum(tabla['frames'])
+    print(f'\n{len(archivos)} archivos, {len(tabla["archivo"])} partidos, {frames} frames, '
+          f'{sum(tabla["errores_servidor"])} errores del servidor, {sum(tabla["otros_mensajes"])} otros mensajes')
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as salida:
+            json.dump(tabla, salida, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Micro-benchmark del decodificador de mensajes del servidor.
+Compara parse_server_message contra decodificar_mensaje (validado y confiable)
+sobre los frames de ejemplo de test.py.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_decodificador [--repeticiones N]
+"""
+import argparse
+import logging
+import timeit
+
+from mensajes import parse_server_message, decodificar_mensaje
+from benchmarks.fixtures import FRAMES_EJEMPLO, cargar_frame
+
+def medir(funcion, repeticiones: int) -> float:
+    """Devuelve el mejor tiempo por llamada en microsegundos."""
+    tiempos = timeit.repeat(funcion, number=repeticiones, repeat=5)
+    return min(tiempos) / repeticiones * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for nombre in FRAMES_EJEMPLO:
+        raw = cargar_frame(nombre)
+        base = medir(lambda: parse_server_message(raw), args.repeticiones)
+        validado = medir(lambda: decodificar_mensaje(raw), args.repeticiones)
+        confiable = medir(lambda: decodificar_mensaje(raw, confiable=True), args.repeticiones)
+
+        print(f'{nombre} ({len(raw)} bytes)')
+        print(f'  parse_server_message              {base:8.1f} us')
+        print(f'  decodificar_mensaje               {validado:8.1f} us  x{base / validado:.2f}')
+        print(f'  decodificar_mensaje(confiable)    {confiable:8.1f} us  x{base / confiable:.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Mide cuanto tiempo del event loop consume el logging en cada frame.
+Reproduce los logs que emiten process_messages y utils al responder un REACCIONAR:
+
+    anterior     handlers sincronicos en el logger raiz y mensajes con f-strings.
+    cola         handlers detras del QueueListener y mensajes con %-args.
+    silencioso   cola + modo silencioso del hot path.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_logging [--frames N]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import time
+
+import log
+from mensajes import decodificar_mensaje, CodificadorAcciones
+from benchmarks.fixtures import cargar_frame
+
+logger_client = logging.getLogger('client')
+logger_utils = logging.getLogger('utils')
+
+def frame_anterior(mensaje, accion: str):
+    logger_client.info("Reaccionar")
+    logger_client.debug(mensaje)
+    logger_utils.info(f'Jugador mas cercano {7}')
+    logger_client.info(f'Accion enviada. Mensaje: {accion}')
+
+def frame_lazy(mensaje, accion: str):
+    logger_client.info("Reaccionar")
+    logger_client.debug(mensaje)
+    logger_utils.info('Jugador mas cercano %s', 7)
+    logger_client.info('Accion enviada. Mensaje: %s', accion)
+
+def configurar(escenario: str, directorio: str):
+    log.setup_logging('bench', silencioso=(escenario == 'silencioso'), directorio=directorio)
+
+    if escenario == 'anterior':
+        # Vuelve a colgar los handlers del logger raiz, como antes de la cola
+        handlers = log._listener.handlers
+        log._listener.stop()
+        log._listener = None
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+
+def medir(escenario: str, frames: int, mensaje, accion: str) -> float:
+    """Devuelve los microsegundos por frame que el logging ocupa en el hilo que loguea."""
+    funcion = frame_anterior if escenario == 'anterior' else frame_lazy
+
+    with tempfile.TemporaryDirectory() as directorio, open(os.devnull, 'w') as nulo:
+        with contextlib.redirect_stdout(nulo):
+            configurar(escenario, directorio)
+            inicio = time.perf_counter()
+            for _ in range(frames):
+                funcion(mensaje, accion)
+            transcurrido = time.perf_counter() - inicio
+            log.detener_logging()
+            for handler in list(logging.getLogger().handlers):
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+
+    return transcurrido / frames * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=5000)
+    args = parser.parse_args()
+
+    mensaje = decodificar_mensaje(cargar_frame('reaccionar_con_eco.json'))
+    accion = CodificadorAcciones(mensaje.destinatario).correr([{'jugador_numero': 7, 'x': 7, 'y': 10}])
+
+    resultados = {escenario: medir(escenario, args.frames, mensaje, accion)
+                  for escenario in ('anterior', 'cola', 'silencioso')}
+    for escenario, tiempo in resultados.items():
+        print(f'{escenario:<12} {tiempo:8.1f} us/frame  x{resultados["anterior"] / tiempo:.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Ritmo de los rollouts de montecarlo.py (rollouts/s) segun la cantidad de procesos del pool.
+Evalua los TIENES_LA_PELOTA del corpus con un tiempo fijo por frame, como lo haria el planificador.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_montecarlo [--procesos 1 2 4] [--ms 20] [--frames 20]
+"""
+import argparse
+import logging
+import os
+import time
+from statistics import median
+
+from mensajes import parse_server_message, CodificadorAcciones, MensajeTienesLaPelota
+from montecarlo import EvaluadorMontecarlo
+from benchmarks.fixtures import corpus
+
+def medir(mensajes, procesos: int, ms: float) -> dict:
+    evaluador = EvaluadorMontecarlo(procesos, rollouts_maximos=10 ** 9)
+    evaluador.calentar()
+    ritmos, rollouts = [], []
+    try:
+        for mensaje in mensajes:
+            limite = time.perf_counter_ns() + int(ms * 1e6)
+            for _ in evaluador(CodificadorAcciones(mensaje.destinatario), mensaje, mensaje.destinatario, limite=limite):
+                pass
+            ritmos.append(evaluador.ultimo.por_segundo)
+            rollouts.append(evaluador.ultimo.rollouts)
+    finally:
+        evaluador.cerrar()
+    return {'ritmo': median(ritmos), 'minimo': min(ritmos), 'rollouts': median(rollouts)}
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, nargs='+', default=sorted({1, max(cores // 2, 1), cores}))
+    parser.add_argument('--ms', type=float, default=20, help='Tiempo por frame.')
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fixtures = [f for f in corpus(amontonadas=args.frames) if f.mensaje_id == 'TIENES_LA_PELOTA'][:args.frames]
+    mensajes = [parse_server_message(f.raw) for f in fixtures]
+    mensajes = [m for m in mensajes if isinstance(m, MensajeTienesLaPelota)]
+
+    print(f'{len(mensajes)} frames, {args.ms:.0f} ms por frame, {cores} cores')
+    base = None
+    for procesos in args.procesos:
+        resultado = medir(mensajes, procesos, args.ms)
+        base = base or resultado['ritmo']
+        print(f'  {procesos:3d} procesos  {resultado["ritmo"]:9.0f} rollouts/s  (min {resultado["minimo"]:9.0f})  '
+              f'{resultado["rollouts"]:7.0f} por frame  x{resultado["ritmo"] / base:.2f}')
+
+if __name__ == '__main__':
+    main()
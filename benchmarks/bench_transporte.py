@@ -0,0 +1,95 @@
+"""
+Compara los perfiles de transporte de transporte.py contra servidor_local.py.
+
+Por cada perfil se levanta un servidor local nuevo en otro proceso y el cliente juega un
+partido contra el bot con estrategias livianas (las de utils). Asi el tiempo medido es casi
+todo transporte: serializacion del websocket, compresion, colas y el event loop. El servidor
+informa los frames enviados por segundo y la respuesta (desde que envia un frame hasta que
+recibe la accion), y el cliente los frames que salteo por atrasarse (ver recepcion.py).
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_transporte [--perfiles por_defecto baja_latencia] [--fps 500] [--duracion 5]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+from statistics import median, quantiles
+
+import client
+from mensajes import MensajeReaccionar, MensajeTienesLaPelota
+from servidor_local import ServidorLocal
+from teams import TEAM_PIN
+from transporte import PERFILES, ejecutar, nombre_loop
+from utils import buscar_pelota, patear_al_arco
+
+ESTRATEGIAS_LIVIANAS = {MensajeTienesLaPelota: (patear_al_arco, None),
+                        MensajeReaccionar: (buscar_pelota, None)}
+
+class _ServidorMedido(ServidorLocal):
+    """Servidor local que devuelve las mediciones de cada equipo por una cola."""
+
+    def __init__(self, cola, **kwargs):
+        super().__init__(**kwargs)
+        self.cola = cola
+
+    def informar(self, conexion):
+        self.cola.put({'frames': conexion.frames, 'latencias': conexion.latencias})
+
+def _servir(puerto: int, fps: float, duracion: float, listo, cola):
+    logging.disable(logging.CRITICAL)
+    servidor = _ServidorMedido(cola, fps=fps, duracion=duracion, bot=True, semilla=0)
+
+    async def servir():
+        import websockets
+        async with websockets.serve(servidor.atender, 'localhost', puerto):
+            listo.set()
+            await asyncio.Future()
+    asyncio.run(servir())
+
+async def _jugar(url: str, perfil) -> dict:
+    loop = nombre_loop()
+    sesion = await client.jugar(url, TEAM_PIN, None, ESTRATEGIAS_LIVIANAS, perfil=perfil)
+    return {'loop': loop, 'salteados': sesion.partida.metricas.contadores.get('frames.salteados', 0)}
+
+def medir(perfil, puerto: int, fps: float, duracion: float) -> dict:
+    contexto = multiprocessing.get_context('spawn')
+    listo, cola = contexto.Event(), contexto.Queue()
+    servidor = contexto.Process(target=_servir, args=(puerto, fps, duracion, listo, cola), daemon=True)
+    servidor.start()
+    try:
+        if not listo.wait(30):
+            raise RuntimeError('El servidor local no arranco.')
+        cliente = ejecutar(_jugar(f'ws://localhost:{puerto}', perfil), perfil)
+        servido = cola.get(timeout=30)
+    finally:
+        servidor.terminate()
+        servidor.join()
+
+    latencias = sorted(latencia * 1e3 for latencia in servido['latencias'])
+    return {'loop': cliente['loop'],
+            'frames_s': servido['frames'] / duracion,
+            'respuestas_s': len(latencias) / duracion,
+            'salteados': cliente['salteados'],
+            'p50_ms': median(latencias),
+            'p99_ms': quantiles(latencias, n=100)[98],
+            'max_ms': latencias[-1]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', nargs='+', default=list(PERFILES), choices=list(PERFILES))
+    parser.add_argument('--fps', type=float, default=500, help='Frames por segundo que intenta enviar el servidor.')
+    parser.add_argument('--duracion', type=float, default=5, help='Segundos de cada partido.')
+    parser.add_argument('--puerto', type=int, default=4100)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f'{args.fps:.0f} fps pedidos, {args.duracion:.0f} s por perfil\n')
+    print(f'{"perfil":<16}{"loop":<10}{"frames/s":>10}{"resp/s":>10}{"salteados":>11}{"p50 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+    for i, nombre in enumerate(args.perfiles):
+        r = medir(PERFILES[nombre], args.puerto + i, args.fps, args.duracion)
+        print(f'{nombre:<16}{r["loop"]:<10}{r["frames_s"]:>10.0f}{r["respuestas_s"]:>10.0f}{r["salteados"]:>11d}'
+              f'{r["p50_ms"]:>9.2f}{r["p99_ms"]:>9.2f}{r["max_ms"]:>9.2f}')
+
+if __name__ == '__main__':
+    main()
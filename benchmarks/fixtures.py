@@ -0,0 +1,67 @@
+"""
+Corpus de frames para los benchmarks.
+
+Incluye los frames de ejemplo de test.py (guardados en benchmarks/datos) y canchas
+sinteticas "amontonadas", con los 22 jugadores alrededor de la pelota, generadas
+con simulador.Partido a partir de una semilla fija.
+"""
+import json
+import os
+import random
+from typing import List, NamedTuple
+
+from grilla import ANCHO, ALTO
+from simulador import Partido
+from teams import TEAM_PIN, TEAM_LANUS
+
+DIRECTORIO_DATOS = os.path.join(os.path.dirname(__file__), 'datos')
+FRAMES_EJEMPLO = ['tienes_la_pelota.json', 'reaccionar_con_eco.json']
+
+class Fixture(NamedTuple):
+    nombre: str
+    raw: str
+    mensaje_id: str
+    equipo_id: str
+
+def cargar_frame(nombre: str) -> str:
+    with open(os.path.join(DIRECTORIO_DATOS, nombre), encoding='utf-8') as archivo:
+        return archivo.read()
+
+def _fixture(nombre: str, raw: str) -> Fixture:
+    mensaje = json.loads(raw)
+    return Fixture(nombre, raw, mensaje['mensaje_id'], mensaje['destinatario'])
+
+def cancha_amontonada(semilla: int, radio: int = 2) -> Partido:
+    """Partido con todos los jugadores a menos de `radio` sectores de la pelota."""
+    rng = random.Random(semilla)
+    partido = Partido([TEAM_PIN, TEAM_LANUS], [f'TOKEN-bench-{semilla}-a', f'TOKEN-bench-{semilla}-b'], semilla=semilla)
+    centro_x, centro_y = rng.randint(radio, ANCHO - 1 - radio), rng.randint(radio, ALTO - 1 - radio)
+
+    for jugadores in partido.jugadores:
+        for jugador in jugadores:
+            jugador.x = centro_x + rng.randint(-radio, radio)
+            jugador.y = centro_y + rng.randint(-radio, radio)
+    partido.poseedor = rng.choice(partido.jugadores[rng.randint(0, 1)])
+    partido.pelota = (partido.poseedor.x, partido.poseedor.y)
+    # La ultima accion del que tiene la pelota se reenvia en el REACCIONAR del rival
+    partido.ultima_accion[partido.poseedor.equipo] = {'mensaje_id': 'PATEAR',
+                                                      'token': partido.tokens[partido.poseedor.equipo],
+                                                      'datos': {'x': centro_x, 'y': centro_y}}
+    return partido
+
+def corpus(amontonadas: int = 4) -> List[Fixture]:
+    """
+    Devuelve el corpus completo de frames.
+
+    args:
+        amontonadas (int): Cantidad de canchas sinteticas. Cada una aporta un TIENES_LA_PELOTA y un REACCIONAR.
+    """
+    fixtures = [_fixture(nombre.removesuffix('.json'), cargar_frame(nombre)) for nombre in FRAMES_EJEMPLO]
+
+    for semilla in range(amontonadas):
+        partido = cancha_amontonada(semilla)
+        cancha = partido.cancha()
+        for equipo in (0, 1):
+            raw = json.dumps(partido.frame(equipo, cancha), ensure_ascii=False, separators=(',', ':'))
+            fixtures.append(_fixture(f'amontonada_{semilla}_equipo{equipo + 1}', raw))
+    return fixtures
@@ -0,0 +1,199 @@
+"""
+Benchmark de las etapas del cliente por frame: decodificar, decidir y codificar la respuesta.
+Decidir se mide con las estrategias rapidas del planificador y con las basicas de utils
+(patear_al_arco y buscar_pelota), cada una sobre los frames de su tipo.
+
+Cada etapa se mide por separado y punta a punta sobre el corpus de benchmarks.fixtures.
+Informa p50/p99 por etapa y la memoria pico que asigna cada frame (tracemalloc), y guarda
+los resultados en benchmarks/resultados/ para compararlos entre corridas.
+
+Ademas mide el primer frame de un proceso nuevo, en frio y precalentado (ver precalentar.py):
+el resto de las etapas se miden despues de una llamada de calentamiento y no lo muestran.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.suite [--iteraciones N] [--comparar benchmarks/resultados/<archivo>.json] [--sin-primer-frame]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from statistics import mean, quantiles
+from typing import Callable, Dict, List
+
+from mensajes import (parse_server_message,
+                      decodificar_mensaje,
+                      CodificadorAcciones,
+                      Coordenada,
+                      MensajeTienesLaPelota,
+                      correr,
+                      patear,
+                      pasar_pelota,
+                      marcar_adversario)
+from planificador import ESTRATEGIAS_POR_DEFECTO
+from utils import buscar_pelota, patear_al_arco
+from precalentar import comparar_primer_frame
+from benchmarks.fixtures import Fixture, corpus
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+def decidir(codificador: CodificadorAcciones, mensaje, equipo_id: str) -> str:
+    """Misma estrategia rapida que usa el planificador de process_messages."""
+    rapida, _ = ESTRATEGIAS_POR_DEFECTO[type(mensaje)]
+    return rapida(codificador, mensaje, equipo_id)
+
+def sin_indice(mensaje):
+    """Borra el indice que guardo la llamada anterior (ver utils.indexar_cancha): cada decidir mide tambien el indexado."""
+    mensaje._indice = None
+    return mensaje
+
+def codificar_pydantic(token: str, accion: dict) -> str:
+    """Serializacion anterior de send_message: modelo pydantic, model_dump y json.dumps."""
+    datos = accion['datos']
+    if accion['mensaje_id'] == 'CORRER':
+        mensaje = correr(token, datos=datos)
+    elif accion['mensaje_id'] == 'PATEAR':
+        mensaje = patear(token, coord=Coordenada(**datos))
+    elif accion['mensaje_id'] == 'PASAR_PELOTA':
+        mensaje = pasar_pelota(token, jugador=datos['jugador_numero'])
+    else:
+        mensaje = marcar_adversario(token, jugador=datos['jugador_numero'], adversario=datos['adversario_numero'])
+    return json.dumps(mensaje.model_dump())
+
+def codificar_plantilla(codificador: CodificadorAcciones, accion: dict) -> str:
+    datos = accion['datos']
+    if accion['mensaje_id'] == 'CORRER':
+        return codificador.correr(datos['movimientos'])
+    elif accion['mensaje_id'] == 'PATEAR':
+        return codificador.patear(datos['x'], datos['y'])
+    elif accion['mensaje_id'] == 'PASAR_PELOTA':
+        return codificador.pasar_pelota(datos['jugador_numero'])
+    return codificador.marcar_adversario(datos['jugador_numero'], datos['adversario_numero'])
+
+def etapas(fixture: Fixture) -> Dict[str, Callable[[], object]]:
+    """Arma las funciones a medir para un frame."""
+    codificador = CodificadorAcciones(fixture.equipo_id)
+    mensaje = decodificar_mensaje(fixture.raw)
+    accion = json.loads(decidir(codificador, mensaje, fixture.equipo_id))
+    basica = patear_al_arco if isinstance(mensaje, MensajeTienesLaPelota) else buscar_pelota
+
+    return {
+        'decodificar.parse_server_message': lambda: parse_server_message(fixture.raw),
+        'decodificar.validado': lambda: decodificar_mensaje(fixture.raw),
+        'decodificar.confiable': lambda: decodificar_mensaje(fixture.raw, confiable=True),
+        'decidir': lambda: decidir(codificador, sin_indice(mensaje), fixture.equipo_id),
+        f'decidir.{basica.__name__}': lambda: basica(codificador, sin_indice(mensaje), fixture.equipo_id),
+        'codificar.pydantic': lambda: codificar_pydantic(fixture.equipo_id, accion),
+        'codificar.plantilla': lambda: codificar_plantilla(codificador, accion),
+        'punta_a_punta': lambda: decidir(codificador, decodificar_mensaje(fixture.raw), fixture.equipo_id),
+    }
+
+def medir_tiempos(fixtures: List[Fixture], iteraciones: int) -> Dict[str, List[float]]:
+    """Tiempo de cada llamada en microsegundos, por etapa, sobre todo el corpus."""
+    muestras: Dict[str, List[float]] = {}
+    for fixture in fixtures:
+        for nombre, funcion in etapas(fixture).items():
+            funcion()
+            tiempos = muestras.setdefault(nombre, [])
+            for _ in range(iteraciones):
+                inicio = time.perf_counter_ns()
+                funcion()
+                tiempos.append((time.perf_counter_ns() - inicio) / 1e3)
+    return muestras
+
+def medir_memoria(fixtures: List[Fixture]) -> Dict[str, float]:
+    """Memoria pico (KiB) que asigna cada etapa por frame, promedio del corpus."""
+    picos: Dict[str, List[float]] = {}
+    tracemalloc.start()
+    try:
+        for fixture in fixtures:
+            for nombre, funcion in etapas(fixture).items():
+                funcion()
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                funcion()
+                picos.setdefault(nombre, []).append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    finally:
+        tracemalloc.stop()
+    return {nombre: mean(valores) for nombre, valores in picos.items()}
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+def resumir(muestras: Dict[str, List[float]], memoria: Dict[str, float]) -> Dict[str, dict]:
+    resumen = {}
+    for nombre, tiempos in muestras.items():
+        percentiles = quantiles(tiempos, n=100)
+        resumen[nombre] = {'p50_us': percentiles[49],
+                           'p99_us': percentiles[98],
+                           'media_us': mean(tiempos),
+                           'memoria_pico_kib': memoria[nombre]}
+    return resumen
+
+def imprimir(resumen: Dict[str, dict], anterior: Dict[str, dict] | None = None):
+    print(f'{"etapa":<36}{"p50 us":>10}{"p99 us":>10}{"media us":>10}{"KiB/frame":>11}' + ('   p50 vs anterior' if anterior else ''))
+    for nombre, valores in resumen.items():
+        linea = (f'{nombre:<36}{valores["p50_us"]:>10.1f}{valores["p99_us"]:>10.1f}'
+                 f'{valores["media_us"]:>10.1f}{valores["memoria_pico_kib"]:>11.1f}')
+        if anterior and nombre in anterior:
+            cambio = valores['p50_us'] / anterior[nombre]['p50_us'] - 1
+            linea += f'   {cambio:+.1%}'
+        print(linea)
+
+def imprimir_primer_frame(primer_frame: Dict[str, dict], anterior: Dict[str, dict] | None = None):
+    print(f'\n{"primer frame":<36}{"1ro us":>10}{"2do us":>10}{"100 us":>10}' + ('   1ro vs anterior' if anterior else ''))
+    for modo, valores in primer_frame.items():
+        linea = f'{modo:<36}{valores["primero_us"]:>10.0f}{valores["segundo_us"]:>10.0f}{valores["centesimo_us"]:>10.0f}'
+        if anterior and modo in anterior:
+            linea += f'   {valores["primero_us"] / anterior[modo]["primero_us"] - 1:+.1%}'
+        print(linea)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iteraciones', type=int, default=300, help='Llamadas por frame y etapa.')
+    parser.add_argument('--amontonadas', type=int, default=4, help='Canchas sinteticas del corpus.')
+    parser.add_argument('--comparar', help='Resultado guardado contra el que comparar.')
+    parser.add_argument('--no-guardar', action='store_true')
+    parser.add_argument('--sin-primer-frame', action='store_true', help='No mide el primer frame en frio y precalentado.')
+    parser.add_argument('--procesos-primer-frame', type=int, default=5, help='Procesos nuevos por modo del primer frame.')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    fixtures = corpus(amontonadas=args.amontonadas)
+    resumen = resumir(medir_tiempos(fixtures, args.iteraciones), medir_memoria(fixtures))
+
+    primer_frame = None if args.sin_primer_frame else comparar_primer_frame(args.procesos_primer_frame)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+    print(f'{len(fixtures)} frames, {args.iteraciones} iteraciones por frame y etapa\n')
+    imprimir(resumen, anterior['etapas'] if anterior else None)
+    if primer_frame:
+        imprimir_primer_frame(primer_frame, anterior.get('primer_frame') if anterior else None)
+
+    if not args.no_guardar:
+        resultado = {'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+                     'commit': commit_actual(),
+                     'python': platform.python_version(),
+                     'frames': [fixture.nombre for fixture in fixtures],
+                     'iteraciones': args.iteraciones,
+                     'etapas': resumen,
+                     'primer_frame': primer_frame}
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        archivo = os.path.join(DIRECTORIO_RESULTADOS, f'{datetime.datetime.now():%Y%m%d_%H%M%S}_{resultado["commit"]}.json')
+        with open(archivo, 'w', encoding='utf-8') as salida:
+            json.dump(resultado, salida, indent=2)
+        print(f'\nResultados guardados en {archivo}')
+
+if __name__ == '__main__':
+    main()
@@ -3,21 +3,29 @@ import asyncio
 import ssl
 import json
 import logging
+import os
+import threading
+import time
+from typing import Callable
 from mensajes import (parse_server_message,
+                      decodificar_mensaje,
                       MensajeRegistro,
                       MensajeTienesLaPelota,
                       MensajeReaccionar,
                       MensajeError,
-                      ClientMessage,
-                      correr,
-                      pasar_pelota,
-                      patear,
-                      marcar_adversario)
-from utils import (get_ubicacion_pelota, 
-                   buscar_pelota,
-                   patear_al_arco)
+                      CodificadorAcciones)
 from teams import TEAM_PIN
-from log import setup_logging
+from log import setup_logging, now_formatted
+from metricas import iniciar_partido, terminar_partido, instalar_senal
+from planificador import Planificador, ESTRATEGIAS_POR_DEFECTO
+from recepcion import Receptor, MAX_COLA
+from estado import EstadoPartido
+from envio import FiltroEnvios
+from grabador import Grabador
+from sesion import Sesion, RegistroFallido, SesionAgotada, CAIDA_MAXIMA_S
+from precalentar import precalentar
+from transporte import PERFILES, PerfilTransporte, ajustar_socket, ejecutar
+from estrategias import iniciar_registro, instalar_senal_recarga
 
 # Datos del servidor
 HOST = 'wss://machuca.com.ar'
@@ -27,85 +35,230 @@ logger = logging.getLogger('client')
 
 team_register = TEAM_PIN
 ID_CLIENT = 1
+DECODIFICADOR_CONFIABLE = False                                               # True arma los mensajes sin validarlos con pydantic
+VALIDAR_ACCIONES = False                                                      # True valida cada accion con pydantic antes de enviarla (debug)
+HOT_PATH_SILENCIOSO = False                                                   # True descarta los logs por frame (solo WARNING o superior)
+COALESCER_FRAMES = True                                                       # True saltea los REACCIONAR atrasados cuando llegan varios juntos
+FILTRAR_REPETIDOS = True                                                      # True no reenvia una accion igual a la anterior mientras la cancha no cambie
+INTERVALO_REENVIO_MS = 500                                                    # Cada cuanto se reenvia igual una accion repetida (None: nunca)
+GRABAR_PARTIDOS = False                                                       # True graba cada frame y cada accion en DIRECTORIO_GRABACIONES (ver grabador.py)
+DIRECTORIO_GRABACIONES = 'partidas'
+ESTRATEGIAS = ESTRATEGIAS_POR_DEFECTO                                         # Estrategia rapida y completa por tipo de mensaje (ver planificador.py)
+ROLLOUTS_MONTECARLO = False                                                   # True evalua TIENES_LA_PELOTA con rollouts en un pool de procesos (ver montecarlo.py)
+PROCESOS_MONTECARLO = 0                                                       # Procesos del pool de rollouts (0: uno por core menos uno)
+RECONECTAR = True                                                             # True vuelve a conectarse y registrarse si se corta la conexion (ver sesion.py)
+TIMEOUT_REGISTRO_S = 5                                                        # Espera maxima de la conexion y del OK del registro
+PERFIL_TRANSPORTE = 'baja_latencia'                                           # Compresion, colas, pings y event loop de la conexion (ver transporte.py)
+PRECALENTAR = True                                                            # True corre el camino de cada frame sobre frames sinteticos mientras se espera el OK (ver precalentar.py)
 
-# Funcion para registrar el equipo
-async def register(websocket) -> MensajeRegistro:
-    await websocket.send(json.dumps(team_register))                           # Convertimos el diccionario a JSON con .dumps()
+# Funcion para registrar el equipo. Acepta el registro ya serializado (la sesion lo reenvia igual al reconectar).
+# calentar(parar) se llama despues de enviar el registro, en un hilo aparte: corre mientras el OK viaja desde el servidor
+# sin frenar el event loop (los otros equipos de runner.py siguen jugando). El OK no lo espera: al llegar se activa
+# parar y el precalentamiento termina solo en el proximo frame sintetico
+_calentamientos: set = set()                                                  # Referencias a los que siguen terminando
+
+async def register(websocket, team_register: dict | str = team_register, timeout: float = TIMEOUT_REGISTRO_S,
+                   calentar: Callable[[threading.Event], object] | None = None) -> MensajeRegistro | None:
+    await websocket.send(team_register if isinstance(team_register, str) else json.dumps(team_register))   # Convertimos el diccionario a JSON con .dumps()
     logger.info("Registro enviado. Esperando respuesta...")
+    parar = threading.Event()
+    calentando = asyncio.ensure_future(asyncio.to_thread(calentar, parar)) if calentar is not None else None
+    try:
+        return await _esperar_registro(websocket, timeout)
+    finally:
+        if calentando is not None:
+            parar.set()
+            _calentamientos.add(calentando)
+            calentando.add_done_callback(_calentamientos.discard)
 
-    while True:
-        try:
-            # Esperamos la respuesta del servidor
-            response = await asyncio.wait_for(websocket.recv(), timeout=5)
-            mensaje = parse_server_message(response)
+async def _esperar_registro(websocket, timeout: float) -> MensajeRegistro | None:
+    try:
+        # Esperamos la respuesta del servidor
+        response = await asyncio.wait_for(websocket.recv(), timeout=timeout)
+        mensaje = parse_server_message(response)
 
-            if type(mensaje) == MensajeRegistro:
-                return mensaje
-            elif type(mensaje) == MensajeError:
-                logger.error(f'Error: {mensaje.datos}')
-                return None
-            else:
-                return None
-
-        except asyncio.TimeoutError:
-            logger.error("No se recibió respuesta del servidor en 5 segundos.")
-        except websockets.exceptions.ConnectionClosed:
-            logger.error("Conexión cerrada antes de recibir respuesta.")
-        except websockets.exceptions.ConnectionClosedOK:
-            logger.error("Server closed the connection normally.")
-        except websockets.exceptions.ConnectionClosedError as e:
-            logger.error(f"Server closed the connection with error: {e}")
+        if type(mensaje) == MensajeRegistro:
+            return mensaje
+        elif type(mensaje) == MensajeError:
+            logger.error(f'Error: {mensaje.datos}')
         return None
 
-async def send_message(websocket, mensaje: ClientMessage):
+    except asyncio.TimeoutError:
+        logger.error("No se recibió respuesta del servidor en %s segundos.", timeout)
+    except websockets.exceptions.ConnectionClosedOK:
+        logger.error("Server closed the connection normally.")
+    except websockets.exceptions.ConnectionClosedError as e:
+        logger.error(f"Server closed the connection with error: {e}")
+    return None
+
+async def send_message(websocket, mensaje: str):
 
-    await websocket.send(json.dumps(mensaje.model_dump()))
-    logger.info(f'Accion enviada. Mensaje: {mensaje}')
+    await websocket.send(mensaje)
+    logger.info('Accion enviada. Mensaje: %s', mensaje)
     return
 
 
+class Partida:
+    """
+    Estado de un partido que sobrevive a las reconexiones: codificador, metricas, cancha persistente,
+    planificador, filtro de envios y grabacion. Lo que depende de la conexion (el Receptor) se arma
+    en cada process_messages.
+    """
+
+    def __init__(self, token: str, equipo_id: str, estrategias: dict = ESTRATEGIAS):
+        self.codificador = CodificadorAcciones(token, validar=VALIDAR_ACCIONES)             # Plantillas de las acciones con el token ya incluido
+        self.metricas = iniciar_partido(token)                                # Latencia por etapa de cada frame (ver metricas.py)
+        self.estado = EstadoPartido(equipo_id)                                # Cancha persistente entre frames: cambios, velocidades, control
+        self.estrategias = iniciar_registro(estrategias, self.codificador, equipo_id)   # Se pueden cambiar durante el partido (ver estrategias.py)
+        self.planificador = Planificador(self.codificador, equipo_id, self.metricas, estado=self.estado, registro=self.estrategias)
+        self.filtro = FiltroEnvios(INTERVALO_REENVIO_MS, self.metricas, activo=FILTRAR_REPETIDOS)   # No reenvia la misma accion si la cancha no cambio
+        self.grabador = Grabador(os.path.join(DIRECTORIO_GRABACIONES, f'partido_{token}_{now_formatted}.bin')) if GRABAR_PARTIDOS else None
+
+    def reanudar(self, token: str, equipo_id: str):
+        """Sigue el partido en una conexion nueva. Si el servidor dio otro token, las acciones se firman con el nuevo."""
+        if token != self.codificador.token:
+            self.estrategias.olvidar()                                        # La memoria por equipo_id del token anterior ya no se usa
+            self.codificador = CodificadorAcciones(token, validar=VALIDAR_ACCIONES)
+            self.planificador.codificador = self.estrategias.codificador = self.codificador
+            self.planificador.equipo_id = self.estrategias.equipo_id = equipo_id
+            self.estado.equipo_id = equipo_id
+        self.filtro.olvidar()                                                 # No sabemos si la ultima accion llego antes del corte
+
+    def cerrar(self):
+        if self.grabador is not None:
+            self.grabador.cerrar()
+        self.planificador.cerrar()
+        self.estrategias.cerrar()
+        terminar_partido(self.metricas)
+
 # Funcion para evaluar los mensajes y procesarlos de acuerdo al tipo
-async def process_messages(websocket, token: str, equipo_id: str):
-    async for response in websocket:
-        mensaje = parse_server_message(response)
+async def process_messages(websocket, token: str, equipo_id: str, estrategias: dict = ESTRATEGIAS, partida: Partida | None = None,
+                           max_cola: int = MAX_COLA):
+    propia = partida is None
+    if propia:
+        partida = Partida(token, equipo_id, estrategias)
+    metricas, estado, planificador, filtro, grabador = partida.metricas, partida.estado, partida.planificador, partida.filtro, partida.grabador
+    receptor = Receptor(websocket, metricas, coalescer=COALESCER_FRAMES, grabador=grabador, max_cola=max_cola)   # Si nos atrasamos, solo se responde el REACCIONAR mas nuevo
+    mensaje_a_enviar = None
 
-        if type(mensaje) == MensajeTienesLaPelota:
-            logger.info("Tienes la pelota!")
-            logger.debug(mensaje)
-            mensaje_a_enviar = patear_al_arco(token, mensaje, equipo_id)
-            await send_message(websocket, mensaje=mensaje_a_enviar)
+    try:
+        async for recibido, response in receptor:
+            mensaje = decodificar_mensaje(response, confiable=DECODIFICADOR_CONFIABLE)
+            parseado = time.perf_counter_ns()
 
-        elif type(mensaje) == MensajeReaccionar:
-            logger.info("Reaccionar")
-            logger.debug(mensaje)
-            mensaje_a_enviar = buscar_pelota(token, mensaje, equipo_id)
-            await send_message(websocket, mensaje=mensaje_a_enviar)
+            if type(mensaje) == MensajeTienesLaPelota:
+                logger.info("Tienes la pelota!")
+                logger.debug(mensaje)
+                metricas.registrar_servidor(mensaje.datos, time.time_ns() // 1_000_000)
+                mensaje_a_enviar = await planificador.decidir(mensaje, recibido)
+                decidido = time.perf_counter_ns()
+                filtro.olvidar()                                              # TIENES_LA_PELOTA siempre se responde
+                await send_message(websocket, mensaje=mensaje_a_enviar)
+                enviado = time.perf_counter_ns()
+                metricas.registrar_frame(recibido, parseado, decidido, enviado)
+                if grabador is not None:
+                    grabador.salida(enviado, mensaje_a_enviar)
 
-        elif type(mensaje) == MensajeError:
-            logger.error(f"Mensaje de error del servidor. Mensaje enviado: {mensaje_a_enviar}, Mensaje recibido: {mensaje}")
+            elif type(mensaje) == MensajeReaccionar:
+                logger.info("Reaccionar")
+                logger.debug(mensaje)
+                metricas.registrar_servidor(mensaje.datos, time.time_ns() // 1_000_000)
+                mensaje_a_enviar = await planificador.decidir(mensaje, recibido)
+                decidido = time.perf_counter_ns()
+                if filtro.debe_enviar(mensaje_a_enviar, estado):
+                    await send_message(websocket, mensaje=mensaje_a_enviar)
+                    enviado = time.perf_counter_ns()
+                    metricas.registrar_frame(recibido, parseado, decidido, enviado)
+                    if grabador is not None:
+                        grabador.salida(enviado, mensaje_a_enviar)
 
-        else:
-            logger.warning(f"Otro mensaje recibido.\nMensaje Enviado: {mensaje_a_enviar}\n\nMensaje recibido: {mensaje}")
+            elif type(mensaje) == MensajeError:
+                metricas.errores += 1
+                filtro.olvidar()                                              # La ultima accion no fue aceptada: no se filtra
+                logger.error("Mensaje de error del servidor. Mensaje enviado: %s, Mensaje recibido: %s", mensaje_a_enviar, mensaje)
 
-async def main():
-    url = f"{HOST}:{PORT}"
+            else:
+                logger.warning("Otro mensaje recibido.\nMensaje Enviado: %s\n\nMensaje recibido: %s", mensaje_a_enviar, mensaje)
+    finally:
+        receptor.cerrar()
+        if propia:
+            partida.cerrar()
+
+def crear_contexto_ssl() -> ssl.SSLContext:
     ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)                     # Creamos un contexto SSL para establecer una conexión segura (TLS)
     ssl_context.check_hostname = False
     ssl_context.verify_mode = ssl.CERT_NONE                                   # Desactivamos la verificación del certificado SSL
-    token = None
-    setup_logging(ID_CLIENT)
-    
-    async with websockets.connect(url, ssl=ssl_context) as websocket:
-        logger.info("Conectado al servidor!. Registrando equipo...")
-        mensaje_registro = await register(websocket)
-        token = mensaje_registro.token
-        equipo_id = mensaje_registro.destinatario
-
-        if token is None:
-            logger.error('No se registro ningun token. Saliendo')
-            return
-        logger.info(f'El token del equipo es: {token}')
-        await process_messages(websocket, token=token, equipo_id=equipo_id)
+    return ssl_context
+
+# Funcion para jugar un partido con un equipo: conecta, registra y procesa los mensajes.
+# Si la conexion se corta durante el partido vuelve a conectarse y a registrarse, y sigue con la misma Partida
+# Si no logra volver a conectarse en caida_maxima_s abandona la sesion (lo informa en el log y devuelve la Sesion)
+async def jugar(url: str, team_register: dict, ssl_context: ssl.SSLContext | None = None, estrategias: dict = ESTRATEGIAS,
+                perfil: PerfilTransporte | None = None, caida_maxima_s: float = CAIDA_MAXIMA_S) -> Sesion:
+    ssl_context = ssl_context if url.startswith('wss://') else None
+    perfil = perfil or PERFILES[PERFIL_TRANSPORTE]
+    sesion = Sesion(team_register, caida_maxima_s=caida_maxima_s)
+    calentar = (lambda parar: precalentar(estrategias, team_register, confiable=DECODIFICADOR_CONFIABLE, parar=parar)) if PRECALENTAR else None
+
+    try:
+        while True:
+            try:
+                async with websockets.connect(url, ssl=ssl_context, open_timeout=TIMEOUT_REGISTRO_S,
+                                              **perfil.argumentos_connect()) as websocket:
+                    ajustar_socket(websocket, perfil)
+                    logger.info("Conectado al servidor!. Registrando equipo...")
+                    mensaje_registro = await register(websocket, sesion.registro, calentar=calentar)
+                    calentar = None                                           # Una vez por partido: al reconectar ya esta caliente
+                    if mensaje_registro is None or mensaje_registro.token is None:
+                        raise RegistroFallido('No se registro ningun token.')
+                    sesion.registrada(mensaje_registro.token, mensaje_registro.destinatario)
+
+                    if sesion.partida is None:
+                        logger.info(f'El token del equipo es: {sesion.token}')
+                        sesion.partida = Partida(sesion.token, sesion.equipo_id, estrategias)
+                    else:
+                        sesion.partida.reanudar(sesion.token, sesion.equipo_id)
+                    await process_messages(websocket, token=sesion.token, equipo_id=sesion.equipo_id, partida=sesion.partida,
+                                           max_cola=perfil.max_queue or MAX_COLA)
+                return sesion                                                 # El servidor cerro la conexion normalmente: termino el partido
+            except websockets.exceptions.ConnectionClosedOK:
+                return sesion
+            except (websockets.exceptions.ConnectionClosedError, websockets.exceptions.InvalidHandshake,
+                    OSError, RegistroFallido) as e:
+                if not RECONECTAR:
+                    logger.error('Conexion perdida: %r. Saliendo', e)
+                    return sesion
+                try:
+                    espera = sesion.cortada(e)
+                except SesionAgotada as agotada:
+                    logger.error('No se pudo volver a conectar: %s. Se abandona la sesion', agotada)
+                    return sesion
+                await asyncio.sleep(espera)
+    finally:
+        if sesion.partida is not None:
+            sesion.partida.cerrar()
+        if sesion.reconexiones or sesion.intentos_fallidos or not sesion.conectada:
+            logger.info('Sesion: %s', sesion.resumen())
+
+async def main(team_register: dict = team_register, id_client: int = ID_CLIENT):
+    url = f"{HOST}:{PORT}"
+    ssl_context = crear_contexto_ssl()
+    setup_logging(id_client, silencioso=HOT_PATH_SILENCIOSO)
+    instalar_senal(asyncio.get_running_loop())                                # kill -USR1 <pid> loguea las metricas del partido
+    instalar_senal_recarga(asyncio.get_running_loop())                        # kill -USR2 <pid> carga la estrategia de estrategia.txt
+
+    estrategias, evaluador = ESTRATEGIAS, None
+    if ROLLOUTS_MONTECARLO:
+        from montecarlo import EvaluadorMontecarlo, con_montecarlo           # Importa simulador y el pool de procesos: solo si se usa
+        evaluador = EvaluadorMontecarlo(PROCESOS_MONTECARLO)
+        evaluador.calentar()                                                  # Los procesos arrancan antes de conectarse, no en el primer frame
+        estrategias = con_montecarlo(ESTRATEGIAS, evaluador)
+    try:
+        await jugar(url, team_register, ssl_context, estrategias)
+    finally:
+        if evaluador is not None:
+            evaluador.cerrar()
 
 # Ejecutamos la funcion
-asyncio.run(main())
\ No newline at end of file
+if __name__ == '__main__':
+    ejecutar(main(), PERFILES[PERFIL_TRANSPORTE])
@@ -0,0 +1,81 @@
+"""
+Filtro de acciones repetidas.
+
+Mientras la cancha no cambia en lo que importa para una decision, la estrategia vuelve a dar
+la misma accion en cada REACCIONAR, y el servidor ya la tiene. El filtro arma una huella con
+la accion y con lo que se uso para decidirla (sector y poseedor de la pelota y sector de cada
+jugador que nombra la accion) y no reenvia una huella igual a la ultima enviada. Pasado
+`intervalo_reenvio_ms` la reenvia igual, por si el servidor la perdio.
+"""
+import logging
+import re
+import time
+from typing import Optional
+
+from estado import EstadoPartido
+from metricas import MetricasPartido
+
+logger = logging.getLogger('envio')
+
+# Jugadores que nombra una accion: jugador_numero (propio) y adversario_numero (rival)
+_NUMEROS = re.compile(r'"(jugador|adversario)_numero": (-?\d+)')
+
+class FiltroEnvios:
+    """
+    args:
+        intervalo_reenvio_ms (float | None): Cada cuanto se reenvia igual una accion repetida. None no la reenvia nunca.
+        metricas (MetricasPartido | None): Donde contar 'envios.suprimidos' y 'envios.reenviados'.
+        activo (bool): Si es False se envia todo.
+    """
+
+    def __init__(self, intervalo_reenvio_ms: Optional[float] = 500, metricas: Optional[MetricasPartido] = None,
+                 activo: bool = True):
+        self.intervalo_reenvio_ms = intervalo_reenvio_ms
+        self.metricas = metricas
+        self.activo = activo
+        self.suprimidos = 0
+        self._ultima: Optional[tuple] = None
+        self._enviada_en = 0.0
+
+    def huella(self, accion: str, estado: Optional[EstadoPartido]) -> tuple:
+        """Accion mas las entradas de la decision que la produjo."""
+        if estado is None or estado.indice is None:
+            return (accion,)
+        jugadores = tuple(estado.posicion(int(numero), es_adversario=(equipo == 'adversario'))
+                          for equipo, numero in _NUMEROS.findall(accion))
+        return (accion, estado.pelota, estado.poseedor, jugadores)
+
+    def debe_enviar(self, accion: str, estado: Optional[EstadoPartido] = None) -> bool:
+        """
+        Indica si hay que enviar la accion, y si es asi la toma como la ultima enviada.
+
+        args:
+            accion (str): Accion ya codificada.
+            estado (EstadoPartido | None): Estado del partido con la cancha del frame actual.
+        returns:
+            bool: False si es igual a la ultima enviada y no paso el intervalo de reenvio.
+        """
+        if not self.activo:
+            return True
+
+        huella = self.huella(accion, estado)
+        ahora = time.monotonic()
+        if huella == self._ultima:
+            intervalo = self.intervalo_reenvio_ms
+            if intervalo is None or (ahora - self._enviada_en) * 1000 < intervalo:
+                self.suprimidos += 1
+                self._contar('envios.suprimidos')
+                return False
+            self._contar('envios.reenviados')
+
+        self._ultima = huella
+        self._enviada_en = ahora
+        return True
+
+    def olvidar(self):
+        """Descarta la ultima accion enviada: la proxima se envia aunque sea igual (ej: despues de un ERROR)."""
+        self._ultima = None
+
+    def _contar(self, evento: str):
+        if self.metricas is not None:
+            self.metricas.contar(evento)
@@ -0,0 +1,255 @@
+"""
+Estado del partido que persiste entre frames.
+
+El servidor manda la cancha completa en cada frame, pero de un frame al siguiente se mueven
+pocos jugadores. EstadoPartido compara cada cancha con la anterior y actualiza solo lo que
+cambio: las filas de distancias de los jugadores que se movieron, el mapa de control y los
+goles/poseedor. Ademas guarda las ultimas posiciones de cada jugador y de la pelota para
+estimar velocidades y anticipar hacia donde van.
+
+Cada jugador ocupa siempre la misma fila (slot) en los arrays, en el orden en que aparecio
+por primera vez; `numeros[canal]` da el numero de camiseta de cada fila. Un jugador que no
+esta en la cancha del frame actual tiene sector AUSENTE y distancia infinita a todo.
+"""
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from mensajes import MensajeTienesLaPelota, MensajeReaccionar, RelojData
+from grilla import ANCHO, ALTO, PROPIO, RIVAL, sector_id
+from tablas import EUCLIDEA
+from utils import CanchaIndex, indexar_cancha
+
+logger = logging.getLogger('estado')
+
+LARGO_HISTORIAL = 8
+AUSENTE = -1                                                                  # Sector de un slot cuyo jugador no esta en la cancha actual
+
+class Cambios(NamedTuple):
+    """Diferencias de una cancha respecto de la anterior."""
+    jugadores_movidos: List[int]                                              # Numeros de camiseta
+    adversarios_movidos: List[int]
+    pelota_movida: bool
+    cambio_poseedor: bool
+    goles_propios: int                                                        # Goles nuevos de cada equipo
+    goles_rivales: int
+
+class EstadoPartido:
+    """
+    args:
+        equipo_id (str): Identificador de tu equipo.
+        largo_historial (int): Cantidad de frames que se guardan para estimar velocidades.
+
+    atributos:
+        indice (CanchaIndex): Indice de la ultima cancha.
+        frames (int): Cantidad de canchas aplicadas.
+        numeros (List[List[int]]): Numero de camiseta de cada slot, indexado por PROPIO/RIVAL.
+        sectores (List[np.ndarray]): Sector actual de cada slot (AUSENTE si no esta en la cancha).
+        cruzadas (np.ndarray): Distancia entre cada jugador propio y cada adversario, forma (propios, rivales).
+            Infinita si alguno de los dos esta ausente.
+        pelota (int): Sector de la pelota.
+        poseedor (Tuple[int, bool] | None): (numero, es_adversario) de quien tiene la pelota.
+        goles (Tuple[int, int]): Goles propios y rivales.
+    """
+
+    def __init__(self, equipo_id: str, largo_historial: int = LARGO_HISTORIAL):
+        self.equipo_id = equipo_id
+        self.largo_historial = largo_historial
+        self.indice: Optional[CanchaIndex] = None
+        self.frames = 0
+        self.poseedor: Optional[Tuple[int, bool]] = None
+        self.goles: Tuple[int, int] = (0, 0)
+        self.pelota = 0
+        self._reiniciar([[], []])
+
+    def _reiniciar(self, numeros: List[List[int]]):
+        """Arma los arrays para los jugadores dados. Se pierde el historial."""
+        self.numeros = numeros
+        self.slots: List[Dict[int, int]] = [{numero: slot for slot, numero in enumerate(equipo)} for equipo in numeros]
+        self.sectores = [np.full(len(equipo), AUSENTE, dtype=np.intp) for equipo in numeros]
+        self._distancias_sectores = [np.full((len(equipo), EUCLIDEA.shape[0]), np.inf) for equipo in numeros]
+        self.cruzadas = np.full((len(numeros[PROPIO]), len(numeros[RIVAL])), np.inf)
+        self._historial = [np.zeros((self.largo_historial, len(equipo)), dtype=np.intp) for equipo in numeros]
+        self._historial_pelota = np.zeros(self.largo_historial, dtype=np.intp)
+        self._tiempos = np.zeros(self.largo_historial)
+        self._control: Optional[np.ndarray] = None
+        self._muestras = 0
+
+    def actualizar(self, mensaje: MensajeTienesLaPelota | MensajeReaccionar) -> Optional[Cambios]:
+        """
+        Aplica la cancha de un mensaje como diferencia contra la anterior.
+
+        args:
+            mensaje: Mensaje del servidor con cancha.
+        returns:
+            Cambios: Lo que cambio respecto del frame anterior. None si el mensaje no trae cancha.
+        """
+        indice = indexar_cancha(mensaje, equipo_id=self.equipo_id)
+        if indice is None:
+            return None
+
+        equipos = (indice.jugadores, indice.adversarios)
+        if any(numero not in self.slots[canal] for canal in (PROPIO, RIVAL) for numero in equipos[canal]):
+            # Aparecio un jugador nuevo (o es la primera cancha): se rearman los arrays y todos cuentan como movidos
+            self._reiniciar([self.numeros[canal] + [n for n in equipos[canal] if n not in self.slots[canal]]
+                             for canal in (PROPIO, RIVAL)])
+
+        # Movidos incluye a los que salieron de la cancha en este frame (pasan a AUSENTE)
+        movidos: List[List[int]] = [[], []]
+        for canal in (PROPIO, RIVAL):
+            slots, sectores = self.slots[canal], self.sectores[canal]
+            presentes = np.zeros(len(sectores), dtype=bool)
+            for numero, coord in equipos[canal].items():
+                slot = slots[numero]
+                presentes[slot] = True
+                sector = coord.y * ANCHO + coord.x
+                if sectores[slot] != sector:
+                    sectores[slot] = sector
+                    movidos[canal].append(slot)
+            salieron = np.flatnonzero(~presentes & (sectores != AUSENTE))
+            if len(salieron):
+                sectores[salieron] = AUSENTE
+                movidos[canal].extend(salieron.tolist())
+            if movidos[canal]:
+                filas = movidos[canal]
+                self._distancias_sectores[canal][filas] = _distancias(sectores[filas], np.arange(EUCLIDEA.shape[0]))
+                self._control = None
+
+        # Solo se recalculan las filas/columnas de distancias de los que se movieron
+        if movidos[PROPIO]:
+            self.cruzadas[movidos[PROPIO]] = _distancias(self.sectores[PROPIO][movidos[PROPIO]], self.sectores[RIVAL])
+        if movidos[RIVAL]:
+            self.cruzadas[:, movidos[RIVAL]] = _distancias(self.sectores[PROPIO], self.sectores[RIVAL][movidos[RIVAL]])
+
+        pelota = sector_id(indice.pelota.x, indice.pelota.y)
+        pelota_movida = pelota != self.pelota
+        self.pelota = pelota
+
+        poseedor = None if indice.poseedor is None else (indice.poseedor, indice.poseedor_es_adversario)
+        cambio_poseedor = poseedor != self.poseedor
+        self.poseedor = poseedor
+
+        cancha = indice.cancha
+        if cancha.equipo1.id == f'equipo:{self.equipo_id}':
+            goles = (cancha.equipo1.goles, cancha.equipo2.goles)
+        else:
+            goles = (cancha.equipo2.goles, cancha.equipo1.goles)
+        goles_nuevos = (goles[0] - self.goles[0], goles[1] - self.goles[1]) if self.frames else (0, 0)
+        if goles_nuevos != (0, 0):
+            logger.info('Goles: %d a %d', *goles)
+        self.goles = goles
+
+        self._registrar_historial(mensaje)
+        self.indice = indice
+        self.frames += 1
+        return Cambios([self.numeros[PROPIO][slot] for slot in movidos[PROPIO]],
+                       [self.numeros[RIVAL][slot] for slot in movidos[RIVAL]],
+                       pelota_movida, cambio_poseedor, *goles_nuevos)
+
+    def _registrar_historial(self, mensaje):
+        """Guarda los sectores actuales en el buffer circular, con el reloj del servidor como tiempo."""
+        reloj = next((dato.reloj for dato in mensaje.datos if type(dato) == RelojData), None)
+        anterior = self._tiempos[(self._muestras - 1) % self.largo_historial] if self._muestras else 0.0
+        # El reloj cuenta hacia atras: el tiempo transcurrido es su negativo. Sin reloj se avanza 1 ms
+        tiempo = -float(reloj) if reloj is not None else anterior + 1
+
+        posicion = self._muestras % self.largo_historial
+        for canal in (PROPIO, RIVAL):
+            self._historial[canal][posicion] = self.sectores[canal]
+        self._historial_pelota[posicion] = self.pelota
+        self._tiempos[posicion] = tiempo
+        self._muestras += 1
+
+    def _desplazamiento(self, historial: np.ndarray, frames: int) -> Tuple[np.ndarray, np.ndarray, float]:
+        """(dx, dy, ms) entre la muestra actual y la de hace `frames` frames (o la mas vieja disponible)."""
+        atras = min(frames, self._muestras - 1, self.largo_historial - 1)
+        if atras <= 0:
+            return np.zeros(historial.shape[1:]), np.zeros(historial.shape[1:]), 0.0
+        actual = (self._muestras - 1) % self.largo_historial
+        previa = (self._muestras - 1 - atras) % self.largo_historial
+        ahora, antes = historial[actual], historial[previa]
+        validos = (ahora != AUSENTE) & (antes != AUSENTE)                     # Sin las dos posiciones no hay desplazamiento
+        return (np.where(validos, ahora % ANCHO - antes % ANCHO, 0), np.where(validos, ahora // ANCHO - antes // ANCHO, 0),
+                float(self._tiempos[actual] - self._tiempos[previa]))
+
+    def velocidades(self, es_adversario: bool = False, frames: int = 3) -> np.ndarray:
+        """
+        Velocidad estimada de cada jugador de un equipo en sectores por segundo.
+
+        args:
+            es_adversario (bool): Flag para indicar de que equipo se calculan.
+            frames (int): Cuantos frames hacia atras se mira.
+        returns:
+            np.ndarray: Forma (n, 2) en el orden de self.numeros.
+        """
+        dx, dy, ms = self._desplazamiento(self._historial[RIVAL if es_adversario else PROPIO], frames)
+        if ms <= 0:
+            return np.zeros((len(dx), 2))
+        return np.stack((dx, dy), axis=1) * (1000 / ms)
+
+    def velocidad_pelota(self, frames: int = 3) -> Tuple[float, float]:
+        """Velocidad estimada de la pelota en sectores por segundo."""
+        dx, dy, ms = self._desplazamiento(self._historial_pelota[:, None], frames)
+        if ms <= 0:
+            return (0.0, 0.0)
+        return (float(dx[0]) * 1000 / ms, float(dy[0]) * 1000 / ms)
+
+    def posicion(self, numero: int, es_adversario: bool = False) -> Optional[Tuple[int, int]]:
+        canal = RIVAL if es_adversario else PROPIO
+        slot = self.slots[canal].get(numero)
+        if slot is None or self.sectores[canal][slot] == AUSENTE:
+            return None
+        return divmod(int(self.sectores[canal][slot]), ANCHO)[::-1]
+
+    def anticipar(self, numero: int, es_adversario: bool = False, milisegundos: float = 100, frames: int = 3) -> Optional[Tuple[int, int]]:
+        """
+        Posicion estimada de un jugador dentro de `milisegundos`, siguiendo su velocidad actual.
+
+        returns:
+            Tuple[int, int]: (x, y) dentro de la cancha. None si el jugador no esta en la cancha.
+        """
+        posicion = self.posicion(numero, es_adversario)
+        if posicion is None:
+            return None
+        canal = RIVAL if es_adversario else PROPIO
+        vx, vy = self.velocidades(es_adversario, frames)[self.slots[canal][numero]]
+        return _en_cancha(posicion[0] + vx * milisegundos / 1000, posicion[1] + vy * milisegundos / 1000)
+
+    def pelota_anticipada(self, milisegundos: float = 100, frames: int = 3) -> Tuple[int, int]:
+        """Posicion estimada de la pelota: la de su poseedor si alguien la tiene, o siguiendo su velocidad."""
+        if self.poseedor is not None:
+            anticipada = self.anticipar(*self.poseedor, milisegundos=milisegundos, frames=frames)
+            if anticipada is not None:
+                return anticipada
+        vx, vy = self.velocidad_pelota(frames)
+        y, x = divmod(self.pelota, ANCHO)
+        return _en_cancha(x + vx * milisegundos / 1000, y + vy * milisegundos / 1000)
+
+    def distancias_pelota(self, es_adversario: bool = False) -> np.ndarray:
+        """Distancia de cada jugador de un equipo a la pelota, en el orden de self.numeros (infinita si esta ausente)."""
+        return self._distancias_sectores[RIVAL if es_adversario else PROPIO][:, self.pelota]
+
+    def control(self) -> np.ndarray:
+        """
+        Mapa de control de la cancha: que equipo tiene un jugador mas cerca de cada sector.
+        Se recalcula solo si alguien se movio desde la ultima consulta.
+
+        returns:
+            np.ndarray: Forma (ALTO, ANCHO) con 1 si llega antes tu equipo, -1 el rival y 0 empate.
+        """
+        if self._control is None:
+            minimos = [distancias.min(axis=0) if len(distancias) else np.full(EUCLIDEA.shape[0], np.inf)
+                       for distancias in self._distancias_sectores]
+            # Sin jugadores en la cancha los dos minimos son infinitos: empate
+            diferencia = np.nan_to_num(minimos[RIVAL] - minimos[PROPIO], nan=0.0)
+            self._control = np.sign(diferencia).astype(np.int8).reshape(ALTO, ANCHO)
+        return self._control
+
+def _distancias(origenes: np.ndarray, destinos: np.ndarray) -> np.ndarray:
+    """Distancias entre dos listas de sectores, forma (origenes, destinos). Infinita si alguno es AUSENTE."""
+    distancias = EUCLIDEA[np.ix_(origenes, destinos)]
+    return np.where((origenes[:, None] != AUSENTE) & (destinos[None, :] != AUSENTE), distancias, np.inf)
+
+def _en_cancha(x: float, y: float) -> Tuple[int, int]:
+    return (min(max(int(round(x)), 0), ANCHO - 1), min(max(int(round(y)), 0), ALTO - 1))
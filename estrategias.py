@@ -0,0 +1,398 @@
+"""
+Registro de estrategias intercambiables en caliente, sin cortar la conexion.
+
+Una estrategia es un modulo que define ESTRATEGIAS con el mismo formato que usa el planificador
+(por tipo de mensaje: estrategia rapida y estrategia completa anytime o None) y, opcionalmente,
+PRESUPUESTO_MS: el tiempo maximo de su estrategia rapida por frame. Se nombra como 'modulo' o
+'modulo:atributo' (igual que en replay.py).
+
+    cargar('mi_estrategia')   Importa el modulo en un hilo aparte (una copia nueva del modulo,
+                              con un nombre propio en sys.modules: la que esta jugando en este
+                              u otro partido del proceso no se toca), valida el formato y la calienta
+                              con copias de los ultimos frames del partido a nombre de otro
+                              equipo (la memoria por equipo de las estrategias que juegan no
+                              se toca): cada respuesta tiene que ser una accion valida y la
+                              rapida tiene que entrar en su presupuesto. Si pasa, queda pendiente.
+    vigentes()                La llama el planificador al empezar cada frame: si hay una
+                              estrategia pendiente la pone a jugar en ese momento, entre frames.
+
+Mientras juega una estrategia recien cargada se conserva la anterior. Si la rapida nueva lanza
+una excepcion se vuelve a la anterior en ese mismo frame; si lanza la completa (en el hilo del
+planificador, ver fallo_completa) o la rapida se pasa de su presupuesto en EXCESOS_MAXIMOS frames
+seguidos, desde el frame siguiente.
+
+Solo se vuelve a ejecutar el modulo nombrado. Los modulos del repo que importa (utils,
+formacion, pases...) son los mismos que usan los partidos en curso y no se recargan: si se
+editaron despues de arrancar el proceso se avisa al cargar (ver modulos_locales), y para
+usarlos hay que reiniciar el cliente.
+
+Con SIGUSR2 (`kill -USR2 <pid>`) se carga la estrategia escrita en ARCHIVO_ESTRATEGIA en todos
+los partidos en curso del proceso.
+"""
+import collections
+import importlib.util
+import itertools
+import json
+import inspect
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from statistics import quantiles
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from mensajes import CodificadorAcciones, MensajeTienesLaPelota, MensajeReaccionar, decodificar_mensaje
+
+logger = logging.getLogger('estrategias')
+
+PRESUPUESTO_RAPIDA_MS = 5                                                     # Si el modulo no define PRESUPUESTO_MS
+EXCESOS_MAXIMOS = 3                                                           # Frames seguidos fuera de presupuesto antes de volver atras
+FRAMES_RECIENTES = 32                                                         # Frames guardados para calentar las estrategias nuevas
+PASOS_COMPLETA = 3                                                            # Respuestas de la completa que se piden al validarla
+ARCHIVO_ESTRATEGIA = 'estrategia.txt'                                         # Primera linea: 'modulo' o 'modulo:atributo'
+ACCIONES = ('CORRER', 'PATEAR', 'PASAR_PELOTA', 'MARCAR_ADVERSARIO')
+TIPOS = (MensajeTienesLaPelota, MensajeReaccionar)
+PREFIJO_CALENTAMIENTO = 'TOKEN-calentar-estrategia'                           # equipo_id de los frames con que se calienta cada carga
+
+DIRECTORIO_REPO = os.path.dirname(os.path.abspath(__file__))
+
+_cargas = itertools.count()
+_INICIO = time.time()                                                         # Los modulos del repo se importan al arrancar, con este modulo
+
+class EstrategiaInvalida(Exception):
+    """La estrategia no tiene el formato esperado o fallo al calentarla."""
+
+class Version(NamedTuple):
+    nombre: str
+    estrategias: dict                                                         # Por tipo de mensaje: (rapida, completa o None)
+    presupuesto_ms: float                                                     # De la estrategia rapida, por frame
+
+def importar(nombre: str, privado: str):
+    """
+    Ejecuta una copia nueva del modulo con el nombre `privado`. sys.modules[nombre], el que usan
+    los partidos en curso, no se toca; la copia queda en sys.modules[privado] si se ejecuto sin errores.
+    """
+    encontrado = importlib.util.find_spec(nombre)
+    if encontrado is None or encontrado.origin is None:
+        raise EstrategiaInvalida(f'No se encontro el modulo {nombre}')
+    spec = importlib.util.spec_from_file_location(privado, encontrado.origin)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[privado] = modulo                                             # Algunos modulos se buscan a si mismos al ejecutarse (dataclasses)
+    try:
+        spec.loader.exec_module(modulo)
+    except BaseException:
+        del sys.modules[privado]
+        raise
+    return modulo
+
+def _local(modulo) -> bool:
+    archivo = getattr(modulo, '__file__', None)
+    return bool(archivo) and os.path.abspath(archivo).startswith(DIRECTORIO_REPO + os.sep)
+
+def modulos_locales(iniciales) -> Dict[str, str]:
+    """
+    Modulos del repo que usan los iniciales: ellos y los que importan, recursivamente. Se siguen los
+    modulos que aparecen en sus globales (import x) y los de las funciones y clases (from x import f).
+
+    returns:
+        Dict[str, str]: Archivo de cada modulo, por nombre.
+    """
+    encontrados: Dict[str, str] = {}
+    pendientes = [modulo for modulo in iniciales if _local(modulo)]
+    while pendientes:
+        modulo = pendientes.pop()
+        if modulo.__name__ in encontrados:
+            continue
+        encontrados[modulo.__name__] = os.path.abspath(modulo.__file__)
+        for valor in list(vars(modulo).values()):
+            usado = valor if inspect.ismodule(valor) else sys.modules.get(getattr(valor, '__module__', None) or '')
+            if usado is not None and usado.__name__ not in encontrados and _local(usado):
+                pendientes.append(usado)
+    return encontrados
+
+def modificados(modulo) -> List[str]:
+    """Modulos del repo que usa `modulo` (sin contarlo) editados despues de arrancar el proceso: no se recargan."""
+    return sorted(nombre for nombre, archivo in modulos_locales([modulo]).items()
+                  if nombre != modulo.__name__ and os.path.getmtime(archivo) > _INICIO)
+
+def validar_formato(estrategias) -> dict:
+    if not isinstance(estrategias, dict):
+        raise EstrategiaInvalida(f'ESTRATEGIAS tiene que ser un dict, no {type(estrategias).__name__}')
+    for tipo in TIPOS:
+        par = estrategias.get(tipo)
+        if not isinstance(par, tuple) or len(par) != 2:
+            raise EstrategiaInvalida(f'Falta la estrategia (rapida, completa) para {tipo.__name__}')
+        rapida, completa = par
+        if not callable(rapida) or not (completa is None or callable(completa)):
+            raise EstrategiaInvalida(f'Las estrategias de {tipo.__name__} no son funciones')
+    return estrategias
+
+def validar_accion(accion) -> str:
+    try:
+        mensaje_id = json.loads(accion).get('mensaje_id')
+    except (TypeError, ValueError, AttributeError):
+        raise EstrategiaInvalida(f'La respuesta no es una accion JSON: {accion!r}') from None
+    if mensaje_id not in ACCIONES:
+        raise EstrategiaInvalida(f'Accion desconocida: {mensaje_id}')
+    return accion
+
+def aislar(mensajes: List, equipo_id: str, nuevo_id: str) -> List:
+    """
+    Copias de los mensajes con el equipo renombrado. Calentar con ellas no toca lo que las
+    estrategias guardan por equipo_id (formacion.MoverEquipo) ni el indice guardado en los mensajes.
+    """
+    return [decodificar_mensaje(mensaje.model_dump_json(by_alias=True).replace(equipo_id, nuevo_id)) for mensaje in mensajes]
+
+def calentar(version: Version, mensajes: List, codificador: CodificadorAcciones, equipo_id: str) -> float:
+    """
+    Corre la version sobre los mensajes: la rapida en todos y la completa en el primero de cada tipo.
+
+    returns:
+        float: p90 de la estrategia rapida en ms, sin contar la primera pasada.
+    raises:
+        EstrategiaInvalida: Si alguna respuesta no es una accion o la rapida no entra en el presupuesto.
+    """
+    tiempos: List[float] = []
+    for pasada in range(2):                                                   # La primera pasada solo calienta
+        for mensaje in mensajes:
+            rapida, _ = version.estrategias[type(mensaje)]
+            inicio = time.perf_counter_ns()
+            accion = rapida(codificador, mensaje, equipo_id)
+            if pasada:
+                tiempos.append((time.perf_counter_ns() - inicio) / 1e6)
+            validar_accion(accion)
+
+    for tipo in TIPOS:
+        _, completa = version.estrategias[tipo]
+        mensaje = next((m for m in mensajes if type(m) is tipo), None)
+        if completa is None or mensaje is None:
+            continue
+        generador = completa(codificador, mensaje, equipo_id)
+        try:
+            for paso, accion in enumerate(generador, 1):
+                validar_accion(accion)
+                if paso >= PASOS_COMPLETA:
+                    break
+        finally:
+            generador.close()
+
+    if not tiempos:
+        return 0.0
+    p90 = quantiles(tiempos, n=10)[8] if len(tiempos) > 1 else tiempos[0]
+    if p90 > version.presupuesto_ms:
+        raise EstrategiaInvalida(f'La estrategia rapida tarda {p90:.2f} ms (p90), presupuesto {version.presupuesto_ms} ms')
+    return p90
+
+def olvidar_equipo(estrategias: dict, equipo_id: str):
+    """Llama a olvidar(equipo_id) de las estrategias que guardan memoria por equipo (como formacion.MoverEquipo)."""
+    for funciones in estrategias.values():
+        for funcion in funciones:
+            olvidar = getattr(funcion, 'olvidar', None)
+            if callable(olvidar):
+                olvidar(equipo_id)
+
+class RegistroEstrategias:
+    """
+    Estrategia que esta jugando, la anterior (para volver atras) y la que se esta cargando.
+
+    args:
+        estrategias (dict): Estrategias iniciales, con el formato del planificador.
+        codificador (CodificadorAcciones | None), equipo_id (str | None): Los del partido. Las nuevas se
+            calientan con copias de los frames recientes a nombre de otro equipo (ver aislar); sin
+            equipo_id, con frames sinteticos.
+        nombre (str): Nombre de las iniciales para los logs.
+        presupuesto_ms (float): Presupuesto de la rapida inicial. Sin vuelta atras no se usa.
+        frames_recientes (int): Cuantos frames se guardan para calentar las nuevas.
+    """
+
+    def __init__(self, estrategias: dict, codificador: Optional[CodificadorAcciones] = None, equipo_id: Optional[str] = None,
+                 nombre: str = 'inicial', presupuesto_ms: float = PRESUPUESTO_RAPIDA_MS,
+                 frames_recientes: int = FRAMES_RECIENTES):
+        self.activa = Version(nombre, validar_formato(estrategias), presupuesto_ms)
+        self.codificador = codificador
+        self.equipo_id = equipo_id
+        self.anterior: Optional[Version] = None
+        self.recientes: Deque = collections.deque(maxlen=frames_recientes)
+        self.cambios = 0
+        self.reversiones = 0
+        self._pendiente: Optional[Version] = None
+        self._excesos = 0
+        self._ejecutor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()                                         # Una carga por vez
+        self._lock_pendiente = threading.Lock()                               # Entrega de la pendiente entre el hilo de carga y el planificador
+        self._fallida: Optional[Version] = None                               # Version cuya completa lanzo, marcada desde el hilo del planificador
+
+    def cargar(self, nombre: str) -> Future:
+        """
+        Importa, valida y calienta la estrategia en un hilo aparte. Si pasa queda pendiente hasta el proximo frame.
+
+        args:
+            nombre (str): 'modulo' o 'modulo:atributo' (por defecto ESTRATEGIAS).
+        returns:
+            Future: Resuelve con la Version cargada, o con la excepcion si no paso la validacion.
+        """
+        if self._ejecutor is None:
+            self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='estrategias')
+        futuro = self._ejecutor.submit(self._cargar, nombre)
+        futuro.add_done_callback(_informar_carga)
+        return futuro
+
+    def _cargar(self, nombre: str) -> Version:
+        with self._lock:
+            inicio = time.perf_counter()
+            carga = next(_cargas)
+            modulo_nombre, _, atributo = nombre.partition(':')
+            try:
+                modulo = importar(modulo_nombre, f'_estrategia{carga}_{modulo_nombre.replace(".", "_")}')
+            except EstrategiaInvalida:
+                raise
+            except Exception as e:
+                raise EstrategiaInvalida(f'Error al importar {modulo_nombre}: {e!r}') from e
+            estrategias = getattr(modulo, atributo or 'ESTRATEGIAS', None)
+            if estrategias is None:
+                raise EstrategiaInvalida(f'{modulo_nombre} no define {atributo or "ESTRATEGIAS"}')
+            version = Version(nombre, validar_formato(estrategias), float(getattr(modulo, 'PRESUPUESTO_MS', PRESUPUESTO_RAPIDA_MS)))
+            viejos = modificados(modulo)
+            if viejos:
+                logger.warning('%s usa modulos editados despues de arrancar que no se recargan: %s', nombre, ', '.join(viejos))
+
+            equipo_id = self.equipo_id
+            mensajes = list(self.recientes.copy())
+            if not mensajes or equipo_id is None:
+                from precalentar import frames_sinteticos                     # Solo si todavia no hay frames del partido
+                from teams import TEAM_PIN
+                equipo_id, crudos = frames_sinteticos(TEAM_PIN)
+                mensajes = [decodificar_mensaje(raw) for raw in crudos]
+            # Otro equipo_id en cada carga: tampoco se pisan dos cargas de partidos distintos
+            aislado = f'{PREFIJO_CALENTAMIENTO}-{carga}'
+            try:
+                p90 = calentar(version, aislar(mensajes, equipo_id, aislado), CodificadorAcciones(aislado), aislado)
+            except EstrategiaInvalida:
+                raise
+            except Exception as e:
+                raise EstrategiaInvalida(f'Fallo al calentarla: {e!r}') from e
+            finally:
+                olvidar_equipo(version.estrategias, aislado)
+
+            with self._lock_pendiente:
+                self._pendiente = version
+            logger.warning('Estrategia %s lista en %.0f ms (rapida p90 %.2f ms, presupuesto %.1f ms). Entra en el proximo frame',
+                           nombre, (time.perf_counter() - inicio) * 1000, p90, version.presupuesto_ms)
+            return version
+
+    def vigentes(self) -> dict:
+        """
+        Estrategias para el frame que empieza. Aca, entre frames, se vuelve atras si fallo la completa
+        y entra la pendiente si la hay.
+        """
+        with self._lock_pendiente:
+            pendiente, self._pendiente = self._pendiente, None
+            fallida, self._fallida = self._fallida, None
+        if fallida is not None and fallida is self.activa:
+            self.revertir('error en la estrategia completa')
+        if pendiente is not None:
+            self.anterior, self.activa = self.activa, pendiente
+            self._excesos = 0
+            self.cambios += 1
+            logger.warning('Jugando con la estrategia %s (antes %s)', pendiente.nombre, self.anterior.nombre)
+        return self.activa.estrategias
+
+    def responder(self, codificador: CodificadorAcciones, mensaje, equipo_id: str) -> str:
+        """
+        Corre la estrategia rapida vigente para el mensaje, controlando errores y presupuesto.
+        Guarda el mensaje entre los recientes.
+        """
+        self.recientes.append(mensaje)
+        version = self.activa
+        rapida, _ = version.estrategias[type(mensaje)]
+        inicio = time.perf_counter_ns()
+        try:
+            accion = rapida(codificador, mensaje, equipo_id)
+        except Exception:
+            if self.anterior is None:
+                raise
+            logger.exception('La estrategia %s fallo.', version.nombre)
+            self.revertir('error')
+            rapida, _ = self.activa.estrategias[type(mensaje)]
+            return rapida(codificador, mensaje, equipo_id)
+
+        if self.anterior is not None:
+            if (time.perf_counter_ns() - inicio) / 1e6 > version.presupuesto_ms:
+                self._excesos += 1
+                if self._excesos >= EXCESOS_MAXIMOS:
+                    self.revertir(f'{self._excesos} frames seguidos sobre {version.presupuesto_ms} ms')
+            else:
+                self._excesos = 0
+        return accion
+
+    def fallo_completa(self, version: Version):
+        """La completa de `version` lanzo una excepcion. Se llama desde el hilo del planificador: la vuelta atras queda para vigentes()."""
+        with self._lock_pendiente:
+            self._fallida = version
+
+    def revertir(self, motivo: str):
+        """Vuelve a la estrategia anterior. Solo hay un nivel de vuelta atras."""
+        if self.anterior is None:
+            return
+        descartada, self.activa, self.anterior = self.activa, self.anterior, None
+        self._excesos = 0
+        self.reversiones += 1
+        logger.error('Estrategia %s descartada (%s). Vuelve %s', descartada.nombre, motivo, self.activa.nombre)
+
+    def olvidar(self):
+        """Descarta la memoria que las estrategias guardan para el equipo del partido (ver olvidar_equipo)."""
+        if self.equipo_id is None:
+            return
+        for version in (self.activa, self.anterior, self._pendiente):
+            if version is not None:
+                olvidar_equipo(version.estrategias, self.equipo_id)
+
+    def cerrar(self):
+        self.olvidar()
+        if self in registros_en_curso:
+            registros_en_curso.remove(self)
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+def _informar_carga(futuro: Future):
+    if not futuro.cancelled() and futuro.exception() is not None:
+        logger.error('No se cargo la estrategia: %s', futuro.exception())
+
+# Registros de los partidos que se estan jugando en este proceso
+registros_en_curso: List[RegistroEstrategias] = []
+
+def iniciar_registro(estrategias: dict, codificador: Optional[CodificadorAcciones] = None,
+                     equipo_id: Optional[str] = None) -> RegistroEstrategias:
+    registro = RegistroEstrategias(estrategias, codificador, equipo_id)
+    registros_en_curso.append(registro)
+    return registro
+
+def cargar_en_curso(nombre: str) -> List[Future]:
+    """Carga la estrategia en todos los partidos en curso."""
+    return [registro.cargar(nombre) for registro in list(registros_en_curso)]
+
+def leer_archivo_estrategia(archivo: str = ARCHIVO_ESTRATEGIA) -> Optional[str]:
+    try:
+        with open(archivo, encoding='utf-8') as entrada:
+            return entrada.readline().strip() or None
+    except OSError:
+        return None
+
+def instalar_senal_recarga(loop, archivo: str = ARCHIVO_ESTRATEGIA):
+    """
+    Con SIGUSR2 (`kill -USR2 <pid>`) carga en los partidos en curso la estrategia escrita en el archivo.
+    En Windows no hay SIGUSR2: queda cargar_en_curso() para llamarlo desde el codigo.
+    """
+    def recargar():
+        nombre = leer_archivo_estrategia(archivo)
+        if nombre is None:
+            logger.error('No hay estrategia para cargar en %s', archivo)
+            return
+        logger.warning('Cargando la estrategia %s...', nombre)
+        cargar_en_curso(nombre)
+
+    if hasattr(signal, 'SIGUSR2'):
+        loop.add_signal_handler(signal.SIGUSR2, recargar)
@@ -0,0 +1,270 @@
+"""
+Movimiento de todo el equipo con un solo CORRER.
+
+En cada REACCIONAR se arman los objetivos del equipo:
+
+    presion:    el sector de la pelota (y con la pelota del rival, un sector de cobertura entre la pelota y el arco propio).
+    marcas:     un sector del lado del arco propio de los MARCAS rivales mas cercanos a ese arco.
+    formacion:  las posiciones de `Equipo.formacion` (grilla.posiciones_formacion), corridas hacia la pelota.
+
+Los jugadores se asignan a los objetivos con el algoritmo hungaro (`asignar`), minimizando los
+pasos totales. Hay mas objetivos que jugadores: la presion y las marcas tienen prioridad y los
+puestos de formacion que sobran quedan libres. Se premia repetir la asignacion del frame
+anterior, para que los jugadores no cambien de objetivo por un sector de diferencia.
+Cada asignacion arranca de la del frame anterior (ver `asignar`), y si la cancha y los
+objetivos no cambiaron se reutiliza sin recalcular.
+
+Si el rival tiene la pelota y el jugador que presiona ya esta a un paso, se envia
+MARCAR_ADVERSARIO para intentar quitarsela en lugar del CORRER.
+"""
+import logging
+from math import inf
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from mensajes import CodificadorAcciones, MensajeReaccionar
+from grilla import ANCHO, ALTO, posiciones_formacion
+from tablas import PASOS
+from utils import CanchaIndex, Movimiento, buscar_pelota, indexar_cancha
+
+logger = logging.getLogger('formacion')
+
+MARCAS = 3                                                                    # Rivales marcados, ademas del poseedor
+PRIORIDAD = 100.0                                                             # Descuento de los objetivos de presion y marca: siempre se cubren
+ESTABILIDAD = 1.5                                                             # Descuento (en pasos) por mantener el objetivo del frame anterior
+CORRIMIENTO_X = 0.4                                                           # Cuanto sigue la formacion a la pelota en cada eje
+CORRIMIENTO_Y = 0.5
+EPSILON = 1e-9
+SIN_ASIGNAR = 1e9                                                             # Costo de las columnas de relleno que no corresponden a la fila
+
+# --- Asignacion ---
+
+def asignar(costos: List[List[float]], inicial: Optional[List[int]] = None,
+            v: Optional[List[float]] = None) -> Tuple[List[int], List[float]]:
+    """
+    Asignacion de costo minimo: algoritmo hungaro con potenciales (caminos aumentantes mas cortos).
+
+    Es O(n^2 m), en Python puro: con 11 jugadores y ~16 objetivos es mas rapido que con numpy,
+    donde cada paso es una operacion sobre un array chico. La matriz se completa a cuadrada con
+    filas de costo 0 (los objetivos que quedan libres). Se puede arrancar desde la asignacion y
+    los potenciales de columna del frame anterior: los pares que siguen siendo ajustados (costo
+    reducido 0) se conservan y solo se buscan caminos para las filas que quedan libres.
+
+    args:
+        costos (List[List[float]]): Matriz n x m con n <= m: costo de asignar cada fila a cada columna.
+        inicial (List[int] | None): Columna de cada fila en la asignacion anterior (-1 sin columna).
+        v (List[float | None] | None): Potenciales de columna de la asignacion anterior (None en las columnas nuevas).
+    returns:
+        Tuple[List[int], List[float]]: Columna asignada a cada fila (cada columna a lo sumo una vez) y
+                                       los potenciales de columna, para arrancar desde ahi el proximo frame.
+    """
+    n, m = len(costos), len(costos[0]) if costos else 0
+    if n > m:
+        raise ValueError(f'Hay mas filas que columnas: {n}x{m}')
+    costos = costos + [[0.0] * m] * (m - n)
+    # Potenciales: costo reducido = costo - u[fila] - v[columna] >= 0, y 0 en los pares asignados
+    conocidas = [j for j in range(m) if v is not None and v[j] is not None]
+    if conocidas:
+        v = list(v)
+        u = [min([fila[j] - v[j] for j in conocidas]) for fila in costos]
+        for j in range(m):
+            if v[j] is None:                                                  # Objetivo nuevo: el mayor potencial que no rompe ningun costo reducido
+                v[j] = min([fila[j] - u[i] for i, fila in enumerate(costos)])
+    else:
+        v = [0.0] * m
+        u = [min(fila) for fila in costos]
+    fila_de = [-1] * m
+    columna_de = [-1] * m
+    for i, j in enumerate(inicial or ()):
+        if j >= 0 and fila_de[j] < 0 and costos[i][j] - u[i] - v[j] <= EPSILON:
+            fila_de[j], columna_de[i] = i, j
+    for i, fila in enumerate(costos):                                         # Las filas libres toman una columna libre ajustada, si hay
+        if columna_de[i] < 0:
+            j = min((j for j in range(m) if fila_de[j] < 0), key=lambda j: fila[j] - v[j])
+            if fila[j] - u[i] - v[j] <= EPSILON:
+                fila_de[j], columna_de[i] = i, j
+
+    for i in range(m):
+        if columna_de[i] >= 0:
+            continue
+        minimo = [inf] * m                                                    # Menor costo reducido para llegar a cada columna
+        camino = [-1] * m                                                     # Columna anterior en el camino (-1: desde la fila i)
+        libres = list(range(m))
+        usadas: List[int] = []
+        filas = [i]
+        actual, columna = i, -1
+        while True:
+            fila, potencial = costos[actual], u[actual]
+            delta, siguiente = inf, -1
+            for j in libres:
+                reducido = fila[j] - potencial - v[j]
+                if reducido < minimo[j]:
+                    minimo[j], camino[j] = reducido, columna
+                if minimo[j] < delta:
+                    delta, siguiente = minimo[j], j
+            for k in filas:
+                u[k] += delta
+            for j in usadas:
+                v[j] -= delta
+            for j in libres:
+                minimo[j] -= delta
+            libres.remove(siguiente)
+            usadas.append(siguiente)
+            if fila_de[siguiente] < 0:
+                break
+            columna, actual = siguiente, fila_de[siguiente]
+            filas.append(actual)
+
+        j = siguiente                                                         # Se invierte el camino aumentante
+        while j >= 0:
+            anterior = camino[j]
+            fila = i if anterior < 0 else fila_de[anterior]
+            fila_de[j], columna_de[fila] = fila, j
+            j = anterior
+    return columna_de[:n], v
+
+# --- Objetivos ---
+
+class Objetivo(NamedTuple):
+    clave: tuple                                                              # Identifica el objetivo entre frames: ('presion',), ('marca', n), ('puesto', i)
+    x: int
+    y: int
+    prioritario: bool
+
+@lru_cache(maxsize=32)
+def _puestos(formacion: str, rol: int) -> Tuple[Tuple[int, int], ...]:
+    return tuple(posiciones_formacion(formacion, rol))
+
+def _acotar(x: float, y: float) -> Tuple[int, int]:
+    return min(max(int(round(x)), 0), ANCHO - 1), min(max(int(round(y)), 0), ALTO - 1)
+
+def objetivos(indice: CanchaIndex) -> List[Objetivo]:
+    """Objetivos del equipo para la cancha: presion, marcas y puestos de la formacion."""
+    cancha = indice.cancha
+    propio = cancha.equipo1 if cancha.equipo1.id == f'equipo:{indice.equipo_id}' else cancha.equipo2
+    arco = indice.arco_propio[1]
+    hacia_arco = -1 if arco.y == 0 else 1
+    pelota = indice.pelota
+    lista: List[Objetivo] = []
+
+    if indice.poseedor is None or indice.poseedor_es_adversario:
+        lista.append(Objetivo(('presion',), pelota.x, pelota.y, True))
+    if indice.poseedor_es_adversario:
+        lista.append(Objetivo(('cobertura',), *_acotar(pelota.x + (arco.x - pelota.x) / 3, pelota.y + 2 * hacia_arco), True))
+
+    # Marcas: los rivales mas cercanos al arco propio, sin contar al que tiene la pelota
+    rivales = [(abs(coord.y - arco.y) + abs(coord.x - arco.x), numero, coord)
+               for numero, coord in indice.adversarios.items()
+               if not (indice.poseedor_es_adversario and numero == indice.poseedor)]
+    for _, numero, coord in sorted(rivales)[:MARCAS]:
+        lista.append(Objetivo(('marca', numero), *_acotar(coord.x, coord.y + hacia_arco), True))
+
+    # Formacion corrida hacia la pelota. El arquero (puesto 0) solo acompaña en x, dentro del ancho del arco
+    puestos = _puestos(propio.formacion, propio.rol)
+    centro_x, centro_y = (ANCHO - 1) / 2, (ALTO - 1) / 2
+    dx = (pelota.x - centro_x) * CORRIMIENTO_X
+    dy = (pelota.y - centro_y) * CORRIMIENTO_Y
+    for i, (x, y) in enumerate(puestos):
+        if i == 0:
+            lista.append(Objetivo(('puesto', 0), min(max(pelota.x, arco.x - 1), arco.x + 1), y, False))
+        else:
+            lista.append(Objetivo(('puesto', i), *_acotar(x + dx, y + dy), False))
+    return lista
+
+# --- Estrategia ---
+
+class _Memoria:
+    """Ultima asignacion de un equipo, para reutilizarla y para premiar la estabilidad."""
+    __slots__ = ('clave_cancha', 'movimientos', 'asignados', 'potenciales')
+
+    def __init__(self):
+        self.clave_cancha: Optional[tuple] = None
+        self.movimientos: List[Movimiento] = []
+        self.asignados: Dict[int, tuple] = {}                                # Numero de jugador -> clave de su objetivo
+        self.potenciales: Dict[tuple, float] = {}                             # Clave de objetivo -> potencial de su columna
+
+class MoverEquipo:
+    """
+    Estrategia para REACCIONAR que mueve a todos los jugadores con un solo CORRER.
+    Guarda la ultima asignacion de cada equipo (por equipo_id) hasta que se llama a olvidar.
+    """
+
+    def __init__(self):
+        self._memorias: Dict[str, _Memoria] = {}
+        self.recalculos = 0
+        self.reutilizados = 0
+
+    def olvidar(self, equipo_id: str):
+        """Descarta la asignacion guardada de un equipo (al terminar su partido)."""
+        self._memorias.pop(equipo_id, None)
+
+    def planear(self, indice: CanchaIndex) -> List[Movimiento]:
+        """
+        Asigna cada jugador a un objetivo.
+
+        returns:
+            List[Movimiento]: Un movimiento por jugador que no esta en su objetivo.
+        """
+        memoria = self._memorias.get(indice.equipo_id)
+        if memoria is None:
+            memoria = self._memorias[indice.equipo_id] = _Memoria()
+
+        lista = objetivos(indice)
+        numeros = list(indice.jugadores)
+        sectores = np.array([coord.y * ANCHO + coord.x for coord in indice.jugadores.values()], dtype=np.intp)
+        destinos = np.array([o.y * ANCHO + o.x for o in lista], dtype=np.intp)
+        clave_cancha = (tuple(numeros), sectores.tobytes(), destinos.tobytes())
+        if clave_cancha == memoria.clave_cancha:
+            self.reutilizados += 1
+            return memoria.movimientos
+
+        costos = PASOS[sectores[:, None], destinos].astype(float)
+        costos -= PRIORIDAD * np.array([o.prioritario for o in lista])
+        claves = [o.clave for o in lista]
+        if len(numeros) > len(lista):
+            # Mas jugadores que objetivos (formacion con menos puestos): los que sobran se quedan donde estan
+            costos = np.concatenate((costos, np.where(np.eye(len(numeros), dtype=bool), 0.0, SIN_ASIGNAR)), axis=1)
+            claves.extend(('quieto', numero) for numero in numeros)
+        columna_de_clave = {clave: j for j, clave in enumerate(claves)}
+        inicial = [columna_de_clave.get(memoria.asignados.get(numero), -1) for numero in numeros]
+        for fila, columna in enumerate(inicial):
+            if columna >= 0:
+                costos[fila, columna] -= ESTABILIDAD
+        v = [memoria.potenciales.get(clave) for clave in claves]
+        columnas, v = asignar(costos.tolist(), inicial, v)
+
+        movimientos: List[Movimiento] = []
+        memoria.asignados = {numero: claves[columna] for numero, columna in zip(numeros, columnas)}
+        memoria.potenciales = dict(zip(claves, v))
+        for numero, columna, sector in zip(numeros, columnas, sectores.tolist()):
+            if columna >= len(lista):
+                continue
+            objetivo = lista[columna]
+            if objetivo.y * ANCHO + objetivo.x != sector:
+                movimientos.append(Movimiento(jugador_numero=numero, x=objetivo.x, y=objetivo.y))
+        memoria.clave_cancha = clave_cancha
+        memoria.movimientos = movimientos
+        self.recalculos += 1
+        return movimientos
+
+    def __call__(self, codificador: CodificadorAcciones, mensaje: MensajeReaccionar, equipo_id: str) -> str:
+        indice = indexar_cancha(mensaje, equipo_id=equipo_id)
+        if indice is None or not indice.jugadores:
+            return buscar_pelota(codificador, mensaje, equipo_id)
+
+        movimientos = self.planear(indice)
+        if indice.poseedor_es_adversario:
+            memoria = self._memorias[equipo_id]
+            presiona = next((numero for numero, clave in memoria.asignados.items() if clave == ('presion',)), None)
+            if presiona is not None:
+                coord, pelota = indice.jugadores[presiona], indice.pelota
+                if abs(coord.x - pelota.x) + abs(coord.y - pelota.y) <= 1:
+                    return codificador.marcar_adversario(jugador=presiona, adversario=indice.poseedor)
+        if not movimientos:
+            return buscar_pelota(codificador, mensaje, equipo_id)
+        logger.info('Movimientos: %d jugadores', len(movimientos))
+        return codificador.correr(movimientos)
+
+mover_equipo = MoverEquipo()
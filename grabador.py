@@ -0,0 +1,160 @@
+"""
+Grabacion binaria de partidos: cada frame recibido y cada accion enviada, sin procesar.
+
+Formato del archivo (little endian):
+    cabecera:  MAGIA (8 bytes) | version (uint16) | epoch_ns (int64) | monotonico_ns (int64)
+    registros: tipo (uint8) | tiempo_ns (int64) | largo (uint32) | datos (largo bytes, utf-8)
+
+tiempo_ns es perf_counter_ns del cliente al recibir/enviar. epoch_ns y monotonico_ns se toman
+juntos al abrir el archivo, para pasar los tiempos a hora de pared si hace falta.
+El archivo solo se agrega al final; si el proceso muere a mitad de un registro, el lector
+se detiene en el ultimo registro completo.
+
+Uso:
+    python grabador.py partidas/partido_XXXX.bin     (resumen de una grabacion)
+"""
+import argparse
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple, Optional
+
+MAGIA = b'PARTIDO\x00'
+VERSION = 1
+CABECERA = struct.Struct('<8sHqq')
+REGISTRO = struct.Struct('<BqI')
+
+ENTRADA = 0                                                                   # Frame recibido del servidor
+SALIDA = 1                                                                    # Accion enviada al servidor
+
+TAMANO_BUFFER = 1 << 20
+
+class Grabador:
+    """
+    Escribe la grabacion desde un hilo propio. entrada() y salida() solo encolan, asi el event
+    loop no espera ni la codificacion ni el disco.
+
+    args:
+        ruta (str): Archivo a crear. Se crea el directorio si no existe.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._archivo = open(ruta, 'wb', buffering=TAMANO_BUFFER)
+        self._archivo.write(CABECERA.pack(MAGIA, VERSION, time.time_ns(), time.perf_counter_ns()))
+        self._cola: queue.SimpleQueue = queue.SimpleQueue()
+        self._hilo = threading.Thread(target=self._escribir, name='grabador', daemon=True)
+        self._hilo.start()
+
+    def entrada(self, tiempo_ns: int, raw: str | bytes):
+        self._cola.put((ENTRADA, tiempo_ns, raw))
+
+    def salida(self, tiempo_ns: int, accion: str | bytes):
+        self._cola.put((SALIDA, tiempo_ns, accion))
+
+    def _escribir(self):
+        archivo = self._archivo
+        while True:
+            try:
+                registro = self._cola.get(timeout=0.5)
+            except queue.Empty:
+                archivo.flush()                                               # Sin actividad: se baja el buffer a disco
+                continue
+            if registro is None:
+                break
+            tipo, tiempo_ns, datos = registro
+            if isinstance(datos, str):
+                datos = datos.encode('utf-8')
+            archivo.write(REGISTRO.pack(tipo, tiempo_ns, len(datos)))
+            archivo.write(datos)
+        archivo.close()
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el archivo."""
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join()
+
+class Registro(NamedTuple):
+    tipo: int
+    tiempo_ns: int
+    datos: bytes
+
+class LectorPartido:
+    """
+    Lee una grabacion mapeandola en memoria: los registros se recorren sin cargar el archivo.
+
+    args:
+        ruta (str): Archivo de grabacion.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'rb')
+        try:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._archivo.close()
+            raise ValueError(f'Grabacion vacia: {ruta}')
+        if len(self._mapa) < CABECERA.size:
+            self.cerrar()
+            raise ValueError(f'Grabacion incompleta: {ruta}')
+        magia, self.version, self.epoch_inicio_ns, self.monotonico_inicio_ns = CABECERA.unpack_from(self._mapa, 0)
+        if magia != MAGIA:
+            self.cerrar()
+            raise ValueError(f'No es una grabacion de partido: {ruta}')
+
+    def __iter__(self) -> Iterator[Registro]:
+        mapa = self._mapa
+        fin = len(mapa)
+        posicion = CABECERA.size
+        while posicion + REGISTRO.size <= fin:
+            tipo, tiempo_ns, largo = REGISTRO.unpack_from(mapa, posicion)
+            inicio = posicion + REGISTRO.size
+            if inicio + largo > fin:
+                break                                                         # Registro cortado al final del archivo
+            yield Registro(tipo, tiempo_ns, mapa[inicio:inicio + largo])
+            posicion = inicio + largo
+
+    def a_epoch_ns(self, tiempo_ns: int) -> int:
+        """Pasa un tiempo de registro a hora de pared (ns desde epoch)."""
+        return self.epoch_inicio_ns + tiempo_ns - self.monotonico_inicio_ns
+
+    def cerrar(self):
+        if getattr(self, '_mapa', None) is not None:
+            self._mapa.close()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo')
+    args = parser.parse_args()
+
+    cantidades, tamanos = [0, 0], [0, 0]
+    primero: Optional[int] = None
+    ultimo = 0
+    with LectorPartido(args.archivo) as lector:
+        for registro in lector:
+            cantidades[registro.tipo] += 1
+            tamanos[registro.tipo] += len(registro.datos)
+            primero = registro.tiempo_ns if primero is None else primero
+            ultimo = registro.tiempo_ns
+    duracion = (ultimo - primero) / 1e9 if primero is not None else 0
+    print(f'{args.archivo}: {duracion:.1f} s, {os.path.getsize(args.archivo) / 1024:.0f} KiB')
+    print(f'  recibidos: {cantidades[ENTRADA]} frames, {tamanos[ENTRADA] / 1024:.0f} KiB')
+    print(f'  enviados:  {cantidades[SALIDA]} acciones, {tamanos[SALIDA] / 1024:.0f} KiB')
+
+if __name__ == '__main__':
+    main()
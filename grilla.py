@@ -0,0 +1,122 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from mensajes import Coordenada
+
+# Dimensiones de la cancha: el id de sector es y * ANCHO + x. Los arcos estan en y=0 e y=ALTO-1.
+ANCHO = 13
+ALTO = 20
+N_SECTORES = ANCHO * ALTO
+
+PROPIO = 0
+RIVAL = 1
+
+def sector_id(x: int, y: int) -> int:
+    """Devuelve el id del sector de una posicion de la grilla."""
+    return y * ANCHO + x
+
+def posiciones_formacion(formacion: str, rol: int) -> List[Tuple[int, int]]:
+    """
+    Posiciones iniciales de una formacion tipo "4-4-2": arquero y lineas repartidas en el propio campo.
+    El equipo de rol 1 defiende el arco de y=0 y el de rol 2 el de y=ALTO-1.
+    """
+    try:
+        lineas = [int(cantidad) for cantidad in formacion.split('-')]
+    except ValueError:
+        lineas = [4, 4, 2]
+
+    posiciones = [(ANCHO // 2, 0)]
+    mitad = ALTO // 2
+    for i, cantidad in enumerate(lineas):
+        y = 2 + round(i * (mitad - 3) / max(len(lineas) - 1, 1))
+        for j in range(cantidad):
+            x = round((j + 1) * (ANCHO - 1) / (cantidad + 1))
+            posiciones.append((x, y))
+
+    if rol == 2:
+        posiciones = [(x, ALTO - 1 - y) for x, y in posiciones]
+    return posiciones
+
+class Grilla:
+    """
+    Representacion de la cancha con arrays de numpy.
+
+    atributos:
+        ocupacion (np.ndarray): Cantidad de jugadores por sector, forma (2, ALTO, ANCHO).
+                                El canal PROPIO es tu equipo y el canal RIVAL el adversario.
+        numeros (List[np.ndarray]): Numeros de camiseta de cada equipo, indexado por PROPIO/RIVAL.
+        posiciones (List[np.ndarray]): Posiciones (x, y) de cada equipo, forma (n, 2).
+        pelota (np.ndarray): Posicion (x, y) de la pelota.
+    """
+    __slots__ = ('ocupacion', 'numeros', 'posiciones', 'pelota')
+
+    def __init__(self, jugadores: Dict[int, Coordenada], adversarios: Dict[int, Coordenada], pelota: Coordenada):
+        self.numeros: List[np.ndarray] = []
+        self.posiciones: List[np.ndarray] = []
+        ocupacion = []
+
+        for equipo in (jugadores, adversarios):
+            posiciones = np.array([(coord.x, coord.y) for coord in equipo.values()], dtype=np.intp).reshape(-1, 2)
+            ocupacion.append(np.bincount(posiciones[:, 1] * ANCHO + posiciones[:, 0], minlength=N_SECTORES))
+            self.numeros.append(np.array(list(equipo), dtype=np.intp))
+            self.posiciones.append(posiciones)
+
+        self.ocupacion = np.stack(ocupacion).astype(np.int8).reshape(2, ALTO, ANCHO)
+        self.pelota = np.array((pelota.x, pelota.y), dtype=np.intp)
+
+    def distancias_cuadradas(self, x: int, y: int, es_adversario: bool = False) -> np.ndarray:
+        """
+        Distancia euclidiana al cuadrado de cada jugador de un equipo a una posicion.
+        Al no tener raiz cuadrada los empates se conservan exactos.
+
+        args:
+            x (int), y (int): Posicion.
+            es_adversario (bool): Flag para indicar de que equipo se calculan las distancias.
+        returns:
+            np.ndarray: Distancias al cuadrado en el orden de self.numeros.
+        """
+        diferencia = self.posiciones[RIVAL if es_adversario else PROPIO] - (x, y)
+        return np.einsum('ij,ij->i', diferencia, diferencia)
+
+    def mas_cercano(self, x: int, y: int, es_adversario: bool = False) -> int | None:
+        """
+        Obtiene el jugador mas cercano a una posicion. Ante un empate gana el primero en el orden de la cancha.
+
+        args:
+            x (int), y (int): Posicion.
+            es_adversario (bool): Flag para indicar de que equipo se busca el jugador.
+        returns:
+            int: Numero del jugador mas cercano. None si el equipo no tiene jugadores.
+        """
+        canal = RIVAL if es_adversario else PROPIO
+        if len(self.numeros[canal]) == 0:
+            return None
+        return int(self.numeros[canal][np.argmin(self.distancias_cuadradas(x, y, es_adversario))])
+
+    def k_mas_cercanos(self, x: int, y: int, k: int, es_adversario: bool = False) -> List[int]:
+        """
+        Obtiene los k jugadores mas cercanos a una posicion, ordenados de menor a mayor distancia.
+
+        args:
+            x (int), y (int): Posicion.
+            k (int): Cantidad de jugadores.
+            es_adversario (bool): Flag para indicar de que equipo se buscan los jugadores.
+        returns:
+            List[int]: Numeros de los jugadores.
+        """
+        canal = RIVAL if es_adversario else PROPIO
+        orden = np.argsort(self.distancias_cuadradas(x, y, es_adversario), kind='stable')[:k]
+        return self.numeros[canal][orden].tolist()
+
+    def mas_cercano_a_pelota(self, es_adversario: bool = False) -> int | None:
+        """Obtiene el jugador de un equipo mas cercano a la pelota."""
+        return self.mas_cercano(int(self.pelota[0]), int(self.pelota[1]), es_adversario)
+
+    def distancias_cruzadas(self) -> np.ndarray:
+        """
+        Distancia euclidiana entre cada jugador propio y cada adversario.
+
+        returns:
+            np.ndarray: Matriz de forma (jugadores, adversarios) en el orden de self.numeros.
+        """
+        diferencia = self.posiciones[PROPIO][:, None, :] - self.posiciones[RIVAL][None, :, :]
+        return np.sqrt(np.einsum('ijk,ijk->ij', diferencia, diferencia))
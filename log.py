@@ -1,17 +1,59 @@
+import atexit
 import logging
 import logging.config
+import logging.handlers
 import datetime
+import queue
 import sys # Para salida a consola
 
 now = datetime.datetime.now()
 now_formatted = now.strftime("%Y%m%d_%H%M%S")
 
-def setup_logging(id: int):
+# Loggers que escriben en cada frame (entre que llega un mensaje y se responde)
+HOT_PATH_LOGGERS = ('client', 'utils', 'pases', 'formacion', 'planificador', 'estado', 'envio', 'montecarlo')
+# Argumentos que se pueden formatear despues en el hilo del listener: no cambian despues de loguear
+_ARGS_INMUTABLES = frozenset((str, int, float, bool, bytes, type(None)))
+_formateador = logging.Formatter()
+
+_listener: logging.handlers.QueueListener | None = None
+
+class _ColaHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro sin formatearlo cuando sus %-args son inmutables: el armado del mensaje
+    y la escritura a consola/disco quedan a cargo del hilo del QueueListener, fuera del event loop.
+    Con otros args (mensajes decodificados, dicts) el mensaje se arma aca, antes de que el hot path
+    los modifique. El traceback de exc_info se pasa a texto para no mantener vivos sus frames.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _formateador.formatException(record.exc_info)
+            record.exc_info = None
+        args = record.args
+        if args and (type(args) is not tuple or any(type(arg) not in _ARGS_INMUTABLES for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def configurar_hot_path(silencioso: bool):
+    """
+    Activa o desactiva el modo silencioso del hot path para el partido actual.
+    En modo silencioso los loggers del hot path solo emiten WARNING o superior, por lo
+    que los mensajes por frame (y los volcados de mensajes completos) se descartan
+    antes de crear el registro.
+    """
+    nivel = logging.WARNING if silencioso else logging.NOTSET
+    for nombre in HOT_PATH_LOGGERS:
+        logging.getLogger(nombre).setLevel(nivel)
+
+def setup_logging(id: int, silencioso: bool = False, directorio: str = 'logs'):
     """Configura el logging para la aplicación."""
+    global _listener
+
     # Asegúrate de que el directorio de logs exista
     import os
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    if not os.path.exists(directorio):
+        os.makedirs(directorio)
 
     LOGGING_CONFIG = {
     'version': 1,
@@ -37,14 +79,14 @@ def setup_logging(id: int):
             'level': 'INFO',
             'class': 'logging.FileHandler',
             'formatter': 'standard',
-            'filename': f'logs/client_{id}_{now_formatted}.log',
+            'filename': f'{directorio}/client_{id}_{now_formatted}.log',
             'encoding': 'utf-8',
         },
         'file_error': {
             'level': 'ERROR',
             'class': 'logging.FileHandler',
             'formatter': 'detailed', # Más detalle para errores
-            'filename': f'logs/client_{id}_error_{now_formatted}.log',
+            'filename': f'{directorio}/client_{id}_error_{now_formatted}.log',
             'encoding': 'utf-8',
         }
     },
@@ -56,6 +98,31 @@ def setup_logging(id: int):
         }
     }
     }
+    detener_logging()
     logging.config.dictConfig(LOGGING_CONFIG)
+
+    # Los handlers reales pasan a un hilo aparte; el logger raíz solo encola los registros
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+    cola = queue.SimpleQueue()
+    root.addHandler(_ColaHandler(cola))
+    _listener = logging.handlers.QueueListener(cola, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    configurar_hot_path(silencioso)
     logger = logging.getLogger(__name__)
-    logger.info("Logging configurado exitosamente.")
\ No newline at end of file
+    logger.info("Logging configurado exitosamente.")
+
+def detener_logging():
+    """Vacia la cola de logging y detiene el hilo que escribe los registros."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(detener_logging)
@@ -1,7 +1,8 @@
 import json
 import logging
-from typing import Optional, List, Tuple, Dict, Any, Literal, Union
-from pydantic import BaseModel, ValidationError, Field
+from typing import Optional, List, Tuple, Dict, Any, Literal, Union, Annotated
+from pydantic import BaseModel, ValidationError, Field, TypeAdapter, Tag, Discriminator, PrivateAttr
+from pydantic_core import from_json
 
 logger = logging.getLogger('mensajes')
 
@@ -71,9 +72,24 @@ class RelojData(BaseModel):
     tipo: Literal['reloj']
     reloj: int # O float, dependiendo de la precisión necesaria
 
+class AccionEco(BaseModel):
+    """Representa la accion del rival que el servidor reenvia dentro de 'datos' en algunos REACCIONAR."""
+    mensaje_id: str
+    token: str
+    datos: dict
+
+def _tipo_dato(dato: Any) -> str:
+    """Devuelve el tag de un item de 'datos'. Los items sin 'tipo' son acciones reenviadas."""
+    if isinstance(dato, dict):
+        return dato.get('tipo', 'accion')
+    return getattr(dato, 'tipo', 'accion')
+
 # --- Unión de los posibles tipos dentro de la lista "datos" ---
-# Pydantic usará el campo 'tipo' para decidir si es CanchaData o RelojData
-DatoItem = Union[CanchaData, RelojData]
+# Pydantic usa el campo 'tipo' para decidir directamente el modelo, sin probar cada opcion
+DatoItem = Annotated[Union[Annotated[CanchaData, Tag('cancha')],
+                           Annotated[RelojData, Tag('reloj')],
+                           Annotated[AccionEco, Tag('accion')]],
+                     Discriminator(_tipo_dato)]
 
 # --- Modelo Principal ---
 class MensajeTienesLaPelota(BaseServerMessage):
@@ -81,12 +97,15 @@ class MensajeTienesLaPelota(BaseServerMessage):
     mensaje_id: Literal['TIENES_LA_PELOTA']
     # La lista 'datos' puede contener objetos CanchaData o RelojData
     datos: List[DatoItem]
+    # Indice de la cancha (utils.CanchaIndex): lo arma el primero que lo pide y lo reusan el estado y la estrategia
+    _indice: Any = PrivateAttr(default=None)
 
 class MensajeReaccionar(BaseServerMessage):
     """Representa el mensaje completo cuando mensaje_id es 'TIENES_LA_PELOTA'."""
     mensaje_id: Literal['REACCIONAR']
     # La lista 'datos' puede contener objetos CanchaData o RelojData
     datos: List[DatoItem]
+    _indice: Any = PrivateAttr(default=None)
 
 class MensajeRegistro(BaseServerMessage):
     mensaje_id: Literal['OK']
@@ -111,6 +130,9 @@ class MensajeMarcarAdversario(BaseClientMessage):
 ServerMessage = Union[MensajeRegistro, MensajeTienesLaPelota, MensajeReaccionar, MensajeError]
 ClientMessage = Union[MensajeCorrer, MensajePasarPelota, MensajePatear]
 
+# Adaptador compilado una sola vez: elige el modelo por 'mensaje_id' y valida directo desde el JSON crudo
+_adaptador_servidor = TypeAdapter(Annotated[ServerMessage, Field(discriminator='mensaje_id')])
+
 def parse_server_message(raw_data: str) -> Optional[ServerMessage]:
     """
     Parsea un string JSON recibido del servidor y lo convierte
@@ -151,6 +173,148 @@ def parse_server_message(raw_data: str) -> Optional[ServerMessage]:
         logger.critical(f"  Mensaje: {raw_data}")
         return None
     
+# Campos y atributos privados (con su valor inicial) de cada modelo. Cada instancia armada sin validar recibe sus propias copias
+_campos_modelo: Dict[type, Tuple[frozenset, Optional[dict]]] = {}
+# Descriptores de los slots de BaseModel: asignarlos directo es mas barato que model_construct,
+# pero dependen de como pydantic arma sus instancias (probado con pydantic 2.14). Al importar se
+# comprueba que armen un modelo igual al validado; si no, se usa model_construct (ver _camino_rapido_valido)
+try:
+    _asignar_dict = BaseModel.__dict__['__dict__'].__set__
+    _asignar_campos = BaseModel.__dict__['__pydantic_fields_set__'].__set__
+    _asignar_extra = BaseModel.__dict__['__pydantic_extra__'].__set__
+    _asignar_privado = BaseModel.__dict__['__pydantic_private__'].__set__
+except (KeyError, AttributeError):
+    _asignar_dict = None
+
+def _sin_validar_slots(modelo: type[BaseModel], datos: dict, _nuevo=object.__new__) -> BaseModel:
+    """Crea una instancia del modelo usando el diccionario tal cual, sin validar ni copiar."""
+    campos = _campos_modelo.get(modelo)
+    if campos is None:
+        privados = {nombre: privado.get_default() for nombre, privado in modelo.__private_attributes__.items()}
+        campos = _campos_modelo[modelo] = (frozenset(modelo.model_fields), privados or None)
+
+    instancia = _nuevo(modelo)
+    _asignar_dict(instancia, datos)
+    _asignar_campos(instancia, set(campos[0]))
+    _asignar_extra(instancia, None)
+    _asignar_privado(instancia, None if campos[1] is None else dict(campos[1]))
+    return instancia
+
+def _sin_validar_construct(modelo: type[BaseModel], datos: dict) -> BaseModel:
+    return modelo.model_construct(**datos)
+
+def _camino_rapido_valido() -> bool:
+    """Comprueba que los slots arman un modelo igual al validado (con otra version de pydantic podrian no hacerlo)."""
+    if _asignar_dict is None:
+        return False
+    try:
+        datos = {'id': 1, 'x': 2, 'y': 3, 'esta_la_pelota': None}
+        rapida, validada = _sin_validar_slots(UbicacionPelota, dict(datos)), UbicacionPelota(**datos)
+        return (rapida == validada and rapida.model_dump() == validada.model_dump()
+                and rapida.model_fields_set == set(UbicacionPelota.model_fields)
+                and rapida.model_fields_set is not _sin_validar_slots(UbicacionPelota, dict(datos)).model_fields_set
+                and _con_privados_valido())
+    except Exception:
+        return False
+
+def _con_privados_valido() -> bool:
+    datos = {'mensaje_id': 'REACCIONAR', 'destinatario': 'equipo', 'datos': []}
+    rapida, validada = _sin_validar_slots(MensajeReaccionar, dict(datos)), MensajeReaccionar(**datos)
+    iguales = rapida == validada and rapida._indice is None
+    rapida._indice = 1
+    return iguales and rapida._indice == 1 and validada._indice is None
+
+if _camino_rapido_valido():
+    _sin_validar = _sin_validar_slots
+else:
+    logger.warning('La version de pydantic no permite armar los modelos por sus slots. El modo confiable usa model_construct.')
+    _sin_validar = _sin_validar_construct
+
+def coordenada(x: int, y: int) -> Coordenada:
+    """Crea una Coordenada sin pasar por la validacion. Para usar con enteros ya validados."""
+    return _sin_validar(Coordenada, {'x': x, 'y': y})
+
+def _equipo_confiable(datos: dict) -> Equipo:
+    datos['arco'] = tuple(_sin_validar(Coordenada, coord) for coord in datos['arco'])
+    return _sin_validar(Equipo, datos)
+
+def _dato_confiable(datos: dict) -> BaseModel:
+    tipo = datos.get('tipo')
+
+    if tipo == 'cancha':
+        for sector in datos['sectores']:
+            ocupantes = sector['ocupantes']
+            for i, ocupante in enumerate(ocupantes):
+                ocupante.setdefault('tiene_la_pelota', None)
+                ocupante.setdefault('es_el_crack', None)
+                ocupantes[i] = _sin_validar(Ocupante, ocupante)
+        datos['sectores'] = [_sin_validar(Sector, sector) for sector in datos['sectores']]
+        datos['equipo1'] = _equipo_confiable(datos['equipo1'])
+        datos['equipo2'] = _equipo_confiable(datos['equipo2'])
+        datos['ubicacion_pelota'].setdefault('esta_la_pelota', None)
+        datos['ubicacion_pelota'] = _sin_validar(UbicacionPelota, datos['ubicacion_pelota'])
+        return _sin_validar(CanchaData, datos)
+    elif tipo == 'reloj':
+        return _sin_validar(RelojData, datos)
+    else:
+        return _sin_validar(AccionEco, datos)
+
+_modelos_servidor = {
+    'OK': MensajeRegistro,
+    'TIENES_LA_PELOTA': MensajeTienesLaPelota,
+    'REACCIONAR': MensajeReaccionar,
+    'ERROR': MensajeError,
+}
+
+def _construir_confiable(data: dict) -> Optional[ServerMessage]:
+    modelo = _modelos_servidor.get(data.get('mensaje_id'))
+
+    if modelo is None:
+        logger.error('msg_id no interpretado. Data: %s', data)
+        return None
+    if modelo is MensajeTienesLaPelota or modelo is MensajeReaccionar:
+        data['datos'] = [_dato_confiable(dato) for dato in data['datos']]
+    return _sin_validar(modelo, data)
+
+def decodificar_mensaje(raw_data: str | bytes, confiable: bool = False) -> Optional[ServerMessage]:
+    """
+    Decodifica un mensaje del servidor en una sola pasada.
+    El modelo se elige por 'mensaje_id' (y cada item de 'datos' por 'tipo'), por lo que
+    el formato del REACCIONAR con la accion reenviada no requiere un segundo intento.
+
+    args:
+        raw_data (str | bytes): Mensaje crudo recibido del websocket.
+        confiable (bool): Si es True arma los objetos sin validarlos. Solo usar con un servidor confiable.
+    returns:
+        ServerMessage: Objeto del mensaje. None si el mensaje no es valido o no se reconoce.
+    """
+    try:
+        if confiable:
+            return _construir_confiable(from_json(raw_data))
+        return _adaptador_servidor.validate_json(raw_data)
+
+    except ValidationError as e:
+        tipo_error = e.errors()[0]['type']
+        if tipo_error == 'json_invalid':
+            logger.error("Mensaje recibido no es JSON válido: %s", raw_data)
+        elif tipo_error == 'union_tag_invalid' and not e.errors()[0]['loc']:
+            logger.error('msg_id no interpretado. Data: %s', raw_data)
+        elif tipo_error == 'union_tag_invalid':
+            error = e.errors()[0]
+            logger.error('Tipo %r no interpretado en %s. Data: %s',
+                         error.get('ctx', {}).get('tag'), '.'.join(str(parte) for parte in error['loc']), raw_data)
+        else:
+            logger.critical('Error al parsear: %s', raw_data)
+            logger.critical("\n\nError: Datos de mensaje inválidos: %s", e.errors())
+        return None
+    except ValueError:
+        logger.error("Mensaje recibido no es JSON válido: %s", raw_data)
+        return None
+    except Exception as e:
+        logger.critical("Error inesperado al parsear mensaje: %s", e)
+        logger.critical("  Mensaje: %s", raw_data)
+        return None
+
 def pasar_pelota(token: str, jugador: int) -> MensajePasarPelota:
 
     mensaje = MensajePasarPelota(   mensaje_id='PASAR_PELOTA',
@@ -182,4 +346,56 @@ def marcar_adversario(token: str, jugador: int, adversario: int) -> MensajeMarca
                                       datos={"jugador_numero": jugador,
                                              "adversario_numero": adversario})
     
-    return mensaje
\ No newline at end of file
+    return mensaje
+
+def _entero(valor: int | None) -> str:
+    return 'null' if valor is None else '%d' % valor
+
+class CodificadorAcciones:
+    """
+    Codifica las acciones del cliente directamente al texto JSON que viaja por el websocket.
+    Se crea una vez por sesion con el token ya incluido en cada plantilla.
+    El texto generado es identico al de json.dumps(mensaje.model_dump()).
+
+    args:
+        token (str): Token del equipo devuelto por el registro.
+        validar (bool): Si es True arma y valida los modelos pydantic antes de serializar (modo debug).
+    """
+    __slots__ = ('token', 'validar', '_correr', '_patear', '_pasar_pelota', '_marcar_adversario')
+
+    def __init__(self, token: str, validar: bool = False):
+        self.token = token
+        self.validar = validar
+        token_json = json.dumps(token)
+        self._correr = '{"mensaje_id": "CORRER", "token": ' + token_json + ', "datos": {"movimientos": [%s]}}'
+        self._patear = '{"mensaje_id": "PATEAR", "token": ' + token_json + ', "datos": {"x": %s, "y": %s}}'
+        self._pasar_pelota = '{"mensaje_id": "PASAR_PELOTA", "token": ' + token_json + ', "datos": {"jugador_numero": %s}}'
+        self._marcar_adversario = ('{"mensaje_id": "MARCAR_ADVERSARIO", "token": ' + token_json +
+                                   ', "datos": {"jugador_numero": %s, "adversario_numero": %s}}')
+
+    def correr(self, movimientos: List[dict]) -> str:
+        """
+        args:
+            movimientos (List[Movimiento]): [{'jugador_numero': int, 'x': int, 'y': int}]
+        """
+        if self.validar:
+            return json.dumps(correr(self.token, datos={"movimientos": movimientos}).model_dump())
+        return self._correr % ', '.join(['{"jugador_numero": %s, "x": %s, "y": %s}' % (_entero(m['jugador_numero']),
+                                                                                        _entero(m['x']),
+                                                                                        _entero(m['y']))
+                                         for m in movimientos])
+
+    def patear(self, x: int, y: int) -> str:
+        if self.validar:
+            return json.dumps(patear(self.token, coord=Coordenada(x=x, y=y)).model_dump())
+        return self._patear % (_entero(x), _entero(y))
+
+    def pasar_pelota(self, jugador: int) -> str:
+        if self.validar:
+            return json.dumps(pasar_pelota(self.token, jugador=jugador).model_dump())
+        return self._pasar_pelota % _entero(jugador)
+
+    def marcar_adversario(self, jugador: int, adversario: int) -> str:
+        if self.validar:
+            return json.dumps(marcar_adversario(self.token, jugador=jugador, adversario=adversario).model_dump())
+        return self._marcar_adversario % (_entero(jugador), _entero(adversario))
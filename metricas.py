@@ -0,0 +1,216 @@
+"""
+Metricas de latencia por frame del cliente.
+
+Por cada frame se toman marcas monotonicas (perf_counter_ns) al recibirlo, al terminar de
+decodificarlo, al decidir la accion y al enviarla. Las duraciones de cada etapa van a un
+histograma de tamaño fijo, asi que medir un partido entero no crece en memoria.
+
+Ademas se cruza con los datos del servidor: CanchaData.time_stamp (epoch en ms del servidor)
+contra el reloj de pared local estima el desfase de red + reloj, y RelojData.reloj indica el
+tiempo de partido que queda.
+
+Los partidos en curso quedan en `partidos_en_curso` (por token) para consultarlos mientras se juega.
+"""
+import logging
+import signal
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('metricas')
+
+# Histograma logaritmico: cada potencia de 2 se divide en SUBBUCKETS buckets (error relativo ~6%)
+BITS_SUBBUCKET = 4
+SUBBUCKETS = 1 << BITS_SUBBUCKET
+VALOR_MAXIMO_US = 60_000_000                                                  # Todo lo que tarde mas de 1 minuto cae en el ultimo bucket
+
+ETAPAS = ('parseo', 'decision', 'envio', 'total')
+
+def _indice(valor: int) -> int:
+    if valor < 2 * SUBBUCKETS:
+        return valor
+    exponente = valor.bit_length() - BITS_SUBBUCKET - 1
+    return (exponente + 1) * SUBBUCKETS + (valor >> exponente) - SUBBUCKETS
+
+def _limite_inferior(indice: int) -> int:
+    if indice < 2 * SUBBUCKETS:
+        return indice
+    exponente = indice // SUBBUCKETS - 1
+    return (indice % SUBBUCKETS + SUBBUCKETS) << exponente
+
+N_BUCKETS = _indice(VALOR_MAXIMO_US) + 1
+
+class Histograma:
+    """Histograma de tamaño fijo de duraciones en microsegundos."""
+    __slots__ = ('conteos', 'cantidad', 'suma', 'maximo')
+
+    def __init__(self):
+        self.conteos = [0] * N_BUCKETS
+        self.cantidad = 0
+        self.suma = 0
+        self.maximo = 0
+
+    def registrar(self, valor_us: int):
+        if valor_us < 0:
+            valor_us = 0
+        self.conteos[min(_indice(valor_us), N_BUCKETS - 1)] += 1
+        self.cantidad += 1
+        self.suma += valor_us
+        if valor_us > self.maximo:
+            self.maximo = valor_us
+
+    def percentil(self, p: float) -> float:
+        """
+        Devuelve el percentil `p` (0-100) en microsegundos, con la resolucion del bucket.
+
+        returns:
+            float: Punto medio del bucket donde cae el percentil, acotado por el maximo registrado.
+        """
+        if self.cantidad == 0:
+            return 0.0
+        objetivo = max(1, round(self.cantidad * p / 100))
+        acumulado = 0
+        for indice, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                inferior = _limite_inferior(indice)
+                medio = (inferior + _limite_inferior(indice + 1)) / 2
+                return float(min(medio, self.maximo))
+        return float(self.maximo)
+
+    @property
+    def media(self) -> float:
+        return self.suma / self.cantidad if self.cantidad else 0.0
+
+    def resumen(self) -> dict:
+        return {'cantidad': self.cantidad,
+                'p50_us': self.percentil(50),
+                'p90_us': self.percentil(90),
+                'p99_us': self.percentil(99),
+                'max_us': self.maximo,
+                'media_us': self.media}
+
+class MetricasPartido:
+    """
+    Mediciones de un partido de un equipo.
+
+    args:
+        token (str): Token del equipo, identifica el partido en `partidos_en_curso`.
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+        self.inicio = time.monotonic()
+        self.etapas: Dict[str, Histograma] = {etapa: Histograma() for etapa in ETAPAS}
+        self.frames = 0
+        self.errores = 0
+        self.contadores: Dict[str, int] = {}                                  # Eventos por nombre (ej: origen de cada decision)
+
+        # Desfase = reloj de pared local al recibir - time_stamp del servidor (red + diferencia de relojes)
+        self.desfase_ultimo_ms: Optional[int] = None
+        self.desfase_minimo_ms: Optional[int] = None
+        self.desfase_maximo_ms: Optional[int] = None
+        self.desfase_suma_ms = 0
+        self.desfase_muestras = 0
+        self.reloj_restante_ms: Optional[int] = None
+        self.periodo_ms: Optional[float] = None                              # Cada cuanto avanza el reloj del servidor entre frames (promedio movil)
+
+    def registrar_frame(self, recibido: int, parseado: int, decidido: int, enviado: int):
+        """Registra las marcas (perf_counter_ns) de un frame respondido."""
+        self.frames += 1
+        etapas = self.etapas
+        etapas['parseo'].registrar((parseado - recibido) // 1000)
+        etapas['decision'].registrar((decidido - parseado) // 1000)
+        etapas['envio'].registrar((enviado - decidido) // 1000)
+        etapas['total'].registrar((enviado - recibido) // 1000)
+
+    def registrar_servidor(self, datos: list, recibido_epoch_ms: int):
+        """
+        Toma el time_stamp de la cancha y el reloj del partido de los datos de un mensaje.
+
+        args:
+            datos (list): Lista `datos` del mensaje decodificado (cancha, reloj y eco).
+            recibido_epoch_ms (int): Reloj de pared local al recibir el frame, en ms.
+        """
+        for dato in datos:
+            tipo = getattr(dato, 'tipo', None)
+            if tipo == 'cancha':
+                try:
+                    desfase = recibido_epoch_ms - int(dato.time_stamp)
+                except ValueError:
+                    continue
+                self.desfase_ultimo_ms = desfase
+                self.desfase_suma_ms += desfase
+                self.desfase_muestras += 1
+                if self.desfase_minimo_ms is None or desfase < self.desfase_minimo_ms:
+                    self.desfase_minimo_ms = desfase
+                if self.desfase_maximo_ms is None or desfase > self.desfase_maximo_ms:
+                    self.desfase_maximo_ms = desfase
+            elif tipo == 'reloj':
+                anterior = self.reloj_restante_ms
+                if anterior is not None and 0 < anterior - dato.reloj:
+                    paso = anterior - dato.reloj
+                    self.periodo_ms = paso if self.periodo_ms is None else self.periodo_ms * 0.9 + paso * 0.1
+                self.reloj_restante_ms = dato.reloj
+
+    def contar(self, evento: str, cantidad: int = 1):
+        self.contadores[evento] = self.contadores.get(evento, 0) + cantidad
+
+    def resumen(self) -> dict:
+        """Resumen consultable en cualquier momento del partido."""
+        return {'token': self.token,
+                'duracion_s': time.monotonic() - self.inicio,
+                'frames': self.frames,
+                'errores': self.errores,
+                'contadores': dict(self.contadores),
+                'etapas': {etapa: histograma.resumen() for etapa, histograma in self.etapas.items()},
+                'desfase_ms': {'ultimo': self.desfase_ultimo_ms,
+                               'minimo': self.desfase_minimo_ms,
+                               'maximo': self.desfase_maximo_ms,
+                               'media': self.desfase_suma_ms / self.desfase_muestras if self.desfase_muestras else None},
+                'reloj_restante_ms': self.reloj_restante_ms,
+                'periodo_ms': self.periodo_ms}
+
+    def log_resumen(self):
+        resumen = self.resumen()
+        logger.info('Partido %s: %d frames respondidos, %d errores en %.1f s. Reloj restante: %s ms',
+                    self.token, resumen['frames'], resumen['errores'], resumen['duracion_s'], resumen['reloj_restante_ms'])
+        for etapa, valores in resumen['etapas'].items():
+            logger.info('  %-9s p50 %8.1f us  p90 %8.1f us  p99 %8.1f us  max %8d us',
+                        etapa, valores['p50_us'], valores['p90_us'], valores['p99_us'], valores['max_us'])
+        if resumen['contadores']:
+            logger.info('  %s', ', '.join(f'{evento}: {cantidad}' for evento, cantidad in sorted(resumen['contadores'].items())))
+        desfase = resumen['desfase_ms']
+        if desfase['minimo'] is not None:
+            # El minimo es la mejor estimacion de diferencia de relojes + latencia de red base;
+            # lo que se aleja de el es demora en la red o en el servidor
+            logger.info('  desfase servidor->cliente: minimo %d ms, media %.1f ms, maximo %d ms',
+                        desfase['minimo'], desfase['media'], desfase['maximo'])
+
+# Partidos que se estan jugando en este proceso, por token
+partidos_en_curso: Dict[str, MetricasPartido] = {}
+
+def iniciar_partido(token: str) -> MetricasPartido:
+    metricas = MetricasPartido(token)
+    partidos_en_curso[token] = metricas
+    return metricas
+
+def terminar_partido(metricas: MetricasPartido):
+    """Saca el partido de los partidos en curso y deja el resumen en el log."""
+    partidos_en_curso.pop(metricas.token, None)
+    metricas.log_resumen()
+
+def resumenes() -> List[dict]:
+    """Resumen de todos los partidos en curso."""
+    return [metricas.resumen() for metricas in partidos_en_curso.values()]
+
+def log_resumenes():
+    for metricas in list(partidos_en_curso.values()):
+        metricas.log_resumen()
+
+def instalar_senal(loop):
+    """
+    Con SIGUSR1 (`kill -USR1 <pid>`) se loguea el resumen de los partidos en curso.
+    En Windows no hay SIGUSR1: queda `resumenes()` para consultarlo desde el codigo.
+    """
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, log_resumenes)
@@ -0,0 +1,294 @@
+"""
+Evaluacion de las opciones con la pelota simulando jugadas cortas (rollouts) con el modelo de simulador.py.
+
+Con la pelota en los pies las candidatas son: patear a cada sector del arco rival, pasarla a
+cada compañero y llevarla (correr con la pelota hacia el arco). Cada rollout aplica una
+candidata sobre la cancha del frame y sigue la jugada `PASOS_ROLLOUT` turnos con una politica
+simple para los dos equipos: el poseedor lleva la pelota al arco y patea cuando esta cerca, y
+del otro equipo el mas cercano va a buscarla o marca al poseedor. Un gol propio vale 1, uno en
+contra -1, y si la jugada no termina vale la posesion (ver VALOR_POSESION).
+
+Los rollouts corren en un ProcessPoolExecutor persistente que se calienta al inicio. Cada
+ronda manda un lote por proceso con una duracion propia, contada desde que el proceso lo
+empieza y con al menos una vuelta por candidata; los resultados se suman a medida que llegan y
+despues de cada lote se devuelve (yield) la mejor candidata, asi `EvaluadorMontecarlo` es una
+estrategia anytime para el planificador. El planificador le pasa el limite del frame
+(con_limite): pasado ese limite la evaluacion termina aunque queden lotes en curso. Por frame se loguea
+cuantos rollouts se hicieron y a que ritmo (rollouts/s); benchmarks/bench_montecarlo.py mide
+como escala el ritmo con la cantidad de procesos.
+"""
+import logging
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from mensajes import CodificadorAcciones, MensajeTienesLaPelota
+from grilla import ALTO
+from simulador import DISTANCIA_GOL_SEGURO, Jugador, Partido, arco
+from utils import CanchaIndex, indexar_cancha
+
+logger = logging.getLogger('montecarlo')
+
+PASOS_ROLLOUT = 12                                                            # Turnos de cada equipo por rollout
+VALOR_POSESION = 0.2                                                          # Valor de terminar el rollout con la pelota (negativo si la tiene el rival)
+DURACION_LOTE_MS = 5                                                          # Duracion de cada lote: cada cuanto llegan resultados parciales
+DURACION_MAXIMA_MS = 50                                                       # Por frame, si no se pasa el limite del frame
+ROLLOUTS_MAXIMOS = 4000                                                       # Por frame: alcanzado este total la evaluacion termina antes del limite
+DISTANCIA_REMATE = DISTANCIA_GOL_SEGURO                                       # Desde aca patea la politica de los rollouts
+
+PATEAR = 'PATEAR'
+PASAR_PELOTA = 'PASAR_PELOTA'
+LLEVAR = 'LLEVAR'                                                             # CORRER del poseedor hacia el arco
+
+class Candidata(NamedTuple):
+    accion: str                                                               # PATEAR, PASAR_PELOTA o LLEVAR
+    jugador: Optional[int]                                                    # Receptor del pase
+    x: int                                                                    # Destino del remate o de la corrida
+    y: int
+
+class Foto(NamedTuple):
+    """Cancha de un frame reducida a lo que necesita el simulador. El equipo 0 ataca el arco de y=ALTO-1."""
+    jugadores: Tuple[Tuple[Tuple[int, int, int], ...], Tuple[Tuple[int, int, int], ...]]   # (numero, x, y) por equipo
+    pelota: Tuple[int, int]
+    poseedor: Optional[Tuple[int, int]]                                       # (equipo, numero)
+    propio: int                                                               # Indice de tu equipo
+
+class Rendimiento(NamedTuple):
+    rollouts: int
+    lotes: int
+    duracion_ms: float
+    por_segundo: float
+
+def fotografiar(indice: CanchaIndex) -> Foto:
+    """Pasa la cancha indexada al formato del simulador: el equipo que ataca y=ALTO-1 va primero."""
+    propio = 0 if indice.arco_rival[0].y == ALTO - 1 else 1
+    equipos = [None, None]
+    equipos[propio] = tuple((numero, coord.x, coord.y) for numero, coord in indice.jugadores.items())
+    equipos[1 - propio] = tuple((numero, coord.x, coord.y) for numero, coord in indice.adversarios.items())
+    poseedor = None
+    if indice.poseedor is not None:
+        poseedor = (1 - propio if indice.poseedor_es_adversario else propio, indice.poseedor)
+    return Foto(tuple(equipos), (indice.pelota.x, indice.pelota.y), poseedor, propio)
+
+def candidatas(indice: CanchaIndex) -> List[Candidata]:
+    """Remates a cada sector del arco rival, pases a cada compañero y llevar la pelota al centro del arco."""
+    opciones = [Candidata(PATEAR, None, coord.x, coord.y) for coord in indice.arco_rival]
+    opciones.extend(Candidata(PASAR_PELOTA, numero, coord.x, coord.y)
+                    for numero, coord in indice.jugadores.items() if numero != indice.poseedor)
+    centro = indice.arco_rival[1]
+    opciones.append(Candidata(LLEVAR, indice.poseedor, centro.x, centro.y))
+    return opciones
+
+def codificar(codificador: CodificadorAcciones, candidata: Candidata) -> str:
+    if candidata.accion == PATEAR:
+        return codificador.patear(candidata.x, candidata.y)
+    if candidata.accion == PASAR_PELOTA:
+        return codificador.pasar_pelota(candidata.jugador)
+    return codificador.correr([{'jugador_numero': candidata.jugador, 'x': candidata.x, 'y': candidata.y}])
+
+# --- Rollouts (corren en los procesos del pool) ---
+
+def _armar_partido(foto: Foto, semilla: int) -> Partido:
+    registros = [{'datos': {'equipo': {'nombre': f'equipo{i}',
+                                       'jugadores': [{'numero': numero, 'nombre': str(numero)} for numero, _, _ in equipo]}}}
+                 for i, equipo in enumerate(foto.jugadores)]
+    return Partido(registros, ['0', '1'], semilla=semilla)
+
+def _restaurar(partido: Partido, foto: Foto, jugadores: List[Tuple[Jugador, int, int]]):
+    for jugador, x, y in jugadores:
+        jugador.x, jugador.y = x, y
+    partido.goles = [0, 0]
+    partido.pelota = foto.pelota
+    partido.poseedor = partido.buscar_jugador(*foto.poseedor) if foto.poseedor else None
+
+def _turno(partido: Partido, equipo: int):
+    """Politica simple de los rollouts para un equipo."""
+    poseedor = partido.poseedor
+    if poseedor is not None and poseedor.equipo == equipo:
+        objetivo = arco(2 - equipo)[1]
+        dx, dy = objetivo['x'] - poseedor.x, objetivo['y'] - poseedor.y
+        if dx * dx + dy * dy <= DISTANCIA_REMATE * DISTANCIA_REMATE:
+            partido.patear(equipo, objetivo['x'], objetivo['y'])
+        else:
+            partido.correr(equipo, poseedor.numero, objetivo['x'], objetivo['y'])
+        return
+
+    x, y = partido.pelota
+    cercano = min(partido.jugadores[equipo], key=lambda j: (j.x - x) ** 2 + (j.y - y) ** 2)
+    if poseedor is not None:
+        partido.marcar(equipo, cercano.numero, poseedor.numero)
+    else:
+        partido.correr(equipo, cercano.numero, x, y)
+
+def _aplicar(partido: Partido, equipo: int, candidata: Candidata):
+    if candidata.accion == PATEAR:
+        partido.patear(equipo, candidata.x, candidata.y)
+    elif candidata.accion == PASAR_PELOTA:
+        partido.pasar(equipo, candidata.jugador)
+    else:
+        partido.correr(equipo, candidata.jugador, candidata.x, candidata.y)
+
+def rollout(partido: Partido, propio: int, candidata: Candidata, pasos: int = PASOS_ROLLOUT) -> float:
+    """Una jugada desde la cancha actual del partido, empezando con la candidata. Devuelve su valor para el equipo propio."""
+    rival = 1 - propio
+    _aplicar(partido, propio, candidata)
+    for _ in range(pasos):
+        if partido.goles[propio]:
+            return 1.0
+        _turno(partido, rival)
+        if partido.goles[rival]:
+            return -1.0
+        _turno(partido, propio)
+    if partido.goles[propio]:
+        return 1.0
+    poseedor = partido.poseedor
+    if poseedor is None:
+        return 0.0
+    return VALOR_POSESION if poseedor.equipo == propio else -VALOR_POSESION
+
+def simular_lote(foto: Foto, opciones: List[Candidata], duracion: float, maximo: int, semilla: int,
+                 pasos: int = PASOS_ROLLOUT) -> Tuple[List[float], List[int]]:
+    """
+    Corre rollouts de todas las candidatas, de a una por vuelta, durante `duracion` o hasta `maximo` por candidata.
+    Siempre corre al menos una vuelta: un lote que el pool empieza tarde igual devuelve resultados.
+
+    args:
+        duracion (float): Segundos del lote, contados desde que el proceso lo empieza.
+    returns:
+        Tuple[List[float], List[int]]: Suma de los valores y cantidad de rollouts de cada candidata.
+    """
+    partido = _armar_partido(foto, semilla)
+    jugadores = [(partido.buscar_jugador(equipo, numero), x, y)
+                 for equipo, lista in enumerate(foto.jugadores) for numero, x, y in lista]
+    sumas = [0.0] * len(opciones)
+    cuentas = [0] * len(opciones)
+    reloj = time.monotonic
+    limite = reloj() + duracion
+    for vuelta in range(maximo):
+        if vuelta and reloj() >= limite:
+            break
+        for i, candidata in enumerate(opciones):
+            _restaurar(partido, foto, jugadores)
+            sumas[i] += rollout(partido, foto.propio, candidata, pasos)
+            cuentas[i] += 1
+    return sumas, cuentas
+
+def _calentar(_=None) -> int:
+    """Tarea vacia para que cada proceso del pool arranque e importe los modulos."""
+    time.sleep(0.05)                                                          # Que la tome un proceso distinto cada vez
+    return os.getpid()
+
+# --- Estrategia ---
+
+class EvaluadorMontecarlo:
+    """
+    Estrategia anytime para TIENES_LA_PELOTA basada en rollouts. Se usa como estrategia completa
+    del planificador: (patear_o_pasar, EvaluadorMontecarlo()).
+
+    args:
+        procesos (int): Procesos del pool. 0 usa uno por core menos uno (el del event loop), al menos uno.
+        duracion_lote_ms (float): Duracion de cada lote.
+        rollouts_maximos (int): Rollouts por frame con los que la evaluacion se da por terminada.
+        pasos (int): Turnos por rollout.
+        duracion_maxima_ms (float): Tiempo por frame cuando no se pasa `limite` al evaluar.
+    """
+    con_limite = True                                                         # El planificador pasa el limite del frame
+
+    def __init__(self, procesos: int = 0, duracion_lote_ms: float = DURACION_LOTE_MS,
+                 rollouts_maximos: int = ROLLOUTS_MAXIMOS, pasos: int = PASOS_ROLLOUT,
+                 duracion_maxima_ms: float = DURACION_MAXIMA_MS):
+        self.procesos = procesos or max((os.cpu_count() or 1) - 1, 1)
+        self.duracion_lote_ms = duracion_lote_ms
+        self.duracion_maxima_ms = duracion_maxima_ms
+        self.rollouts_maximos = rollouts_maximos
+        self.pasos = pasos
+        self.ultimo: Optional[Rendimiento] = None
+        self.frames = 0
+        self.rollouts = 0
+        self._rng = random.Random()
+        self._ejecutor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def ejecutor(self) -> ProcessPoolExecutor:
+        if self._ejecutor is None:
+            self._ejecutor = ProcessPoolExecutor(max_workers=self.procesos)
+        return self._ejecutor
+
+    def calentar(self):
+        """Arranca los procesos del pool y espera a que esten listos, para no pagarlo en el primer frame."""
+        inicio = time.perf_counter()
+        pids = set(self.ejecutor.map(_calentar, range(self.procesos)))
+        logger.info('Pool de rollouts listo: %d procesos en %.0f ms', len(pids), (time.perf_counter() - inicio) * 1000)
+
+    def __call__(self, codificador: CodificadorAcciones, mensaje: MensajeTienesLaPelota, equipo_id: str,
+                 limite: Optional[int] = None) -> Iterator[str]:
+        """
+        args:
+            limite (int | None): perf_counter_ns en el que vence el frame. Por defecto duracion_maxima_ms desde ahora.
+        """
+        indice = indexar_cancha(mensaje, equipo_id=equipo_id)
+        if indice is None or indice.poseedor is None or indice.poseedor_es_adversario:
+            return
+        foto = fotografiar(indice)
+        opciones = candidatas(indice)
+        sumas = [0.0] * len(opciones)
+        cuentas = [0] * len(opciones)
+        # Vueltas por lote: el limite de tiempo corta antes; esto solo acota un lote con procesos de sobra
+        por_lote = max(1, self.rollouts_maximos // (self.procesos * len(opciones)))
+        inicio = time.perf_counter()
+        if limite is None:
+            limite = time.perf_counter_ns() + int(self.duracion_maxima_ms * 1e6)
+        lotes = 0
+        pendientes: set[Future] = set()
+        mejor: Optional[int] = None
+        try:
+            while sum(cuentas) < self.rollouts_maximos:
+                restante = (limite - time.perf_counter_ns()) / 1e9
+                if restante <= 0:
+                    return
+                if not pendientes:
+                    pendientes = {self.ejecutor.submit(simular_lote, foto, opciones, self.duracion_lote_ms / 1000,
+                                                       por_lote, self._rng.getrandbits(32), self.pasos)
+                                  for _ in range(self.procesos)}
+                listos, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    lote_sumas, lote_cuentas = futuro.result()
+                    for i, (suma, cuenta) in enumerate(zip(lote_sumas, lote_cuentas)):
+                        sumas[i] += suma
+                        cuentas[i] += cuenta
+                    lotes += 1
+                # Se devuelve despues de cada lote aunque no cambie: asi el planificador puede cortar la busqueda
+                mejor = max((i for i in range(len(opciones)) if cuentas[i]), key=lambda i: sumas[i] / cuentas[i], default=None)
+                if mejor is not None:
+                    yield codificar(codificador, opciones[mejor])
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()                                               # Los que el pool todavia no empezo
+            self._reportar(sum(cuentas), lotes, time.perf_counter() - inicio, opciones, sumas, cuentas, mejor)
+
+    def _reportar(self, rollouts: int, lotes: int, duracion: float, opciones: List[Candidata],
+                  sumas: List[float], cuentas: List[int], mejor: Optional[int]):
+        self.ultimo = Rendimiento(rollouts, lotes, duracion * 1000, rollouts / duracion if duracion else 0.0)
+        self.frames += 1
+        self.rollouts += rollouts
+        if mejor is not None:
+            elegida = opciones[mejor]
+            logger.info('Montecarlo: %d rollouts en %d lotes, %.1f ms (%.0f rollouts/s, %d procesos). Mejor: %s %s (%d, %d) valor %.3f',
+                        rollouts, lotes, self.ultimo.duracion_ms, self.ultimo.por_segundo, self.procesos,
+                        elegida.accion, elegida.jugador, elegida.x, elegida.y, sumas[mejor] / cuentas[mejor])
+
+    def resumen(self) -> Dict[str, float]:
+        return {'procesos': self.procesos, 'frames': self.frames, 'rollouts': self.rollouts,
+                'rollouts_por_frame': self.rollouts / self.frames if self.frames else 0.0}
+
+    def cerrar(self):
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+            self._ejecutor = None
+
+def con_montecarlo(estrategias: dict, evaluador: EvaluadorMontecarlo) -> dict:
+    """Copia de las estrategias del planificador con el evaluador como estrategia completa de TIENES_LA_PELOTA."""
+    rapida, _ = estrategias[MensajeTienesLaPelota]
+    return {**estrategias, MensajeTienesLaPelota: (rapida, evaluador)}
@@ -0,0 +1,143 @@
+"""
+Evaluacion de pases y remates en un solo lote vectorizado.
+
+Con la pelota en los pies se evaluan a la vez todos los pases (a cada compañero) y los remates
+(a cada sector del arco rival) contra todos los adversarios:
+
+    riesgo:  probabilidad de que corten la linea. Cuenta los rivales parados sobre los sectores
+             que atraviesa (tablas.LINEA_*) y suma la presion de los que estan cerca de la linea.
+    libre:   que tan desmarcado esta el receptor (distancia al rival mas cercano).
+    avance:  cuanto se acerca la pelota al arco rival.
+
+El puntaje esta en unidades de "probabilidad de gol": un remate vale (1 - riesgo) * gol(origen)
+y un pase vale (1 - riesgo) * libre * (gol(receptor) + avance), descontado porque despues hay
+que volver a patear. gol(sector) es la probabilidad de convertir desde ese sector.
+"""
+import logging
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from mensajes import CodificadorAcciones, MensajeTienesLaPelota
+from grilla import ANCHO, N_SECTORES, PROPIO, RIVAL, sector_id
+from tablas import EUCLIDEA, LINEA_INICIO, LINEA_SECTORES
+from utils import CanchaIndex, indexar_cancha, patear_al_arco
+
+logger = logging.getLogger('pases')
+
+PROB_CORTE = 0.35                                                             # Por rival parado sobre la linea
+RADIO_PRESION = 1.0                                                           # Sectores: rivales a esta distancia de la linea presionan
+PESO_PRESION = 0.3
+DISTANCIA_GOL_SEGURO = 3.0                                                    # Desde aca (o mas cerca) el remate entra seguro si no lo cortan
+TOPE_LIBRE = 3.0                                                              # Un receptor a 3 sectores o mas del rival mas cercano esta libre
+PESO_AVANCE = 0.02                                                            # Puntaje por sector de avance hacia el arco
+DESCUENTO_PASE = 0.9
+
+PATEAR = 'PATEAR'
+PASAR_PELOTA = 'PASAR_PELOTA'
+
+class Opcion(NamedTuple):
+    accion: str                                                               # PATEAR o PASAR_PELOTA
+    jugador: Optional[int]                                                    # Receptor del pase
+    x: int                                                                    # Destino
+    y: int
+    puntaje: float
+    riesgo: float
+    libre: float
+    avance: float
+
+def _sectores_lineas(origen: int, destinos: np.ndarray) -> tuple:
+    """Sectores de todas las lineas origen -> destino concatenados, y el corte de cada linea."""
+    pares = origen * N_SECTORES + destinos
+    inicios = LINEA_INICIO[pares]
+    largos = LINEA_INICIO[pares + 1] - inicios
+    cortes = np.zeros(len(destinos) + 1, dtype=np.intp)
+    np.cumsum(largos, out=cortes[1:])
+    indices = np.arange(cortes[-1]) + np.repeat(inicios - cortes[:-1], largos)
+    return LINEA_SECTORES[indices], cortes
+
+def _distancia_a_lineas(origen: np.ndarray, destinos: np.ndarray, rivales: np.ndarray) -> np.ndarray:
+    """Distancia minima de los rivales a cada segmento origen -> destino. Forma (destinos,)."""
+    if len(rivales) == 0:
+        return np.full(len(destinos), np.inf)
+    direccion = destinos - origen                                             # (k, 2)
+    relativa = rivales - origen                                               # (m, 2)
+    largo2 = np.einsum('ij,ij->i', direccion, direccion).astype(float)
+    t = relativa @ direccion.T / np.where(largo2 > 0, largo2, 1)              # (m, k)
+    np.maximum(t, 0, out=t)
+    np.minimum(t, 1, out=t)
+    diferencia = relativa[:, None, :] - t[:, :, None] * direccion[None, :, :]
+    return np.sqrt(np.einsum('mkj,mkj->mk', diferencia, diferencia)).min(axis=0)
+
+def evaluar_opciones(indice: CanchaIndex) -> List[Opcion]:
+    """
+    Evalua todos los pases y remates desde la posicion de la pelota.
+
+    args:
+        indice (CanchaIndex): Indice de la cancha, con la pelota en poder de tu equipo.
+    returns:
+        List[Opcion]: Opciones ordenadas de mayor a menor puntaje.
+    """
+    grilla = indice.grilla
+    numeros = grilla.numeros[PROPIO]
+    propios = grilla.posiciones[PROPIO]
+    rivales = grilla.posiciones[RIVAL]
+    origen = grilla.pelota
+    sector_origen = sector_id(int(origen[0]), int(origen[1]))
+
+    receptores = numeros != (indice.poseedor if indice.poseedor is not None else -1)
+    arco = np.array([(coord.x, coord.y) for coord in indice.arco_rival], dtype=np.intp)
+    destinos = np.concatenate((propios[receptores], arco))                    # Pases primero, despues remates
+    sectores_destino = destinos[:, 1] * ANCHO + destinos[:, 0]
+    sectores_rivales = rivales[:, 1] * ANCHO + rivales[:, 0]
+    n_pases = int(receptores.sum())
+
+    # Riesgo de corte: rivales sobre la linea y presion de los que estan cerca
+    sectores_linea, cortes = _sectores_lineas(sector_origen, sectores_destino)
+    rivales_por_sector = np.bincount(sectores_rivales, minlength=N_SECTORES)
+    acumulado = np.zeros(len(sectores_linea) + 1, dtype=np.intp)
+    np.cumsum(rivales_por_sector[sectores_linea], out=acumulado[1:])
+    en_linea = acumulado[cortes[1:]] - acumulado[cortes[:-1]]
+    presion = np.exp(-(_distancia_a_lineas(origen, destinos, rivales) / RADIO_PRESION) ** 2)
+    riesgo = 1 - (1 - PROB_CORTE) ** en_linea * (1 - PESO_PRESION * presion)
+
+    # Receptor libre y avance hacia el centro del arco
+    centro_arco = sector_id(*arco[1])
+    if len(sectores_rivales):
+        marca = EUCLIDEA[sectores_destino[:n_pases, None], sectores_rivales].min(axis=1)
+    else:
+        marca = np.full(n_pases, TOPE_LIBRE)
+    libre = np.concatenate((np.minimum(marca, TOPE_LIBRE) / TOPE_LIBRE, np.ones(len(arco))))
+    distancia_arco = EUCLIDEA[centro_arco, sectores_destino]
+    avance = EUCLIDEA[centro_arco, sector_origen] - distancia_arco
+
+    gol_receptor = np.minimum(1.0, DISTANCIA_GOL_SEGURO / np.maximum(distancia_arco, 1.0))
+    gol_origen = min(1.0, DISTANCIA_GOL_SEGURO / max(EUCLIDEA.item(sector_origen, centro_arco), 1.0))
+    puntaje = np.concatenate((
+        DESCUENTO_PASE * (1 - riesgo[:n_pases]) * libre[:n_pases] * (gol_receptor[:n_pases] + PESO_AVANCE * avance[:n_pases]),
+        (1 - riesgo[n_pases:]) * gol_origen,
+    ))
+
+    orden = np.argsort(-puntaje, kind='stable').tolist()
+    jugadores = numeros[receptores].tolist()
+    xs, ys = destinos[:, 0].tolist(), destinos[:, 1].tolist()
+    puntaje, riesgo, libre, avance = puntaje.tolist(), riesgo.tolist(), libre.tolist(), avance.tolist()
+    return [Opcion(PASAR_PELOTA if i < n_pases else PATEAR, jugadores[i] if i < n_pases else None,
+                   xs[i], ys[i], puntaje[i], riesgo[i], libre[i], avance[i])
+            for i in orden]
+
+def patear_o_pasar(codificador: CodificadorAcciones, mensaje: MensajeTienesLaPelota, equipo_id: str) -> str:
+    """
+    Con la pelota: patea al arco o pasa la pelota segun la mejor opcion de evaluar_opciones.
+    Si no se puede evaluar (sin cancha o sin la pelota) patea al centro del arco como patear_al_arco.
+    """
+    indice = indexar_cancha(mensaje, equipo_id=equipo_id)
+    if indice is None or indice.poseedor is None or indice.poseedor_es_adversario:
+        return patear_al_arco(codificador, mensaje, equipo_id)
+
+    mejor = evaluar_opciones(indice)[0]
+    logger.info('Mejor opcion: %s %s (%d, %d) puntaje %.3f riesgo %.2f',
+                mejor.accion, mejor.jugador, mejor.x, mejor.y, mejor.puntaje, mejor.riesgo)
+    if mejor.accion == PASAR_PELOTA:
+        return codificador.pasar_pelota(mejor.jugador)
+    return codificador.patear(mejor.x, mejor.y)
@@ -0,0 +1,197 @@
+"""
+Planificador de decisiones con tiempo limite por frame.
+
+Para cada frame se calcula primero una accion de respaldo con la estrategia rapida (menos de
+un milisegundo). Si hay una estrategia completa para ese tipo de mensaje, se corre en un hilo
+aparte con un presupuesto de tiempo contado desde que llego el frame, y se envia la mejor
+respuesta que haya encontrado hasta el limite. Si no llego a dar ninguna, se envia el respaldo.
+Mientras tanto el event loop sigue leyendo frames.
+
+Las estrategias completas son "anytime": generadores que devuelven (yield) acciones cada vez
+mejores. `una_vez` y `profundizando` adaptan funciones comunes a ese formato. Una estrategia
+completa con el atributo `con_limite = True` recibe ademas `limite=`, el perf_counter_ns en el que
+vence el frame, para terminar sola aunque no llegue a devolver ninguna accion.
+"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from mensajes import CodificadorAcciones, MensajeTienesLaPelota, MensajeReaccionar
+from metricas import MetricasPartido
+from estado import EstadoPartido
+from estrategias import RegistroEstrategias
+from pases import patear_o_pasar
+from formacion import mover_equipo
+
+logger = logging.getLogger('planificador')
+
+# Presupuesto por frame: una fraccion del periodo entre frames, menos la demora que ya trae el frame
+FRACCION_PERIODO = 0.5
+PERIODO_POR_DEFECTO_MS = 100                                                  # Hasta medir el periodo real con el reloj del servidor
+PRESUPUESTO_MINIMO_MS = 2
+PRESUPUESTO_MAXIMO_MS = 50
+
+Estrategia = Callable[[CodificadorAcciones, object, str], str]
+EstrategiaAnytime = Callable[[CodificadorAcciones, object, str], Iterator[str]]
+
+# Por tipo de mensaje: (estrategia rapida de respaldo, estrategia completa o None)
+ESTRATEGIAS_POR_DEFECTO: Dict[type, Tuple[Estrategia, Optional[EstrategiaAnytime]]] = {
+    MensajeTienesLaPelota: (patear_o_pasar, None),
+    MensajeReaccionar: (mover_equipo, None),
+}
+
+def una_vez(estrategia: Estrategia) -> EstrategiaAnytime:
+    """Adapta una estrategia comun a anytime: una sola respuesta."""
+    def anytime(codificador, mensaje, equipo_id):
+        yield estrategia(codificador, mensaje, equipo_id)
+    return anytime
+
+def profundizando(estrategia: Callable[..., str], profundidades: Iterable[int]) -> EstrategiaAnytime:
+    """
+    Profundizacion iterativa: corre `estrategia(codificador, mensaje, equipo_id, profundidad)`
+    con cada profundidad y devuelve el resultado de cada una.
+    """
+    def anytime(codificador, mensaje, equipo_id):
+        for profundidad in profundidades:
+            yield estrategia(codificador, mensaje, equipo_id, profundidad)
+    return anytime
+
+class _Busqueda:
+    """Corrida de una estrategia anytime en el hilo del ejecutor."""
+    __slots__ = ('mejor', 'pasos', 'cancelada', 'terminada', 'al_fallar')
+
+    def __init__(self, al_fallar: Optional[Callable[[], object]] = None):
+        self.mejor: Optional[str] = None
+        self.pasos = 0
+        self.cancelada = False
+        self.terminada = False
+        self.al_fallar = al_fallar                                            # Se llama si la estrategia lanza una excepcion
+
+    def correr(self, estrategia: EstrategiaAnytime, codificador, mensaje, equipo_id: str, limite: int):
+        if getattr(estrategia, 'con_limite', False):
+            generador = estrategia(codificador, mensaje, equipo_id, limite=limite)
+        else:
+            generador = estrategia(codificador, mensaje, equipo_id)
+        try:
+            for accion in generador:
+                self.mejor = accion
+                self.pasos += 1
+                if self.cancelada:
+                    return
+            self.terminada = True
+        except Exception:
+            logger.exception('La estrategia completa fallo.')
+            if self.al_fallar is not None:
+                self.al_fallar()
+        finally:
+            generador.close()
+
+class Planificador:
+    """
+    args:
+        codificador (CodificadorAcciones): Codificador de las acciones del equipo.
+        equipo_id (str): Identificador del equipo.
+        metricas (MetricasPartido | None): Mediciones del partido; de aca salen el periodo y la demora.
+        estrategias (dict): Por tipo de mensaje, (estrategia rapida, estrategia completa anytime o None).
+        ejecutor (Executor | None): Donde corren las estrategias completas. Por defecto un hilo propio.
+        estado (EstadoPartido | None): Estado persistente del partido, se actualiza con cada frame antes de decidir.
+        registro (RegistroEstrategias | None): Si se pasa, las estrategias salen del registro en cada frame
+            (se pueden cambiar durante el partido) y `estrategias` no se usa.
+    """
+
+    def __init__(self, codificador: CodificadorAcciones, equipo_id: str,
+                 metricas: Optional[MetricasPartido] = None,
+                 estrategias: Dict[type, Tuple[Estrategia, Optional[EstrategiaAnytime]]] = ESTRATEGIAS_POR_DEFECTO,
+                 ejecutor: Optional[Executor] = None,
+                 estado: Optional[EstadoPartido] = None,
+                 registro: Optional[RegistroEstrategias] = None):
+        self.codificador = codificador
+        self.equipo_id = equipo_id
+        self.metricas = metricas
+        self.estrategias = estrategias
+        self._ejecutor = ejecutor
+        self._ejecutor_propio = False
+        self.estado = estado
+        self.registro = registro
+
+    @property
+    def ejecutor(self) -> Executor:
+        if self._ejecutor is None:
+            # Un solo hilo: si una busqueda se atrasa, la siguiente espera y usa su respaldo
+            self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='planificador')
+            self._ejecutor_propio = True
+        return self._ejecutor
+
+    def presupuesto_ms(self) -> float:
+        """Tiempo disponible para responder un frame, contado desde que se recibio."""
+        metricas = self.metricas
+        if metricas is None:
+            return PRESUPUESTO_MAXIMO_MS
+
+        periodo = metricas.periodo_ms or PERIODO_POR_DEFECTO_MS
+        presupuesto = periodo * FRACCION_PERIODO
+        if metricas.desfase_ultimo_ms is not None:
+            # Lo que el frame tardo de mas respecto de la mejor llegada ya se gasto en la red
+            presupuesto -= metricas.desfase_ultimo_ms - metricas.desfase_minimo_ms
+        if metricas.reloj_restante_ms is not None:
+            presupuesto = min(presupuesto, metricas.reloj_restante_ms)
+        return min(max(presupuesto, PRESUPUESTO_MINIMO_MS), PRESUPUESTO_MAXIMO_MS)
+
+    def _contar(self, origen: str):
+        if self.metricas is not None:
+            self.metricas.contar(origen)
+
+    async def decidir(self, mensaje, recibido: int) -> str:
+        """
+        Devuelve la accion a enviar para el mensaje.
+
+        args:
+            mensaje: MensajeTienesLaPelota o MensajeReaccionar.
+            recibido (int): perf_counter_ns de cuando llego el frame.
+
+        returns:
+            str: La mejor accion encontrada dentro del presupuesto, o la de respaldo.
+        """
+        if self.estado is not None:
+            try:
+                self.estado.actualizar(mensaje)
+            except Exception:
+                logger.exception('Error al actualizar el estado del partido.')
+
+        if self.registro is not None:
+            self.registro.vigentes()                                          # Un cambio de estrategia entra aca, entre frames
+            respaldo = self.registro.responder(self.codificador, mensaje, self.equipo_id)
+            version = self.registro.activa
+            _, completa = version.estrategias[type(mensaje)]
+            al_fallar = functools.partial(self.registro.fallo_completa, version)
+        else:
+            rapida, completa = self.estrategias[type(mensaje)]
+            respaldo = rapida(self.codificador, mensaje, self.equipo_id)
+            al_fallar = None
+        if completa is None:
+            return respaldo
+
+        limite = recibido + int(self.presupuesto_ms() * 1e6)
+        restante = (limite - time.perf_counter_ns()) / 1e9
+        if restante <= 0:
+            self._contar('decision.sin_tiempo')
+            return respaldo
+
+        busqueda = _Busqueda(al_fallar)
+        futuro = asyncio.get_running_loop().run_in_executor(
+            self.ejecutor, busqueda.correr, completa, self.codificador, mensaje, self.equipo_id, limite)
+        await asyncio.wait((futuro,), timeout=restante)
+        busqueda.cancelada = True
+
+        if busqueda.mejor is None:
+            self._contar('decision.respaldo')
+            return respaldo
+        self._contar('decision.completa' if busqueda.terminada else 'decision.parcial')
+        return busqueda.mejor
+
+    def cerrar(self):
+        if self._ejecutor_propio:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
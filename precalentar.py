@@ -0,0 +1,239 @@
+"""
+Precalentamiento del cliente antes del primer frame del partido.
+
+El primer TIENES_LA_PELOTA paga costos que no se repiten: la primera validacion de pydantic
+sobre el arbol de CanchaData, los caches que se llenan en el primer uso (_campos_modelo de
+mensajes, los puestos de cada formacion), las primeras llamadas de numpy en utils, pases y
+formacion, y el primer registro que pasa por la cola de logging. precalentar() corre el
+decodificador, el estado, las estrategias rapidas, el filtro de envios y el codificador sobre
+frames sinteticos del propio equipo, y se llama despues de enviar el REGISTRAR, mientras se
+espera el OK del servidor (ver client.register). Corre en un hilo aparte: con varios equipos en
+el mismo event loop (runner.py) no frena los frames de los demas partidos. Cuando llega el OK se
+corta en el proximo frame sintetico, y cada corrida usa su propio equipo_id para no compartir la
+memoria de las estrategias con la de otro equipo que este precalentando al mismo tiempo.
+
+Tambien mide el tiempo de import del cliente con `python -X importtime` contra un
+presupuesto (PRESUPUESTO_IMPORT_MS), para que no vuelvan a entrar imports pesados al arranque.
+
+Uso (desde la raiz del repo):
+    python -m precalentar --importtime      Tiempo de import de client y los modulos mas caros.
+    python -m precalentar                   Primer frame con y sin precalentar (un proceso nuevo por medicion).
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from statistics import median
+from typing import Dict, List, NamedTuple, Tuple
+
+from grilla import ANCHO, ALTO
+from mensajes import CodificadorAcciones, decodificar_mensaje, parse_server_message
+from estado import EstadoPartido
+from envio import FiltroEnvios
+from log import HOT_PATH_LOGGERS
+
+logger = logging.getLogger('precalentar')
+
+PRESUPUESTO_MS = 150                                                          # Tope del precalentamiento; el OK suele tardar mas que esto
+FRAMES = 24                                                                   # Frames sinteticos, mitad TIENES_LA_PELOTA y mitad REACCIONAR
+PRESUPUESTO_IMPORT_MS = 600                                                   # Import de client, acumulado segun -X importtime
+TOKEN_PROPIO = 'TOKEN-precalentar-propio'
+TOKEN_RIVAL = 'TOKEN-precalentar-rival'
+
+_corridas = itertools.count()
+
+class Precalentamiento(NamedTuple):
+    frames: int
+    duracion_ms: float
+    primer_frame_us: float
+    ultimo_frame_us: float
+
+class _SinLogsDelHilo(logging.Filter):
+    """Descarta los registros de menos de WARNING emitidos por el hilo que lo crea."""
+
+    def __init__(self):
+        super().__init__()
+        self.hilo = threading.get_ident()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.thread != self.hilo or record.levelno >= logging.WARNING
+
+def frames_sinteticos(registro: dict, cantidad: int = FRAMES, semilla: int = 0,
+                      token: str = TOKEN_PROPIO) -> Tuple[str, List[str]]:
+    """
+    Frames del equipo registrado contra TEAM_LANUS con los jugadores repartidos al azar.
+    Se alternan TIENES_LA_PELOTA y REACCIONAR (con la accion del rival reenviada).
+
+    returns:
+        Tuple[str, List[str]]: equipo_id de los frames y los frames crudos.
+    """
+    from simulador import Partido                                             # Solo para armar los frames: import client no importa simulador
+    from teams import TEAM_LANUS
+
+    rng = random.Random(semilla)
+    partido = Partido([registro, TEAM_LANUS], [token, TOKEN_RIVAL], semilla=semilla)
+    frames = []
+    for i in range(cantidad):
+        for jugadores in partido.jugadores:
+            for jugador in jugadores:
+                jugador.x, jugador.y = rng.randrange(ANCHO), rng.randrange(ALTO)
+        partido.poseedor = rng.choice(partido.jugadores[i % 2])
+        partido.pelota = (partido.poseedor.x, partido.poseedor.y)
+        partido.ultima_accion[1] = {'mensaje_id': 'PATEAR', 'token': TOKEN_RIVAL,
+                                    'datos': {'x': partido.pelota[0], 'y': partido.pelota[1]}}
+        frames.append(json.dumps(partido.frame(0)))
+    return token, frames
+
+def precalentar(estrategias: dict, registro: dict, confiable: bool = False,
+                presupuesto_ms: float = PRESUPUESTO_MS, parar: threading.Event | None = None) -> Precalentamiento:
+    """
+    Recorre el camino de cada frame sobre frames sinteticos hasta agotarlos o agotar el presupuesto.
+    Los logs por frame de menos de WARNING que se emiten desde este hilo se descartan; los de
+    otros hilos (otros partidos, si corre aparte) no se tocan. Al terminar se descarta la memoria
+    que las estrategias guardaron para el equipo sintetico.
+
+    args:
+        estrategias (dict): Las del planificador. Solo se corren las rapidas; las completas se calientan aparte.
+        registro (dict): Mensaje REGISTRAR del equipo, para armar los frames con su formacion.
+        confiable (bool): El mismo modo del decodificador que usa process_messages.
+        presupuesto_ms (float): Tiempo maximo.
+        parar (threading.Event | None): Si se activa, se corta en el proximo frame (llego el OK).
+    """
+    from estrategias import olvidar_equipo
+
+    inicio = time.perf_counter()
+    limite = inicio + presupuesto_ms / 1000
+    filtro_logs = _SinLogsDelHilo()
+    loggers = [logging.getLogger(nombre) for nombre in HOT_PATH_LOGGERS]
+    for hot_path in loggers:
+        hot_path.addFilter(filtro_logs)
+    tiempos: List[float] = []
+    equipo_id = f'{TOKEN_PROPIO}-{next(_corridas)}'                           # Propio de esta corrida: otro hilo puede olvidar el suyo
+    try:
+        equipo_id, frames = frames_sinteticos(registro, token=equipo_id)
+        codificador = CodificadorAcciones(equipo_id)
+        estado = EstadoPartido(equipo_id)
+        filtro = FiltroEnvios()
+        parse_server_message(json.dumps({'mensaje_id': 'OK', 'destinatario': equipo_id, 'token': equipo_id}))
+        codificador.correr([{'jugador_numero': 1, 'x': 0, 'y': 0}])
+        codificador.patear(0, 0)
+        codificador.pasar_pelota(1)
+        codificador.marcar_adversario(1, 1)
+
+        for raw in frames:
+            if time.perf_counter() > limite or (parar is not None and parar.is_set()):
+                break
+            comienzo = time.perf_counter_ns()
+            mensaje = decodificar_mensaje(raw, confiable=confiable)
+            estado.actualizar(mensaje)
+            rapida, _ = estrategias[type(mensaje)]
+            filtro.debe_enviar(rapida(codificador, mensaje, equipo_id), estado)
+            tiempos.append((time.perf_counter_ns() - comienzo) / 1e3)
+    except Exception:
+        # Un frame sintetico que no sale no puede impedir el partido
+        logger.exception('Error al precalentar el cliente.')
+    finally:
+        for hot_path in loggers:
+            hot_path.removeFilter(filtro_logs)
+        olvidar_equipo(estrategias, equipo_id)
+
+    resultado = Precalentamiento(len(tiempos), (time.perf_counter() - inicio) * 1000,
+                                 tiempos[0] if tiempos else 0.0, tiempos[-1] if tiempos else 0.0)
+    logger.info('Precalentamiento: %d frames en %.1f ms (primero %.0f us, ultimo %.0f us)', *resultado)
+    return resultado
+
+def tiempo_import(modulo: str = 'client', repeticiones: int = 3) -> Tuple[float, Dict[str, float]]:
+    """
+    Tiempo de import de un modulo en un interprete nuevo, segun `-X importtime`.
+
+    returns:
+        Tuple[float, Dict[str, float]]: Acumulado del modulo en ms (el minimo de las repeticiones)
+            y el tiempo propio de cada modulo importado en esa corrida.
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    mejor, propios = float('inf'), {}
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                                capture_output=True, text=True, cwd=directorio, check=True).stderr
+        corrida = {}
+        for linea in salida.splitlines():
+            if not linea.startswith('import time:') or 'self [us]' in linea:
+                continue
+            propio, acumulado, nombre = linea.removeprefix('import time:').split('|')
+            corrida[nombre.strip()] = int(propio) / 1000
+            if nombre.strip() == modulo and int(acumulado) / 1000 < mejor:
+                mejor, propios = int(acumulado) / 1000, corrida
+    return mejor, propios
+
+def primer_frame(calentar: bool, frames: int = 100) -> List[float]:
+    """Latencia (us) de decodificar, actualizar el estado y decidir cada frame, desde un proceso recien importado."""
+    import client
+    from teams import TEAM_PIN
+
+    logging.disable(logging.CRITICAL)
+    if calentar:
+        precalentar(client.ESTRATEGIAS, TEAM_PIN, confiable=client.DECODIFICADOR_CONFIABLE)
+    # Otra semilla que la del precalentamiento: los frames medidos no se vieron antes
+    equipo_id, crudos = frames_sinteticos(TEAM_PIN, cantidad=frames, semilla=1)
+    codificador, estado = CodificadorAcciones(equipo_id), EstadoPartido(equipo_id)
+    tiempos = []
+    for raw in crudos:
+        comienzo = time.perf_counter_ns()
+        mensaje = decodificar_mensaje(raw, confiable=client.DECODIFICADOR_CONFIABLE)
+        estado.actualizar(mensaje)
+        client.ESTRATEGIAS[type(mensaje)][0](codificador, mensaje, equipo_id)
+        tiempos.append((time.perf_counter_ns() - comienzo) / 1e3)
+    return tiempos
+
+def comparar_primer_frame(repeticiones: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Primer frame en frio y precalentado, cada medicion en un interprete nuevo.
+
+    returns:
+        Dict[str, Dict[str, float]]: Por modo ('frio', 'caliente'), mediana del primer frame, del segundo y del frame 100 en us.
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    resultado = {}
+    for modo in ('frio', 'caliente'):
+        corridas = []
+        for _ in range(repeticiones):
+            salida = subprocess.run([sys.executable, '-m', 'precalentar', '--medir', modo],
+                                    capture_output=True, text=True, cwd=directorio, check=True).stdout
+            corridas.append(json.loads(salida.splitlines()[-1]))
+        resultado[modo] = {'primero_us': median(c[0] for c in corridas),
+                           'segundo_us': median(c[1] for c in corridas),
+                           'centesimo_us': median(c[-1] for c in corridas)}
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--importtime', action='store_true', help='Mide el import de client contra PRESUPUESTO_IMPORT_MS.')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Procesos por medicion.')
+    parser.add_argument('--medir', choices=('frio', 'caliente'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(primer_frame(calentar=args.medir == 'caliente')))
+        return
+
+    if args.importtime:
+        total, propios = tiempo_import(repeticiones=args.repeticiones)
+        print(f'import client: {total:.1f} ms (presupuesto {PRESUPUESTO_IMPORT_MS} ms)\n')
+        for nombre, ms in sorted(propios.items(), key=lambda item: -item[1])[:15]:
+            print(f'{nombre:<40}{ms:>8.1f} ms')
+        if total > PRESUPUESTO_IMPORT_MS:
+            sys.exit(f'\nEl import de client supera el presupuesto por {total - PRESUPUESTO_IMPORT_MS:.1f} ms')
+        return
+
+    print(f'{"modo":<10}{"primer frame us":>17}{"segundo us":>12}{"frame 100 us":>14}')
+    for modo, valores in comparar_primer_frame(args.repeticiones).items():
+        print(f'{modo:<10}{valores["primero_us"]:>17.0f}{valores["segundo_us"]:>12.0f}{valores["centesimo_us"]:>14.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Etapa de recepcion: lee los frames del websocket en una tarea aparte y, cuando el cliente se
+atrasa, descarta los REACCIONAR viejos para responder solo al estado mas nuevo de la cancha.
+
+Una tarea lee el websocket apenas llegan los frames y los encola con su marca de recepcion.
+Al pedir el proximo frame se drena todo lo que ya esta en la cola: un REACCIONAR que tiene
+detras otro frame con cancha (REACCIONAR o TIENES_LA_PELOTA) ya no describe la cancha actual
+y se saltea. TIENES_LA_PELOTA, OK, ERROR y cualquier otro mensaje nunca se descartan.
+
+La cola tiene un tope (max_cola, el max_queue del perfil de transporte): si se llena la tarea
+deja de leer el websocket, los frames se acumulan en la cola de websockets y despues en el
+socket, y el servidor recibe la presion de vuelta en lugar de crecer la memoria del cliente.
+"""
+import asyncio
+import collections
+import re
+import time
+from typing import Deque, Optional, Tuple
+
+from metricas import MetricasPartido
+from grabador import Grabador
+
+# Primer mensaje_id del frame. En un REACCIONAR el del eco (la accion reenviada) esta dentro
+# de datos, asi que solo podria aparecer antes si el servidor ordenara las claves distinto:
+# en ese caso el frame no se reconoce como REACCIONAR y simplemente no se descarta.
+_MENSAJE_ID = re.compile(r'"mensaje_id"\s*:\s*"([A-Z_]+)"')
+_CON_CANCHA = ('REACCIONAR', 'TIENES_LA_PELOTA')
+MAX_COLA = 256                                                                # Frames leidos sin procesar si no se indica otro tope
+
+def tipo_frame(raw: str | bytes) -> Optional[str]:
+    """mensaje_id del frame sin decodificarlo. None si no se encuentra."""
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8', errors='replace')
+    encontrado = _MENSAJE_ID.search(raw)
+    return encontrado.group(1) if encontrado else None
+
+class Receptor:
+    """
+    Iterador asincronico de frames (recibido, raw), con recibido en perf_counter_ns.
+
+    args:
+        websocket: Conexion abierta con el servidor.
+        metricas (MetricasPartido | None): Donde contar los frames salteados ('frames.salteados').
+        coalescer (bool): Si es False se entregan todos los frames en orden, sin descartar.
+        grabador (Grabador | None): Si se pasa, graba cada frame al recibirlo (tambien los salteados).
+        max_cola (int): Frames leidos sin procesar antes de dejar de leer el websocket.
+    """
+
+    def __init__(self, websocket, metricas: Optional[MetricasPartido] = None, coalescer: bool = True,
+                 grabador: Optional[Grabador] = None, max_cola: int = MAX_COLA):
+        self.websocket = websocket
+        self.grabador = grabador
+        self.metricas = metricas
+        self.coalescer = coalescer
+        self.salteados = 0
+        self._cola: asyncio.Queue = asyncio.Queue(maxsize=max_cola)
+        self._pendientes: Deque[Tuple[int, str | bytes]] = collections.deque()
+        self._error: Optional[BaseException] = None
+        self._terminado = False
+        self._lector: Optional[asyncio.Task] = None
+
+    async def _leer(self):
+        try:
+            async for raw in self.websocket:
+                recibido = time.perf_counter_ns()
+                if self.grabador is not None:
+                    self.grabador.entrada(recibido, raw)
+                await self._cola.put((recibido, raw))                         # Con la cola llena se espera: no se lee mas el socket
+        except asyncio.CancelledError:
+            raise                                                             # cerrar(): nadie espera el fin de la conexion
+        except Exception as e:
+            self._error = e
+        await self._cola.put(None)                                            # Fin de la conexion
+
+    def _drenar(self):
+        """Suma a pendientes todos los frames que ya estan en cola, salteando los REACCIONAR viejos."""
+        lote = list(self._pendientes)
+        self._pendientes.clear()
+        while not self._cola.empty():
+            frame = self._cola.get_nowait()
+            if frame is None:
+                self._terminado = True
+                break
+            lote.append(frame)
+
+        if not self.coalescer or len(lote) < 2:
+            self._pendientes.extend(lote)
+            return
+
+        # De atras hacia adelante: un REACCIONAR se saltea si ya hay un frame con cancha mas nuevo
+        hay_cancha_mas_nueva = False
+        conservados = []
+        for frame in reversed(lote):
+            tipo = tipo_frame(frame[1])
+            if tipo == 'REACCIONAR' and hay_cancha_mas_nueva:
+                self.salteados += 1
+                if self.metricas is not None:
+                    self.metricas.contar('frames.salteados')
+                continue
+            if tipo in _CON_CANCHA:
+                hay_cancha_mas_nueva = True
+            conservados.append(frame)
+        self._pendientes.extend(reversed(conservados))
+
+    def __aiter__(self):
+        if self._lector is None:
+            self._lector = asyncio.create_task(self._leer())
+        return self
+
+    async def __anext__(self) -> Tuple[int, str | bytes]:
+        if not self._terminado:
+            if not self._pendientes:
+                frame = await self._cola.get()
+                if frame is None:
+                    self._terminado = True
+                else:
+                    self._pendientes.append(frame)
+            if not self._cola.empty():
+                self._drenar()
+        if self._pendientes:
+            return self._pendientes.popleft()
+        if self._error is not None:
+            raise self._error
+        raise StopAsyncIteration
+
+    def cerrar(self):
+        if self._lector is not None and not self._lector.done():
+            self._lector.cancel()
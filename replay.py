@@ -0,0 +1,194 @@
+"""
+Repite partidos grabados (ver grabador.py) con cualquier estrategia, sin conectarse al servidor.
+
+Cada frame grabado pasa por parse_server_message y por la estrategia elegida, y la accion
+resultante se compara con la que se envio en el partido original (la primera accion grabada
+despues del frame, si la hubo). Informa cuantas decisiones cambian, ejemplos de los cambios y
+el tiempo por frame de decodificar y decidir. Cada partido se repite en un proceso del pool.
+
+Uso:
+    python replay.py partidas/                                    (todas las grabaciones del directorio)
+    python replay.py partidas/*.bin --reaccionar mi_modulo:mi_estrategia --procesos 8
+"""
+import argparse
+import glob
+import importlib
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import quantiles
+from typing import Callable, Dict, List, Optional
+
+from mensajes import (parse_server_message,
+                      decodificar_mensaje,
+                      CodificadorAcciones,
+                      MensajeTienesLaPelota,
+                      MensajeReaccionar)
+from grabador import LectorPartido, ENTRADA, SALIDA
+from log import configurar_hot_path
+
+logger = logging.getLogger('replay')
+
+ESTRATEGIA_REACCIONAR = 'utils:buscar_pelota'
+ESTRATEGIA_TIENES = 'utils:patear_al_arco'
+EJEMPLOS_POR_PARTIDO = 5
+
+def cargar_estrategia(nombre: str) -> Callable:
+    """Importa una estrategia a partir de 'modulo:funcion'."""
+    modulo, _, funcion = nombre.partition(':')
+    return getattr(importlib.import_module(modulo), funcion)
+
+def decidir(estrategia: Callable, codificador: CodificadorAcciones, mensaje, equipo_id: str) -> str:
+    """Corre la estrategia. Si es anytime (un generador) se queda con su ultima respuesta."""
+    resultado = estrategia(codificador, mensaje, equipo_id)
+    if inspect.isgenerator(resultado):
+        accion = None
+        for accion in resultado:
+            pass
+        return accion
+    return resultado
+
+def mismas_acciones(nueva: str, original: str) -> bool:
+    return nueva == original or json.loads(nueva) == json.loads(original)
+
+def _percentiles(valores: List[float]) -> Dict[str, float]:
+    if len(valores) < 2:
+        return {'p50_us': valores[0] if valores else 0.0, 'p99_us': valores[0] if valores else 0.0}
+    cortes = quantiles(valores, n=100)
+    return {'p50_us': cortes[49], 'p99_us': cortes[98]}
+
+def reproducir_partido(ruta: str, reaccionar: str = ESTRATEGIA_REACCIONAR, tienes: str = ESTRATEGIA_TIENES,
+                       confiable: bool = False) -> dict:
+    """
+    Repite un partido grabado. Corre en un proceso del pool.
+
+    args:
+        ruta (str): Archivo de grabacion.
+        reaccionar (str), tienes (str): Estrategias 'modulo:funcion' para REACCIONAR y TIENES_LA_PELOTA.
+        confiable (bool): Si es True decodifica con decodificar_mensaje(confiable=True) en lugar de parse_server_message.
+    returns:
+        dict: Resumen del partido con cantidades, diferencias y tiempos.
+    """
+    configurar_hot_path(silencioso=True)
+    estrategias = {MensajeReaccionar: cargar_estrategia(reaccionar), MensajeTienesLaPelota: cargar_estrategia(tienes)}
+    codificadores: Dict[str, CodificadorAcciones] = {}
+    tiempos_parseo: List[float] = []
+    tiempos_decision: List[float] = []
+    frames = decisiones = diferencias = sin_original = 0
+    ejemplos = []
+    pendiente: Optional[dict] = None                                          # Decision que espera la accion original
+
+    def comparar(original: Optional[str]):
+        nonlocal diferencias, sin_original
+        if original is None:
+            sin_original += 1
+        elif not mismas_acciones(pendiente['accion'], original):
+            diferencias += 1
+            if len(ejemplos) < EJEMPLOS_POR_PARTIDO:
+                ejemplos.append({**pendiente, 'original': original})
+
+    with LectorPartido(ruta) as lector:
+        for registro in lector:
+            if registro.tipo == SALIDA:
+                if pendiente is not None:
+                    comparar(registro.datos.decode('utf-8'))
+                    pendiente = None
+                continue
+            if registro.tipo != ENTRADA:
+                continue
+            if pendiente is not None:
+                comparar(None)                                                # El frame anterior no se respondio (salteado o filtrado)
+                pendiente = None
+
+            frames += 1
+            raw = registro.datos.decode('utf-8')
+            inicio = time.perf_counter_ns()
+            mensaje = decodificar_mensaje(raw, confiable=True) if confiable else parse_server_message(raw)
+            parseado = time.perf_counter_ns()
+            tiempos_parseo.append((parseado - inicio) / 1e3)
+
+            estrategia = estrategias.get(type(mensaje))
+            if estrategia is None:
+                continue
+            equipo_id = mensaje.destinatario
+            codificador = codificadores.get(equipo_id)
+            if codificador is None:
+                codificador = codificadores[equipo_id] = CodificadorAcciones(equipo_id)
+            accion = decidir(estrategia, codificador, mensaje, equipo_id)
+            tiempos_decision.append((time.perf_counter_ns() - parseado) / 1e3)
+            decisiones += 1
+            pendiente = {'frame': frames, 'mensaje_id': mensaje.mensaje_id, 'accion': accion}
+        if pendiente is not None:
+            comparar(None)
+
+    return {'archivo': ruta,
+            'frames': frames,
+            'decisiones': decisiones,
+            'diferencias': diferencias,
+            'sin_original': sin_original,
+            'ejemplos': ejemplos,
+            'parseo': _percentiles(tiempos_parseo),
+            'decision': _percentiles(tiempos_decision),
+            'tiempos_parseo': tiempos_parseo,
+            'tiempos_decision': tiempos_decision}
+
+def buscar_grabaciones(rutas: List[str]) -> List[str]:
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(sorted(glob.glob(os.path.join(ruta, '*.bin'))))
+        else:
+            archivos.extend(sorted(glob.glob(ruta)) or [ruta])
+    return archivos
+
+def reproducir(archivos: List[str], reaccionar: str = ESTRATEGIA_REACCIONAR, tienes: str = ESTRATEGIA_TIENES,
+               confiable: bool = False, procesos: int = 0) -> List[dict]:
+    """Repite todos los partidos, uno por proceso. procesos=0 usa uno por core."""
+    procesos = min(procesos or os.cpu_count() or 1, len(archivos)) or 1
+    n = len(archivos)
+    if procesos == 1:
+        return [reproducir_partido(archivo, reaccionar, tienes, confiable) for archivo in archivos]
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return list(ejecutor.map(reproducir_partido, archivos, [reaccionar] * n, [tienes] * n, [confiable] * n))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('grabaciones', nargs='+', help='Archivos .bin, globs o directorios.')
+    parser.add_argument('--reaccionar', default=ESTRATEGIA_REACCIONAR, help='Estrategia para REACCIONAR (modulo:funcion).')
+    parser.add_argument('--tienes', default=ESTRATEGIA_TIENES, help='Estrategia para TIENES_LA_PELOTA (modulo:funcion).')
+    parser.add_argument('--confiable', action='store_true', help='Decodifica sin validar en lugar de usar parse_server_message.')
+    parser.add_argument('--procesos', type=int, default=0, help='0 usa uno por core.')
+    parser.add_argument('--salida', help='Guarda el resultado completo en un JSON.')
+    args = parser.parse_args()
+
+    archivos = buscar_grabaciones(args.grabaciones)
+    if not archivos:
+        parser.error('No se encontraron grabaciones.')
+
+    inicio = time.perf_counter()
+    resultados = reproducir(archivos, args.reaccionar, args.tienes, args.confiable, args.procesos)
+    duracion = time.perf_counter() - inicio
+
+    for resultado in resultados:
+        print(f'{resultado["archivo"]}: {resultado["frames"]} frames, {resultado["decisiones"]} decisiones, '
+              f'{resultado["diferencias"]} distintas, {resultado["sin_original"]} sin accion original')
+        for ejemplo in resultado['ejemplos']:
+            print(f'  frame {ejemplo["frame"]} ({ejemplo["mensaje_id"]})\n    original: {ejemplo["original"]}\n    nueva:    {ejemplo["accion"]}')
+
+    parseo = _percentiles([t for r in resultados for t in r['tiempos_parseo']])
+    decision = _percentiles([t for r in resultados for t in r['tiempos_decision']])
+    frames = sum(r['frames'] for r in resultados)
+    print(f'\n{len(resultados)} partidos, {frames} frames en {duracion:.2f} s')
+    print(f'  decisiones distintas: {sum(r["diferencias"] for r in resultados)} de {sum(r["decisiones"] for r in resultados)}')
+    print(f'  parseo   p50 {parseo["p50_us"]:8.1f} us  p99 {parseo["p99_us"]:8.1f} us')
+    print(f'  decision p50 {decision["p50_us"]:8.1f} us  p99 {decision["p99_us"]:8.1f} us')
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as salida:
+            json.dump([{k: v for k, v in r.items() if not k.startswith('tiempos_')} for r in resultados], salida, indent=2)
+
+if __name__ == '__main__':
+    main()
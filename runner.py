@@ -0,0 +1,82 @@
+"""
+Corre varios equipos en un solo proceso, cada uno como una tarea del mismo event loop.
+Los equipos comparten el decodificador compilado, las tablas precalculadas y el contexto SSL.
+Con --procesos N los equipos se reparten entre N procesos, cada uno con su propio event loop.
+
+Uso:
+    python runner.py TEAM_PIN TEAM_LANUS
+    python runner.py --todos --procesos 4 --url ws://localhost:4000
+"""
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from client import HOST, PORT, HOT_PATH_SILENCIOSO, PERFIL_TRANSPORTE, crear_contexto_ssl, jugar
+from log import setup_logging
+from metricas import instalar_senal
+from estrategias import instalar_senal_recarga
+from teams import EQUIPOS
+from transporte import PERFILES, ejecutar
+
+logger = logging.getLogger('runner')
+
+async def jugar_equipos(url: str, nombres: List[str]):
+    """Juega con todos los equipos en paralelo sobre el event loop actual."""
+    ssl_context = crear_contexto_ssl()
+    instalar_senal(asyncio.get_running_loop())
+    instalar_senal_recarga(asyncio.get_running_loop())
+    tareas = [asyncio.create_task(jugar(url, EQUIPOS[nombre], ssl_context), name=nombre) for nombre in nombres]
+    resultados = await asyncio.gather(*tareas, return_exceptions=True)
+
+    for nombre, resultado in zip(nombres, resultados):
+        if isinstance(resultado, BaseException):
+            logger.error('El equipo %s termino con error: %r', nombre, resultado)
+        elif resultado.reconexiones:
+            logger.info('El equipo %s termino su partido. Reconexiones: %d, tiempo sin conexion: %.1f ms',
+                        nombre, resultado.reconexiones, resultado.caida_total_ms)
+        else:
+            logger.info('El equipo %s termino su partido.', nombre)
+
+def correr_grupo(url: str, nombres: List[str], id_grupo: str):
+    """Punto de entrada de cada proceso: configura el logging y corre su grupo de equipos."""
+    setup_logging(id_grupo, silencioso=HOT_PATH_SILENCIOSO)
+    logger.info('Grupo %s: %s', id_grupo, ', '.join(nombres))
+    ejecutar(jugar_equipos(url, nombres), PERFILES[PERFIL_TRANSPORTE])
+
+def repartir(nombres: List[str], procesos: int) -> List[List[str]]:
+    """Reparte los equipos en grupos de tamaño parecido."""
+    return [nombres[i::procesos] for i in range(procesos) if nombres[i::procesos]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('equipos', nargs='*', help=f'Equipos de teams.EQUIPOS: {", ".join(EQUIPOS)}')
+    parser.add_argument('--todos', action='store_true', help='Juega con todos los equipos de teams.EQUIPOS.')
+    parser.add_argument('--url', default=f'{HOST}:{PORT}', help='Servidor (ws:// o wss://).')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Cantidad de procesos. 0 usa uno por core, sin superar la cantidad de equipos.')
+    args = parser.parse_args()
+
+    nombres = list(EQUIPOS) if args.todos else args.equipos
+    desconocidos = [nombre for nombre in nombres if nombre not in EQUIPOS]
+    if not nombres or desconocidos:
+        parser.error(f'Equipos desconocidos o vacios: {desconocidos}. Disponibles: {", ".join(EQUIPOS)}')
+    if args.procesos < 0:
+        parser.error(f'--procesos tiene que ser 0 (uno por core) o positivo, no {args.procesos}')
+
+    procesos = args.procesos or os.cpu_count() or 1
+    grupos = repartir(nombres, min(procesos, len(nombres)))
+
+    if len(grupos) == 1:
+        correr_grupo(args.url, grupos[0], 'runner')
+        return
+
+    with ProcessPoolExecutor(max_workers=len(grupos)) as pool:
+        futuros = [pool.submit(correr_grupo, args.url, grupo, f'runner_{i}') for i, grupo in enumerate(grupos)]
+        for futuro in futuros:
+            futuro.result()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Servidor websocket local que habla el mismo protocolo que el servidor del torneo.
+Sirve para jugar sin conexion, repetir partidos y medir el tiempo de respuesta del cliente.
+
+Acepta REGISTRAR y responde OK con un token. Cuando hay dos equipos registrados (o uno solo
+con --bot) arranca un partido de simulador.Partido y envia TIENES_LA_PELOTA/REACCIONAR a
+--fps frames por segundo. Al terminar informa cuanto tardo cada equipo en responder.
+
+Si la conexion de un equipo se corta durante el partido, el partido sigue sin sus acciones y
+el equipo puede volver a registrarse con el mismo nombre: recibe el mismo token y sigue jugando.
+Como el nombre identifica las reconexiones, no se aceptan dos equipos conectados con el mismo nombre.
+Si el partido termina mientras el equipo esta cortado y vuelve dentro de GRACIA_FINAL_S, recibe
+su token y un cierre normal: el partido ya termino y no se le arma uno nuevo.
+Con --caos P cada frame enviado corta la conexion del equipo con probabilidad P (sin cierre
+websocket, como una caida de la red) para probar las reconexiones del cliente (ver sesion.py).
+
+Uso:
+    python servidor_local.py --puerto 4000 --fps 200 --duracion 30 --bot
+    python servidor_local.py --puerto 4000 --fps 200 --duracion 30 --bot --caos 0.005
+    python client.py    (con HOST = 'ws://localhost')
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from statistics import median, quantiles
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+from websockets.protocol import State
+
+from mensajes import decodificar_mensaje, CodificadorAcciones
+from simulador import Partido
+from teams import TEAM_LANUS
+from utils import buscar_pelota, patear_al_arco
+
+logger = logging.getLogger('servidor')
+
+GRACIA_FINAL_S = 5.0                                                          # Para volver despues de un partido que termino con el equipo cortado
+
+class Conexion:
+    """Un equipo conectado: su websocket, su token y las mediciones de respuesta."""
+
+    def __init__(self, websocket, registro: dict, token: str):
+        self.websocket = websocket
+        self.registro = registro
+        self.nombre = registro['datos']['equipo'].get('nombre')
+        self.token = token
+        self.partido: Optional[Partido] = None
+        self.equipo = 0
+        self.enviado_en: Optional[float] = None                               # Ultimo frame enviado sin respuesta
+        self.latencias: List[float] = []
+        self.frames = 0
+        self.reconexiones = 0
+        self.caidas_ms: List[float] = []
+        self.caida_desde: Optional[float] = None
+        self.terminado = asyncio.Event()
+
+class Bot:
+    """Rival manejado por el propio servidor con las estrategias de utils."""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.codificador = CodificadorAcciones(token)
+
+    def responder(self, frame: dict) -> dict:
+        mensaje = decodificar_mensaje(json.dumps(frame))
+        if frame['mensaje_id'] == 'TIENES_LA_PELOTA':
+            return json.loads(patear_al_arco(self.codificador, mensaje, self.token))
+        return json.loads(buscar_pelota(self.codificador, mensaje, self.token))
+
+class ServidorLocal:
+    """
+    args:
+        fps (float): Frames por segundo enviados a cada equipo.
+        duracion (float): Duracion de cada partido en segundos.
+        bot (bool): Si es True cada equipo que se registra juega contra un bot, sin esperar rival.
+        semilla (int | None): Semilla de los partidos.
+        caos (float): Probabilidad de cortar la conexion de un equipo en cada frame enviado.
+    """
+
+    def __init__(self, fps: float = 10, duracion: float = 180, bot: bool = False, semilla: int | None = None,
+                 caos: float = 0.0):
+        self.fps = fps
+        self.duracion = duracion
+        self.bot = bot
+        self.semilla = semilla
+        self.caos = caos
+        self.rng = random.Random(semilla)
+        self.esperando: Optional[Conexion] = None
+        self.conexiones: Dict[str, Conexion] = {}
+        self.desconectadas: Dict[str, Conexion] = {}                          # Por nombre: equipos cortados con el partido en curso
+        self.finalizadas: Dict[str, Tuple[Conexion, float]] = {}              # Por nombre: cortados cuando termino su partido, y cuando termino
+
+    async def atender(self, websocket):
+        """Handler de cada conexion: registro y despues lectura de acciones."""
+        conexion = await self.registrar(websocket)
+        if conexion is None:
+            return
+
+        try:
+            async for raw in websocket:
+                self.recibir_accion(conexion, raw)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if conexion.websocket is not websocket:
+                pass                                                          # Ya se reconecto por otro websocket
+            elif conexion.partido is not None and not conexion.partido.terminado and not conexion.terminado.is_set():
+                # El partido sigue: se guarda la conexion para que el equipo pueda volver
+                conexion.websocket = None
+                conexion.caida_desde = time.perf_counter()
+                self.desconectadas[conexion.nombre] = conexion
+                logger.warning('Conexion cortada: %s (%s). Esperando reconexion', conexion.nombre, conexion.token)
+            else:
+                conexion.terminado.set()
+                self.conexiones.pop(conexion.token, None)
+                if self.esperando is conexion:
+                    self.esperando = None
+
+    async def registrar(self, websocket) -> Optional[Conexion]:
+        try:
+            registro = json.loads(await websocket.recv())
+            if registro.get('mensaje_id') != 'REGISTRAR' or 'equipo' not in registro.get('datos', {}):
+                raise ValueError(registro.get('mensaje_id'))
+        except (ValueError, AttributeError, TypeError) as e:
+            await websocket.send(json.dumps({'mensaje_id': 'ERROR', 'datos': {'descripcion': f'Registro invalido: {e}'}}))
+            return None
+        except websockets.exceptions.ConnectionClosed:
+            return None
+
+        nombre = registro['datos']['equipo'].get('nombre')
+        cortada = self.desconectadas.pop(nombre, None)
+        activa = self.en_partido(nombre)
+        if cortada is None and activa is not None and activa.websocket.state is not State.OPEN:
+            activa.caida_desde = time.perf_counter()                          # Se corto y vuelve antes de que atender viera el corte
+            cortada = activa
+        if cortada is not None:
+            return await self.reconectar(cortada, websocket)
+        finalizada, termino = self.finalizadas.pop(nombre, (None, 0.0))
+        if finalizada is not None and time.perf_counter() - termino < GRACIA_FINAL_S:
+            await self.reconectar(finalizada, websocket)
+            await websocket.close()                                           # El partido ya termino
+            self.conexiones.pop(finalizada.token, None)
+            return None
+
+        if any(conexion.nombre == nombre and not conexion.terminado.is_set() for conexion in self.conexiones.values()):
+            logger.warning('Registro rechazado: ya hay un equipo %s conectado', nombre)
+            await websocket.send(json.dumps({'mensaje_id': 'ERROR', 'datos': {'descripcion': f'Ya hay un equipo {nombre} conectado.'}}))
+            return None
+
+        token = f'TOKEN-{uuid.uuid4()}'
+        conexion = Conexion(websocket, registro, token)
+        self.conexiones[token] = conexion
+        await websocket.send(json.dumps({'mensaje_id': 'OK', 'destinatario': token, 'token': token}))
+        logger.info('Equipo registrado: %s (%s)', registro['datos']['equipo'].get('nombre'), token)
+
+        if self.bot:
+            asyncio.create_task(self.jugar([conexion, Bot(f'TOKEN-{uuid.uuid4()}')]))
+        elif self.esperando is None:
+            self.esperando = conexion
+        else:
+            rival, self.esperando = self.esperando, None
+            asyncio.create_task(self.jugar([rival, conexion]))
+        return conexion
+
+    def en_partido(self, nombre: str) -> Optional[Conexion]:
+        """Conexion con ese nombre en un partido en curso y con websocket (no cortada del todo), si la hay."""
+        return next((conexion for conexion in self.conexiones.values() if conexion.nombre == nombre and conexion.websocket is not None
+                     and conexion.partido is not None and not conexion.terminado.is_set()), None)
+
+    async def reconectar(self, conexion: Conexion, websocket) -> Conexion:
+        """Vuelve a unir un equipo cortado a su partido, con el mismo token."""
+        conexion.websocket = websocket
+        conexion.enviado_en = None
+        conexion.reconexiones += 1
+        conexion.caidas_ms.append((time.perf_counter() - conexion.caida_desde) * 1000)
+        conexion.caida_desde = None
+        await websocket.send(json.dumps({'mensaje_id': 'OK', 'destinatario': conexion.token, 'token': conexion.token}))
+        logger.info('Equipo reconectado: %s (%s) despues de %.1f ms', conexion.nombre, conexion.token, conexion.caidas_ms[-1])
+        return conexion
+
+    def recibir_accion(self, conexion: Conexion, raw: str | bytes):
+        if conexion.enviado_en is not None:
+            conexion.latencias.append(time.perf_counter() - conexion.enviado_en)
+            conexion.enviado_en = None
+
+        if conexion.partido is None:
+            return
+        try:
+            accion = json.loads(raw)
+        except ValueError:
+            asyncio.create_task(self.enviar_error(conexion, 'Mensaje no es JSON valido.'))
+            return
+
+        if accion.get('token') != conexion.token:
+            asyncio.create_task(self.enviar_error(conexion, 'Token invalido.'))
+            return
+        error = conexion.partido.aplicar(conexion.equipo, accion)
+        if error:
+            asyncio.create_task(self.enviar_error(conexion, error))
+
+    async def enviar_error(self, conexion: Conexion, descripcion: str):
+        try:
+            await conexion.websocket.send(json.dumps({'mensaje_id': 'ERROR', 'datos': {'descripcion': descripcion}}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def jugar(self, participantes: List[Conexion | Bot]):
+        """Corre un partido enviando un frame a cada equipo por tick."""
+        registros = [p.registro if isinstance(p, Conexion) else TEAM_LANUS for p in participantes]
+        partido = Partido(registros, [p.token for p in participantes],
+                          duracion_ms=int(self.duracion * 1000), semilla=self.semilla)
+        for equipo, participante in enumerate(participantes):
+            if isinstance(participante, Conexion):
+                participante.partido, participante.equipo = partido, equipo
+
+        intervalo = 1 / self.fps
+        proximo = time.perf_counter()
+        logger.info('Partido iniciado: %s', ' vs '.join(p.token for p in participantes))
+
+        while not partido.terminado:
+            cancha = partido.cancha()
+            for equipo, participante in enumerate(participantes):
+                frame = partido.frame(equipo, cancha)
+                if isinstance(participante, Bot):
+                    partido.aplicar(equipo, participante.responder(frame))
+                    continue
+                if participante.terminado.is_set() or participante.websocket is None:
+                    continue
+                participante.frames += 1
+                participante.enviado_en = time.perf_counter()                 # Se mide desde el ultimo: el cliente no responde los repetidos
+                try:
+                    await participante.websocket.send(json.dumps(frame))
+                except websockets.exceptions.ConnectionClosed:
+                    continue                                                  # atender decide si espera la reconexion
+                if self.caos and self.rng.random() < self.caos:
+                    logger.info('Caos: cortando la conexion de %s', participante.nombre)
+                    participante.websocket.transport.abort()
+
+            if all(p.terminado.is_set() for p in participantes if isinstance(p, Conexion)):
+                break
+            proximo += intervalo
+            partido.avanzar_reloj(max(round(intervalo * 1000), 1))
+            await asyncio.sleep(max(proximo - time.perf_counter(), 0))
+
+        logger.info('Partido terminado. Goles: %s', partido.goles)
+        for participante in participantes:
+            if isinstance(participante, Conexion):
+                participante.terminado.set()
+                if self.desconectadas.get(participante.nombre) is participante:
+                    del self.desconectadas[participante.nombre]
+                # Tambien si el corte llego justo antes del final y atender todavia no lo vio
+                if participante.websocket is None or participante.websocket.state is not State.OPEN:
+                    participante.caida_desde = participante.caida_desde or time.perf_counter()
+                    self.finalizadas[participante.nombre] = (participante, time.perf_counter())
+                self.informar(participante)
+                if participante.websocket is not None:
+                    await participante.websocket.close()
+
+    def informar(self, conexion: Conexion):
+        if conexion.reconexiones:
+            logger.info('%s: %d reconexiones, %.1f ms sin conexion (max %.1f ms)', conexion.token, conexion.reconexiones,
+                        sum(conexion.caidas_ms), max(conexion.caidas_ms))
+        latencias = sorted(conexion.latencias)
+        if len(latencias) < 2:
+            logger.info('%s: %d frames, %d respuestas', conexion.token, conexion.frames, len(latencias))
+            return
+        p99 = quantiles(latencias, n=100)[98]
+        logger.info('%s: %d frames, %d respuestas, respuesta p50 %.2f ms, p99 %.2f ms, max %.2f ms',
+                    conexion.token, conexion.frames, len(latencias),
+                    median(latencias) * 1e3, p99 * 1e3, latencias[-1] * 1e3)
+
+async def servir(host: str, puerto: int, servidor: ServidorLocal):
+    async with websockets.serve(servidor.atender, host, puerto):
+        logger.info('Servidor local escuchando en ws://%s:%d', host, puerto)
+        await asyncio.Future()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--puerto', type=int, default=4000)
+    parser.add_argument('--fps', type=float, default=10, help='Frames por segundo enviados a cada equipo.')
+    parser.add_argument('--duracion', type=float, default=180, help='Duracion de cada partido en segundos.')
+    parser.add_argument('--bot', action='store_true', help='Cada equipo juega contra un bot del servidor.')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--caos', type=float, default=0.0, help='Probabilidad de cortar la conexion de un equipo en cada frame.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    # El bot usa las estrategias de utils: sus logs por frame no aportan en el servidor
+    logging.getLogger('utils').setLevel(logging.WARNING)
+
+    servidor = ServidorLocal(fps=args.fps, duracion=args.duracion, bot=args.bot, semilla=args.semilla, caos=args.caos)
+    try:
+        asyncio.run(servir(args.host, args.puerto, servidor))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Sesion de un equipo con el servidor: sobrevive a los cortes de conexion durante el partido.
+
+Cuando la conexion se corta sin el cierre normal del servidor (o el registro falla), el
+cliente vuelve a conectarse reutilizando el contexto SSL, reenvia el mismo mensaje de
+registro (ya serializado) y sigue el partido con el estado que tenia: la cancha persistente,
+las metricas, el planificador y la grabacion no se pierden (ver client.Partida). El primer
+reintento es inmediato y los siguientes esperan un backoff exponencial con jitter completo,
+asi muchos clientes cortados a la vez no vuelven todos juntos.
+
+Por partido se cuentan las reconexiones y el tiempo sin conexion (desde el corte hasta el
+nuevo OK), y se suman a las metricas del partido ('sesion.reconexiones', 'sesion.caida_ms').
+"""
+import json
+import logging
+import random
+import time
+from typing import List, Optional
+
+logger = logging.getLogger('sesion')
+
+BACKOFF_INICIAL_MS = 10                                                       # Espera antes del segundo reintento; el primero es inmediato
+BACKOFF_MAXIMO_MS = 2000
+CAIDA_MAXIMA_S = 60                                                           # Sin reconectar en este tiempo la sesion se abandona
+
+class SesionAgotada(Exception):
+    """No se pudo volver a conectar dentro de CAIDA_MAXIMA_S."""
+
+class RegistroFallido(Exception):
+    """El servidor no respondio OK al registro."""
+
+class Backoff:
+    """
+    Esperas entre reintentos: 0 el primero y despues uniforme entre 0 y inicial * 2^n, con tope.
+
+    args:
+        inicial_ms (float), maximo_ms (float): Escala y tope de la espera.
+        rng (random.Random | None): Generador para el jitter.
+    """
+
+    def __init__(self, inicial_ms: float = BACKOFF_INICIAL_MS, maximo_ms: float = BACKOFF_MAXIMO_MS,
+                 rng: Optional[random.Random] = None):
+        self.inicial_ms = inicial_ms
+        self.maximo_ms = maximo_ms
+        self.rng = rng or random.Random()
+        self.intentos = 0
+
+    def siguiente(self) -> float:
+        """Segundos a esperar antes del proximo intento."""
+        intentos, self.intentos = self.intentos, self.intentos + 1
+        if intentos == 0:
+            return 0.0
+        tope = min(self.maximo_ms, self.inicial_ms * 2 ** (intentos - 1))
+        return self.rng.uniform(0, tope) / 1000
+
+    def reiniciar(self):
+        self.intentos = 0
+
+class Sesion:
+    """
+    Estado de la sesion de un equipo a traves de las reconexiones.
+
+    args:
+        team_register (dict): Mensaje REGISTRAR del equipo. Se serializa una sola vez y se reenvia igual en cada reconexion.
+        caida_maxima_s (float): Tiempo maximo sin conexion antes de abandonar.
+        backoff (Backoff | None): Politica de espera entre reintentos.
+
+    atributos:
+        token (str | None), equipo_id (str | None): Datos del ultimo registro aceptado.
+        partida: Estado del partido en curso (client.Partida). Se conserva entre conexiones.
+        reconexiones (int): Registros aceptados despues del primero.
+        caidas_ms (List[float]): Duracion de cada corte, desde que se detecto hasta el nuevo OK.
+    """
+
+    def __init__(self, team_register: dict, caida_maxima_s: float = CAIDA_MAXIMA_S, backoff: Optional[Backoff] = None):
+        self.registro = json.dumps(team_register)
+        self.nombre = team_register.get('datos', {}).get('equipo', {}).get('nombre')
+        self.caida_maxima_s = caida_maxima_s
+        self.backoff = backoff or Backoff()
+        self.token: Optional[str] = None
+        self.equipo_id: Optional[str] = None
+        self.partida = None
+        self.reconexiones = 0
+        self.intentos_fallidos = 0
+        self.caidas_ms: List[float] = []
+        self._caida_desde: Optional[float] = None
+
+    @property
+    def caida_total_ms(self) -> float:
+        return sum(self.caidas_ms)
+
+    @property
+    def conectada(self) -> bool:
+        return self._caida_desde is None and self.token is not None
+
+    def registrada(self, token: str, equipo_id: str):
+        """Registra un OK del servidor. Si veniamos de un corte, cierra su medicion."""
+        if self._caida_desde is not None and self.token is None:
+            self._caida_desde = None                                          # Nunca estuvo conectada: no es una reconexion
+        elif self._caida_desde is not None:
+            caida_ms = (time.monotonic() - self._caida_desde) * 1000
+            self.caidas_ms.append(caida_ms)
+            self.reconexiones += 1
+            self._caida_desde = None
+            if self.partida is not None:
+                self.partida.metricas.contar('sesion.reconexiones')
+                self.partida.metricas.contar('sesion.caida_ms', round(caida_ms))
+            logger.warning('Reconectado (%s) en %.1f ms. Reconexiones: %d, tiempo sin conexion: %.1f ms',
+                           self.nombre, caida_ms, self.reconexiones, self.caida_total_ms)
+            if token != self.token:
+                logger.warning('El servidor asigno otro token al reconectar: %s', token)
+        self.token, self.equipo_id = token, equipo_id
+        self.backoff.reiniciar()
+
+    def cortada(self, error: BaseException) -> float:
+        """
+        Registra un corte o un intento fallido.
+
+        returns:
+            float: Segundos a esperar antes de volver a conectar.
+        raises:
+            SesionAgotada: Si el corte ya supera caida_maxima_s.
+        """
+        ahora = time.monotonic()
+        if self._caida_desde is None:
+            self._caida_desde = ahora
+            logger.warning('Conexion cortada (%s): %r. Reconectando...', self.nombre, error)
+        else:
+            self.intentos_fallidos += 1
+            logger.info('Reintento fallido (%s): %r', self.nombre, error)
+        if ahora - self._caida_desde > self.caida_maxima_s:
+            raise SesionAgotada(f'Sin conexion hace {ahora - self._caida_desde:.1f} s') from error
+        return self.backoff.siguiente()
+
+    def resumen(self) -> dict:
+        return {'nombre': self.nombre,
+                'token': self.token,
+                'reconexiones': self.reconexiones,
+                'intentos_fallidos': self.intentos_fallidos,
+                'caida_total_ms': self.caida_total_ms,
+                'caida_maxima_ms': max(self.caidas_ms, default=0.0)}
@@ -0,0 +1,275 @@
+"""
+Modelo simplificado de un partido para jugar sin el servidor del torneo.
+Arma los mensajes con el mismo formato que el servidor real (ver mensajes.py) y aplica
+las acciones CORRER, PATEAR, PASAR_PELOTA y MARCAR_ADVERSARIO con reglas simples:
+
+    - Cada CORRER/MARCAR_ADVERSARIO mueve al jugador un sector en horizontal o vertical hacia el objetivo.
+    - Quien llega al sector de la pelota libre se la queda. Marcar al poseedor en su sector puede robarla.
+    - Los pases y remates recorren la linea recta (tablas.linea) y cada rival en el camino puede cortarlos.
+    - Un remate que llega a un sector del arco rival puede ser gol. Despues de un gol saca el equipo que lo recibio.
+"""
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from grilla import ANCHO, ALTO, sector_id, posiciones_formacion
+from tablas import EUCLIDEA, linea
+
+PROB_ROBO = 0.5
+PROB_INTERCEPCION = 0.35
+DISTANCIA_GOL_SEGURO = 3
+
+class Jugador:
+    __slots__ = ('numero', 'nombre', 'equipo', 'x', 'y', 'es_el_crack')
+
+    def __init__(self, numero: int, nombre: str, equipo: int, x: int, y: int, es_el_crack: bool = False):
+        self.numero = numero
+        self.nombre = nombre
+        self.equipo = equipo
+        self.x = x
+        self.y = y
+        self.es_el_crack = es_el_crack
+
+def arco(rol: int) -> List[Dict[str, int]]:
+    y = 0 if rol == 1 else ALTO - 1
+    centro = ANCHO // 2
+    return [{'x': centro - 1, 'y': y}, {'x': centro, 'y': y}, {'x': centro + 1, 'y': y}]
+
+def _paso(x: int, y: int, objetivo_x: int, objetivo_y: int) -> Tuple[int, int]:
+    """Avanza un sector hacia el objetivo sobre el eje con mayor diferencia."""
+    dx, dy = objetivo_x - x, objetivo_y - y
+    if dx == 0 and dy == 0:
+        return x, y
+    if abs(dx) >= abs(dy):
+        return x + (1 if dx > 0 else -1), y
+    return x, y + (1 if dy > 0 else -1)
+
+class Partido:
+    """
+    Estado de un partido entre dos equipos registrados.
+
+    args:
+        registros (List[dict]): Mensajes REGISTRAR de cada equipo (como los de teams.py).
+        tokens (List[str]): Token asignado a cada equipo.
+        duracion_ms (int): Duracion del partido en milisegundos (valor inicial del reloj).
+        semilla (int | None): Semilla para los eventos aleatorios.
+    """
+
+    def __init__(self, registros: List[dict], tokens: List[str], duracion_ms: int = 180000, semilla: int | None = None):
+        self.rng = random.Random(semilla)
+        self.tokens = tokens
+        self.equipos = [registro['datos']['equipo'] for registro in registros]
+        self.goles = [0, 0]
+        self.reloj = duracion_ms
+        self.jugadores: List[List[Jugador]] = [[], []]
+        self.poseedor: Optional[Jugador] = None
+        self.pelota = (ANCHO // 2, ALTO // 2)
+        self.ultima_accion: List[Optional[dict]] = [None, None]
+        self.posesion = [0, 0]
+
+        for equipo, datos in enumerate(self.equipos):
+            for jugador in datos['jugadores']:
+                self.jugadores[equipo].append(Jugador(numero=jugador['numero'],
+                                                      nombre=jugador['nombre'],
+                                                      equipo=equipo,
+                                                      x=0, y=0,
+                                                      es_el_crack=bool(jugador.get('es_el_crack'))))
+        self.saque(0)
+
+    # --- Estado ---
+
+    def saque(self, equipo: int):
+        """Vuelve a la formacion inicial y le da la pelota al equipo indicado."""
+        for indice, datos in enumerate(self.equipos):
+            posiciones = posiciones_formacion(datos.get('formacion', '4-4-2'), rol=indice + 1)
+            for jugador, (x, y) in zip(self.jugadores[indice], posiciones):
+                jugador.x, jugador.y = x, y
+
+        registrados = self.equipos[equipo]['jugadores']
+        numero = next((j['numero'] for j in registrados if j.get('tiene_la_pelota')), registrados[-1]['numero'])
+        self.poseedor = self.buscar_jugador(equipo, numero)
+        self.pelota = (self.poseedor.x, self.poseedor.y)
+
+    def buscar_jugador(self, equipo: int, numero: int) -> Optional[Jugador]:
+        for jugador in self.jugadores[equipo]:
+            if jugador.numero == numero:
+                return jugador
+        return None
+
+    def equipo_de_token(self, token: str) -> Optional[int]:
+        return self.tokens.index(token) if token in self.tokens else None
+
+    @property
+    def terminado(self) -> bool:
+        return self.reloj <= 0
+
+    def avanzar_reloj(self, milisegundos: int):
+        self.reloj = max(self.reloj - milisegundos, 0)
+        if self.poseedor is not None:
+            self.posesion[self.poseedor.equipo] += milisegundos
+
+    # --- Mensajes ---
+
+    def cancha(self) -> dict:
+        """Arma el objeto 'cancha' con el formato del servidor."""
+        sectores: Dict[int, dict] = {}
+        for equipo, jugadores in enumerate(self.jugadores):
+            equipo_id = f'equipo:{self.tokens[equipo]}'
+            for jugador in jugadores:
+                id_sector = sector_id(jugador.x, jugador.y)
+                sector = sectores.get(id_sector)
+                if sector is None:
+                    sector = sectores[id_sector] = {'id': id_sector, 'x': jugador.x, 'y': jugador.y, 'ocupantes': []}
+                ocupante = {'numero': jugador.numero,
+                            'nombre': jugador.nombre,
+                            'equipo_id': equipo_id,
+                            'sector_id': id_sector,
+                            'tiene_la_pelota': jugador is self.poseedor}
+                if jugador.es_el_crack:
+                    ocupante['es_el_crack'] = True
+                sector['ocupantes'].append(ocupante)
+
+        x, y = self.pelota
+        ubicacion = {'id': sector_id(x, y), 'x': x, 'y': y}
+        if self.poseedor is None:
+            ubicacion['esta_la_pelota'] = True
+
+        equipos = [{'id': f'equipo:{self.tokens[i]}',
+                    'nombre': datos['nombre'],
+                    'formacion': datos.get('formacion', '4-4-2'),
+                    'rol': i + 1,
+                    'goles': self.goles[i],
+                    'arco': arco(i + 1)} for i, datos in enumerate(self.equipos)]
+
+        return {'tipo': 'cancha',
+                'id': 'cancha',
+                'equipo1': equipos[0],
+                'equipo2': equipos[1],
+                'sectores': list(sectores.values()),
+                'ubicacion_pelota': ubicacion,
+                'time_stamp': str(int(time.time() * 1000))}
+
+    def frame(self, equipo: int, cancha: dict | None = None) -> dict:
+        """
+        Arma el mensaje para un equipo: TIENES_LA_PELOTA si la tiene, REACCIONAR si no.
+        En REACCIONAR se reenvia la ultima accion del rival al principio de 'datos', como hace el servidor.
+        """
+        cancha = cancha or self.cancha()
+        datos = [cancha, {'tipo': 'reloj', 'reloj': self.reloj}]
+
+        if self.poseedor is not None and self.poseedor.equipo == equipo:
+            mensaje_id = 'TIENES_LA_PELOTA'
+        else:
+            mensaje_id = 'REACCIONAR'
+            eco = self.ultima_accion[1 - equipo]
+            if eco is not None:
+                datos.insert(0, eco)
+
+        return {'mensaje_id': mensaje_id, 'destinatario': self.tokens[equipo], 'datos': datos}
+
+    # --- Acciones ---
+
+    def aplicar(self, equipo: int, accion: dict) -> Optional[str]:
+        """
+        Aplica una accion de un equipo.
+
+        returns:
+            str: Descripcion del error si la accion no es valida. None si se aplico.
+        """
+        try:
+            mensaje_id = accion['mensaje_id']
+            datos = accion['datos']
+
+            if mensaje_id == 'CORRER':
+                for movimiento in datos['movimientos']:
+                    self.correr(equipo, movimiento['jugador_numero'], movimiento['x'], movimiento['y'])
+            elif mensaje_id == 'MARCAR_ADVERSARIO':
+                self.marcar(equipo, datos['jugador_numero'], datos['adversario_numero'])
+            elif mensaje_id == 'PATEAR':
+                error = self.patear(equipo, datos['x'], datos['y'])
+                if error:
+                    return error
+            elif mensaje_id == 'PASAR_PELOTA':
+                error = self.pasar(equipo, datos['jugador_numero'])
+                if error:
+                    return error
+            else:
+                return f'Accion desconocida: {mensaje_id}'
+        except (KeyError, TypeError) as e:
+            return f'Accion mal formada: {e}'
+
+        self.ultima_accion[equipo] = accion
+        return None
+
+    def correr(self, equipo: int, numero: int, x: int, y: int):
+        jugador = self.buscar_jugador(equipo, numero)
+        if jugador is None:
+            return
+        x = min(max(x, 0), ANCHO - 1)
+        y = min(max(y, 0), ALTO - 1)
+        jugador.x, jugador.y = _paso(jugador.x, jugador.y, x, y)
+
+        if jugador is self.poseedor:
+            self.pelota = (jugador.x, jugador.y)
+        elif self.poseedor is None and (jugador.x, jugador.y) == self.pelota:
+            self.poseedor = jugador
+
+    def marcar(self, equipo: int, numero: int, adversario: int):
+        jugador = self.buscar_jugador(equipo, numero)
+        rival = self.buscar_jugador(1 - equipo, adversario)
+        if jugador is None or rival is None:
+            return
+        self.correr(equipo, numero, rival.x, rival.y)
+
+        if rival is self.poseedor and (jugador.x, jugador.y) == (rival.x, rival.y) and self.rng.random() < PROB_ROBO:
+            self.poseedor = jugador
+
+    def _recorrer(self, equipo: int, destino: Tuple[int, int]) -> Optional[Jugador]:
+        """Recorre la linea de un pase/remate y devuelve el rival que lo corta, si hay."""
+        origen = sector_id(*self.pelota)
+        for id_sector in linea(origen, sector_id(*destino)).tolist():
+            for rival in self.jugadores[1 - equipo]:
+                if sector_id(rival.x, rival.y) == id_sector and self.rng.random() < PROB_INTERCEPCION:
+                    return rival
+        return None
+
+    def patear(self, equipo: int, x: int, y: int) -> Optional[str]:
+        if self.poseedor is None or self.poseedor.equipo != equipo:
+            return 'No tienes la pelota.'
+        x = min(max(x, 0), ANCHO - 1)
+        y = min(max(y, 0), ALTO - 1)
+
+        interceptor = self._recorrer(equipo, (x, y))
+        if interceptor is not None:
+            self.poseedor = interceptor
+            self.pelota = (interceptor.x, interceptor.y)
+            return None
+
+        arco_rival = arco(2 - equipo)
+        if {'x': x, 'y': y} in arco_rival:
+            distancia = EUCLIDEA.item(sector_id(*self.pelota), sector_id(x, y))
+            if self.rng.random() < min(1.0, DISTANCIA_GOL_SEGURO / max(distancia, 1.0)):
+                self.goles[equipo] += 1
+                self.saque(1 - equipo)
+                return None
+            # Atajada: la pelota queda para el arquero rival
+            arquero = self.jugadores[1 - equipo][0]
+            self.poseedor = arquero
+            self.pelota = (arquero.x, arquero.y)
+            return None
+
+        self.poseedor = None
+        self.pelota = (x, y)
+        return None
+
+    def pasar(self, equipo: int, numero: int) -> Optional[str]:
+        if self.poseedor is None or self.poseedor.equipo != equipo:
+            return 'No tienes la pelota.'
+        receptor = self.buscar_jugador(equipo, numero)
+        if receptor is None:
+            return f'Jugador inexistente: {numero}'
+
+        interceptor = self._recorrer(equipo, (receptor.x, receptor.y))
+        self.poseedor = interceptor or receptor
+        self.pelota = (self.poseedor.x, self.poseedor.y)
+        return None
@@ -0,0 +1,172 @@
+"""
+Tablas precalculadas entre los sectores de la cancha.
+
+Las distancias, los pasos y las lineas rectas entre los 260 sectores no cambian entre partidos,
+por lo que se calculan una sola vez y se guardan en cache/tablas.npz. Al importar el modulo se
+cargan desde el disco (o se regeneran si el archivo no existe o es de otra version).
+
+Uso (desde la raiz del repo):
+    python -m tablas --regenerar    Vuelve a calcular las tablas y las guarda.
+    python -m tablas --validar      Compara las tablas contra el calculo directo.
+"""
+import argparse
+import logging
+import os
+import zipfile
+from math import sqrt
+from typing import List
+
+import numpy as np
+
+from grilla import ANCHO, ALTO, N_SECTORES
+
+logger = logging.getLogger('tablas')
+
+VERSION = 1
+ARCHIVO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'tablas.npz')
+
+# Coordenadas de cada sector, indexadas por id de sector
+SECTOR_X = np.arange(N_SECTORES) % ANCHO
+SECTOR_Y = np.arange(N_SECTORES) // ANCHO
+
+def _calcular() -> dict:
+    """Calcula todas las tablas con numpy."""
+    dx = np.abs(SECTOR_X[:, None] - SECTOR_X[None, :])
+    dy = np.abs(SECTOR_Y[:, None] - SECTOR_Y[None, :])
+
+    euclidea = np.sqrt(dx ** 2 + dy ** 2)
+    chebyshev = np.maximum(dx, dy).astype(np.int8)
+    # Se asume que cada movimiento avanza un sector en horizontal o en vertical
+    pasos = (dx + dy).astype(np.int8)
+
+    # Lineas rectas: para cada par (origen, destino) los sectores que atraviesa, sin el origen y con el destino.
+    # Se muestrea la recta en tantos puntos como la distancia de Chebyshev, redondeando al sector mas cercano.
+    largos = chebyshev.astype(np.int32).ravel()
+    inicio = np.zeros(N_SECTORES * N_SECTORES + 1, dtype=np.int32)
+    np.cumsum(largos, out=inicio[1:])
+
+    par = np.repeat(np.arange(N_SECTORES * N_SECTORES), largos)
+    paso = np.arange(inicio[-1]) - inicio[par] + 1
+    origen, destino = np.divmod(par, N_SECTORES)
+    t = paso / largos[par]
+    x = np.floor(SECTOR_X[origen] + (SECTOR_X[destino] - SECTOR_X[origen]) * t + 0.5).astype(np.int32)
+    y = np.floor(SECTOR_Y[origen] + (SECTOR_Y[destino] - SECTOR_Y[origen]) * t + 0.5).astype(np.int32)
+    sectores = (y * ANCHO + x).astype(np.int16)
+
+    return {'version': np.array(VERSION),
+            'forma': np.array((ANCHO, ALTO)),
+            'euclidea': euclidea,
+            'chebyshev': chebyshev,
+            'pasos': pasos,
+            'linea_inicio': inicio,
+            'linea_sectores': sectores}
+
+def regenerar(archivo: str = ARCHIVO_CACHE) -> dict:
+    """Calcula las tablas y las guarda en el archivo de cache."""
+    tablas = _calcular()
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    # Otros procesos pueden estar cargando el mismo archivo: se escribe aparte y se reemplaza entero
+    temporal = f'{archivo}.{os.getpid()}.tmp'
+    try:
+        with open(temporal, 'wb') as salida:
+            np.savez(salida, **tablas)
+        os.replace(temporal, archivo)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    logger.info('Tablas regeneradas en %s', archivo)
+    return tablas
+
+def cargar(archivo: str = ARCHIVO_CACHE) -> dict:
+    """Carga las tablas desde el cache. Si no existe o no coincide la version, las regenera."""
+    try:
+        with np.load(archivo) as datos:
+            tablas = {nombre: datos[nombre] for nombre in datos.files}
+        if int(tablas['version']) == VERSION and tuple(tablas['forma']) == (ANCHO, ALTO):
+            return tablas
+        logger.warning('Cache de tablas desactualizado. Regenerando...')
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        logger.info('No se encontro el cache de tablas o esta incompleto. Generando...')
+
+    try:
+        return regenerar(archivo)
+    except OSError as e:
+        # Sin permisos de escritura se trabaja con las tablas en memoria
+        logger.error('No se pudo guardar el cache de tablas. Error: %s', e)
+        return _calcular()
+
+_tablas = cargar()
+
+EUCLIDEA: np.ndarray = _tablas['euclidea']
+CHEBYSHEV: np.ndarray = _tablas['chebyshev']
+PASOS: np.ndarray = _tablas['pasos']
+LINEA_INICIO: np.ndarray = _tablas['linea_inicio']
+LINEA_SECTORES: np.ndarray = _tablas['linea_sectores']
+
+def en_cancha(x: int, y: int) -> bool:
+    """Indica si una posicion esta dentro de la grilla."""
+    return 0 <= x < ANCHO and 0 <= y < ALTO
+
+def linea(origen: int, destino: int) -> np.ndarray:
+    """
+    Obtiene los sectores que atraviesa una linea recta (pase o remate).
+
+    args:
+        origen (int): Id del sector de salida.
+        destino (int): Id del sector de llegada.
+    returns:
+        np.ndarray: Ids de los sectores atravesados en orden, sin el origen y con el destino.
+    """
+    par = origen * N_SECTORES + destino
+    return LINEA_SECTORES[LINEA_INICIO[par]:LINEA_INICIO[par + 1]]
+
+def validar() -> List[str]:
+    """
+    Compara las tablas contra el calculo directo de utils.distancia y de cada metrica.
+
+    returns:
+        List[str]: Errores encontrados. Vacia si las tablas son correctas.
+    """
+    from mensajes import coordenada
+    from utils import distancia
+
+    errores = []
+    for origen in range(N_SECTORES):
+        x0, y0 = int(SECTOR_X[origen]), int(SECTOR_Y[origen])
+        for destino in range(N_SECTORES):
+            x1, y1 = int(SECTOR_X[destino]), int(SECTOR_Y[destino])
+            esperada = sqrt((x0 - x1)**2 + (y0 - y1)**2)
+
+            if EUCLIDEA[origen, destino] != esperada:
+                errores.append(f'euclidea({origen}, {destino}) = {EUCLIDEA[origen, destino]}, se esperaba {esperada}')
+            if distancia(coordenada(x0, y0), coordenada(x1, y1)) != esperada:
+                errores.append(f'utils.distancia({origen}, {destino}) no coincide con {esperada}')
+            if CHEBYSHEV[origen, destino] != max(abs(x0 - x1), abs(y0 - y1)):
+                errores.append(f'chebyshev({origen}, {destino}) incorrecta')
+            if PASOS[origen, destino] != abs(x0 - x1) + abs(y0 - y1):
+                errores.append(f'pasos({origen}, {destino}) incorrectos')
+
+            recorrido = [origen] + linea(origen, destino).tolist()
+            if recorrido[-1] != destino:
+                errores.append(f'linea({origen}, {destino}) no termina en el destino')
+            for a, b in zip(recorrido, recorrido[1:]):
+                if CHEBYSHEV[a, b] != 1:
+                    errores.append(f'linea({origen}, {destino}) salta de {a} a {b}')
+                    break
+    return errores
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--regenerar', action='store_true', help='Recalcula las tablas y las guarda en el cache.')
+    parser.add_argument('--validar', action='store_true', help='Compara las tablas contra el calculo directo.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    if args.regenerar:
+        regenerar()
+    if args.validar:
+        errores = validar()
+        for error in errores[:20]:
+            logger.error(error)
+        logger.info('Validacion terminada: %d errores.', len(errores))
+        raise SystemExit(1 if errores else 0)
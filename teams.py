@@ -44,4 +44,10 @@ TEAM_LANUS = {
             "formacion":"4-3-3"
         }
       }
-    }
\ No newline at end of file
+    }
+
+# Equipos disponibles para runner.py, por nombre
+EQUIPOS = {
+    'TEAM_PIN': TEAM_PIN,
+    'TEAM_LANUS': TEAM_LANUS,
+}
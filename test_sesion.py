@@ -0,0 +1,80 @@
+"""
+Reconexion del cliente contra servidor_local.py con cortes al azar (--caos).
+
+Uso (desde la raiz del repo):
+    python -m pytest -q test_sesion.py
+"""
+import asyncio
+import logging
+import socket
+
+import websockets
+
+import client
+from servidor_local import ServidorLocal
+from teams import TEAM_PIN
+
+CAOS = 0.01                                                                   # Con 200 fps: un corte cada medio segundo en promedio
+FPS = 200
+DURACION_S = 3
+TIMEOUT_S = 60
+
+class _ServidorRegistrado(ServidorLocal):
+    """Servidor local que guarda las conexiones de los partidos terminados."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.terminadas = []
+
+    def informar(self, conexion):
+        super().informar(conexion)
+        self.terminadas.append(conexion)
+
+async def _jugar_contra(servidor: ServidorLocal, **kwargs):
+    async with websockets.serve(servidor.atender, 'localhost', 0) as server:
+        puerto = server.sockets[0].getsockname()[1]
+        return await asyncio.wait_for(client.jugar(f'ws://localhost:{puerto}', TEAM_PIN, **kwargs), TIMEOUT_S)
+
+def _puerto_libre() -> int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+def test_reconecta_y_termina_el_partido(monkeypatch):
+    partidas = []
+
+    class PartidaContada(client.Partida):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            partidas.append(self)
+
+    monkeypatch.setattr(client, 'Partida', PartidaContada)
+    monkeypatch.setattr(client, 'PRECALENTAR', False)
+    logging.disable(logging.INFO)
+    try:
+        servidor = _ServidorRegistrado(fps=FPS, duracion=DURACION_S, bot=True, semilla=0, caos=CAOS)
+        sesion = asyncio.run(_jugar_contra(servidor))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert sesion.reconexiones > 0
+    assert len(servidor.terminadas) == 1                                      # Un solo partido, terminado por el servidor
+    conexion = servidor.terminadas[0]
+    assert conexion.partido.terminado
+    assert conexion.reconexiones == sesion.reconexiones
+    # La misma Partida siguio a traves de las reconexiones, con el token del servidor
+    assert partidas == [sesion.partida]
+    assert sesion.token == conexion.token == sesion.partida.codificador.token
+    assert sesion.partida.metricas.contadores['sesion.reconexiones'] == sesion.reconexiones
+    assert sesion.partida.estado.frames > 0
+
+def test_sesion_agotada_no_lanza():
+    logging.disable(logging.CRITICAL)
+    try:
+        sesion = asyncio.run(client.jugar(f'ws://localhost:{_puerto_libre()}', TEAM_PIN, caida_maxima_s=0.2))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert sesion.token is None
+    assert sesion.partida is None
+    assert sesion.intentos_fallidos > 0
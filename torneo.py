@@ -0,0 +1,297 @@
+"""
+Torneo de estrategias sobre simulador.Partido, sin servidor ni sockets.
+
+Cada par de estrategias juega la cantidad de partidos pedida, uno por semilla, repartidos en un
+pool de procesos. En cada tick del partido los dos equipos reciben el frame de la misma cancha
+(como en servidor_local.py), deciden con su estrategia rapida y las dos acciones se aplican, en
+orden alternado. Las semillas pares juega la primera estrategia del par con el equipo 0 (el que
+saca) y las impares con el equipo 1; los dos equipos usan el registro de TEAM_PIN, asi el unico
+cambio entre lados es la estrategia.
+
+Por par se informan goles, diferencia de gol, puntos (1 ganar, 0.5 empatar), posesion y la
+latencia media de decision de cada estrategia, con intervalos de confianza del 95% (aproximacion
+normal: con pocos partidos quedan angostos de mas).
+
+Una estrategia se nombra como en estrategias.py ('modulo' o 'modulo:atributo' con un dict
+ESTRATEGIAS) o con uno de los nombres de PREDEFINIDAS. Solo se usan las estrategias rapidas.
+Los resultados se guardan en cache/torneo.json por (hash de cada estrategia, semilla,
+configuracion): al repetir el torneo solo se juegan los partidos nuevos. El hash de una estrategia
+es el de los archivos del repo que usan sus funciones: los modulos que las definen y los que
+esos importan, recursivamente (ver estrategias.modulos_locales); la configuracion incluye de la misma forma
+el codigo de simulador.py y sus modulos.
+
+Uso:
+    python torneo.py basica por_defecto --partidos 1000
+    python torneo.py por_defecto mi_modulo otro_modulo:ESTRATEGIAS_B --partidos 2000 --procesos 8 --duracion 60
+"""
+import argparse
+import hashlib
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist, mean, stdev
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from mensajes import CodificadorAcciones, MensajeReaccionar, MensajeTienesLaPelota, decodificar_mensaje
+from log import configurar_hot_path
+from estrategias import DIRECTORIO_REPO, modulos_locales, olvidar_equipo, validar_formato
+from utils import buscar_pelota, patear_al_arco
+
+logger = logging.getLogger('torneo')
+
+ARCHIVO_CACHE = os.path.join(DIRECTORIO_REPO, 'cache', 'torneo.json')
+VERSION_CACHE = 1
+DURACION_S = 30                                                               # Tiempo de juego de cada partido
+FPS = 10                                                                      # Ticks por segundo de juego
+CONFIANZA = 0.95
+GUARDAR_CADA = 500                                                            # Partidos nuevos entre escrituras del cache (un torneo cortado no se pierde)
+PREDEFINIDAS = {
+    'basica': 'torneo:ESTRATEGIAS_BASICAS',                                   # patear_al_arco y buscar_pelota de utils
+    'por_defecto': 'planificador:ESTRATEGIAS_POR_DEFECTO',
+}
+
+ESTRATEGIAS_BASICAS = {MensajeTienesLaPelota: (patear_al_arco, None), MensajeReaccionar: (buscar_pelota, None)}
+
+class Configuracion(NamedTuple):
+    duracion_s: float = DURACION_S
+    fps: float = FPS
+
+# --- Estrategias ---
+
+_cargadas: Dict[str, dict] = {}                                               # Por nombre, en cada proceso
+
+def cargar(nombre: str) -> dict:
+    """Estrategias del planificador a partir de su nombre ('modulo', 'modulo:atributo' o PREDEFINIDAS)."""
+    estrategias = _cargadas.get(nombre)
+    if estrategias is None:
+        modulo, _, atributo = PREDEFINIDAS.get(nombre, nombre).partition(':')
+        estrategias = _cargadas[nombre] = validar_formato(getattr(importlib.import_module(modulo), atributo or 'ESTRATEGIAS'))
+    return estrategias
+
+def _hash_archivos(archivos) -> hashlib.sha256:
+    h = hashlib.sha256()
+    for archivo in sorted(archivos):
+        h.update(os.path.relpath(archivo, DIRECTORIO_REPO).encode())
+        with open(archivo, 'rb') as entrada:
+            h.update(entrada.read())
+    return h
+
+def hash_estrategia(nombre: str) -> str:
+    """Hash de los archivos del repo que usan las funciones de la estrategia (ver modulos_locales)."""
+    modulos = []
+    for funciones in cargar(nombre).values():
+        for funcion in funciones:
+            if funcion is None:
+                continue
+            modulo = inspect.getmodule(funcion if inspect.isroutine(funcion) else type(funcion))
+            if modulo is not None:
+                modulos.append(modulo)
+    return _hash_archivos(modulos_locales(modulos).values()).hexdigest()[:16]
+
+def hash_configuracion(configuracion: Configuracion) -> str:
+    import simulador
+    h = _hash_archivos(modulos_locales([simulador]).values())
+    h.update(repr(tuple(configuracion)).encode())
+    return h.hexdigest()[:16]
+
+# --- Partidos ---
+
+def jugar_partido(nombres: Tuple[str, str], semilla: int, configuracion: Configuracion) -> dict:
+    """
+    Juega un partido entre las dos estrategias. Corre en un proceso del pool.
+
+    returns:
+        dict: Goles, posesion (fraccion), latencia media de decision (us) y acciones rechazadas
+            de cada estrategia, en el orden de `nombres`.
+    """
+    from simulador import Partido
+    from teams import TEAM_PIN
+
+    random.seed(semilla)                                                      # Por si alguna estrategia usa azar
+    np.random.seed(semilla % 2 ** 32)
+    lados = (0, 1) if semilla % 2 == 0 else (1, 0)                            # lados[i]: equipo de la estrategia i
+    estrategias = [cargar(nombres[lados.index(equipo)]) for equipo in (0, 1)]
+    tokens = [f'TOKEN-torneo-{semilla}-{equipo}' for equipo in (0, 1)]       # Uno por partido: las estrategias con memoria arrancan de cero y se olvidan al final
+    codificadores = [CodificadorAcciones(token) for token in tokens]
+    partido = Partido([TEAM_PIN, TEAM_PIN], tokens, duracion_ms=int(configuracion.duracion_s * 1000), semilla=semilla)
+    paso_ms = max(round(1000 / configuracion.fps), 1)
+
+    decisiones = [0, 0]
+    tiempo_ns = [0, 0]
+    rechazadas = [0, 0]
+    tick = 0
+    try:
+        while not partido.terminado:
+            cancha = partido.cancha()
+            acciones = []
+            for equipo in (0, 1):
+                mensaje = decodificar_mensaje(json.dumps(partido.frame(equipo, cancha)), confiable=True)
+                rapida, _ = estrategias[equipo][type(mensaje)]
+                inicio = time.perf_counter_ns()
+                accion = rapida(codificadores[equipo], mensaje, tokens[equipo])
+                tiempo_ns[equipo] += time.perf_counter_ns() - inicio
+                decisiones[equipo] += 1
+                acciones.append(json.loads(accion))
+            for equipo in ((0, 1) if tick % 2 == 0 else (1, 0)):
+                if partido.aplicar(equipo, acciones[equipo]):
+                    rechazadas[equipo] += 1
+            partido.avanzar_reloj(paso_ms)
+            tick += 1
+    finally:
+        for equipo in (0, 1):
+            olvidar_equipo(estrategias[equipo], tokens[equipo])               # En el pool se juegan miles de partidos por proceso
+
+    total_posesion = sum(partido.posesion) or 1
+    return {'goles': [partido.goles[lados[i]] for i in (0, 1)],
+            'posesion': [partido.posesion[lados[i]] / total_posesion for i in (0, 1)],
+            'latencia_us': [tiempo_ns[lados[i]] / max(decisiones[lados[i]], 1) / 1e3 for i in (0, 1)],
+            'rechazadas': [rechazadas[lados[i]] for i in (0, 1)]}
+
+def _jugar(tarea: tuple) -> dict:
+    return jugar_partido(*tarea)
+
+def _iniciar_proceso():
+    configurar_hot_path(silencioso=True)
+    logging.disable(logging.INFO)
+
+# --- Cache ---
+
+def cargar_cache(archivo: str = ARCHIVO_CACHE) -> Dict[str, dict]:
+    try:
+        with open(archivo, encoding='utf-8') as entrada:
+            cache = json.load(entrada)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('partidos', {}) if cache.get('version') == VERSION_CACHE else {}
+
+def guardar_cache(partidos: Dict[str, dict], archivo: str = ARCHIVO_CACHE):
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    temporal = f'{archivo}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as salida:
+        json.dump({'version': VERSION_CACHE, 'partidos': partidos}, salida)
+    os.replace(temporal, archivo)
+
+def clave_partido(hashes: Tuple[str, str], semilla: int, configuracion: str) -> str:
+    return f'{hashes[0]}:{hashes[1]}:{semilla}:{configuracion}'
+
+# --- Torneo ---
+
+def jugar_torneo(nombres: List[str], partidos: int, configuracion: Configuracion = Configuracion(),
+                 procesos: int = 0, usar_cache: bool = True, semilla_inicial: int = 0) -> Dict[Tuple[str, str], List[dict]]:
+    """
+    Todos contra todos: cada par de estrategias juega `partidos` partidos, uno por semilla.
+
+    returns:
+        Dict[Tuple[str, str], List[dict]]: Resultados de cada partido (ver jugar_partido), por par.
+    """
+    hashes = {nombre: hash_estrategia(nombre) for nombre in nombres}
+    config = hash_configuracion(configuracion)
+    cache = cargar_cache() if usar_cache else {}
+    pares = list(itertools.combinations(nombres, 2))
+    semillas = range(semilla_inicial, semilla_inicial + partidos)
+
+    resultados: Dict[Tuple[str, str], List[dict]] = {par: [] for par in pares}
+    pendientes: List[Tuple[Tuple[str, str], int, str]] = []
+    for par in pares:
+        for semilla in semillas:
+            clave = clave_partido((hashes[par[0]], hashes[par[1]]), semilla, config)
+            if clave in cache:
+                resultados[par].append(cache[clave])
+            else:
+                pendientes.append((par, semilla, clave))
+
+    logger.info('%d partidos: %d en el cache, %d por jugar', len(pares) * len(semillas),
+                len(pares) * len(semillas) - len(pendientes), len(pendientes))
+    if pendientes:
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        tareas = [(par, semilla, configuracion) for par, semilla, _ in pendientes]
+        inicio = time.perf_counter()
+        ejecutor = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) if procesos > 1 else None
+        try:
+            if ejecutor is None:
+                _iniciar_proceso()
+                nuevos = map(_jugar, tareas)
+            else:
+                nuevos = ejecutor.map(_jugar, tareas, chunksize=max(1, min(64, len(tareas) // (procesos * 8))))
+            for jugados, ((par, _, clave), resultado) in enumerate(zip(pendientes, nuevos), 1):
+                resultados[par].append(resultado)
+                cache[clave] = resultado
+                if usar_cache and jugados % GUARDAR_CADA == 0:
+                    guardar_cache(cache)
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown(cancel_futures=True)
+            if usar_cache:
+                guardar_cache(cache)
+        duracion = time.perf_counter() - inicio
+        logger.info('%d partidos jugados en %.1f s con %d procesos (%.1f partidos/s)',
+                    len(pendientes), duracion, procesos, len(pendientes) / duracion)
+    return resultados
+
+class Estimacion(NamedTuple):
+    media: float
+    margen: float                                                             # Medio ancho del intervalo de confianza
+
+    def __str__(self) -> str:
+        return f'{self.media:.3f} ± {self.margen:.3f}'
+
+def estimar(valores: List[float], confianza: float = CONFIANZA) -> Estimacion:
+    if len(valores) < 2:
+        return Estimacion(valores[0] if valores else 0.0, float('inf'))
+    z = NormalDist().inv_cdf(0.5 + confianza / 2)
+    return Estimacion(mean(valores), z * stdev(valores) / len(valores) ** 0.5)
+
+def resumir(par: Tuple[str, str], partidos: List[dict]) -> Dict[str, Estimacion]:
+    """Estimaciones desde el punto de vista de la primera estrategia del par."""
+    diferencias = [p['goles'][0] - p['goles'][1] for p in partidos]
+    return {'partidos': len(partidos),
+            f'goles {par[0]}': estimar([p['goles'][0] for p in partidos]),
+            f'goles {par[1]}': estimar([p['goles'][1] for p in partidos]),
+            'diferencia': estimar(diferencias),
+            f'puntos {par[0]}': estimar([1.0 if d > 0 else 0.5 if d == 0 else 0.0 for d in diferencias]),
+            f'posesion {par[0]}': estimar([p['posesion'][0] for p in partidos]),
+            f'latencia us {par[0]}': estimar([p['latencia_us'][0] for p in partidos]),
+            f'latencia us {par[1]}': estimar([p['latencia_us'][1] for p in partidos]),
+            f'rechazadas {par[0]}': estimar([p['rechazadas'][0] for p in partidos]),
+            f'rechazadas {par[1]}': estimar([p['rechazadas'][1] for p in partidos])}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('estrategias', nargs='+', help=f'Al menos dos. Predefinidas: {", ".join(PREDEFINIDAS)}')
+    parser.add_argument('--partidos', type=int, default=1000, help='Partidos por par de estrategias.')
+    parser.add_argument('--procesos', type=int, default=0, help='0 usa uno por core.')
+    parser.add_argument('--duracion', type=float, default=DURACION_S, help='Segundos de juego por partido.')
+    parser.add_argument('--fps', type=float, default=FPS, help='Ticks por segundo de juego.')
+    parser.add_argument('--semilla', type=int, default=0, help='Primera semilla.')
+    parser.add_argument('--sin-cache', action='store_true', help='Juega todos los partidos y no actualiza el cache.')
+    parser.add_argument('--salida', help='Guarda los resumenes en un JSON.')
+    args = parser.parse_args()
+    if len(args.estrategias) < 2:
+        parser.error('Hacen falta al menos dos estrategias.')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    configurar_hot_path(silencioso=True)
+
+    resultados = jugar_torneo(args.estrategias, args.partidos, Configuracion(args.duracion, args.fps),
+                              procesos=args.procesos, usar_cache=not args.sin_cache, semilla_inicial=args.semilla)
+    resumenes = {}
+    for par, partidos in resultados.items():
+        resumen = resumenes[f'{par[0]} vs {par[1]}'] = resumir(par, partidos)
+        print(f'\n{par[0]} vs {par[1]} ({resumen["partidos"]} partidos, IC {CONFIANZA:.0%})')
+        for nombre, valor in resumen.items():
+            if nombre != 'partidos':
+                print(f'  {nombre:<36}{valor}')
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as salida:
+            json.dump({par: {nombre: list(valor) if isinstance(valor, tuple) else valor for nombre, valor in resumen.items()}
+                       for par, resumen in resumenes.items()}, salida, indent=2)
+
+if __name__ == '__main__':
+    main()
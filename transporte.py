@@ -0,0 +1,99 @@
+"""
+Perfiles de transporte de la conexion websocket y eleccion del event loop.
+
+Un perfil reune lo que se le pasa a websockets.connect (compresion por mensaje, tamaño maximo
+de frame, colas de lectura y escritura, pings) y lo que se ajusta sobre el socket ya conectado
+(TCP_NODELAY y el buffer de lectura del kernel, SO_RCVBUF). client.jugar usa PERFILES[client.PERFIL_TRANSPORTE].
+
+    por_defecto:    Los valores de websockets: permessage-deflate, max_size 1 MiB, max_queue 16,
+                    write_limit 32 KiB, ping cada 20 s.
+    baja_latencia:  Sin compresion (los frames son chicos y deflate cuesta CPU en los dos
+                    extremos), cola de lectura mas larga para que el servidor no se frene si el
+                    Receptor se atrasa, escritura sin acumular y pings mas seguidos para
+                    detectar antes una conexion muerta (ver sesion.py).
+
+El event loop se elige con ejecutar(): 'uvloop' si esta instalado, si no el de asyncio.
+La comparacion entre perfiles esta en benchmarks/bench_transporte.py.
+"""
+import asyncio
+import logging
+import socket
+from typing import Awaitable, Dict, NamedTuple, Optional, TypeVar
+
+logger = logging.getLogger('transporte')
+
+T = TypeVar('T')
+
+LOOP_AUTOMATICO = 'auto'                                                      # uvloop si esta instalado, si no asyncio
+LOOP_UVLOOP = 'uvloop'
+LOOP_ASYNCIO = 'asyncio'
+
+class PerfilTransporte(NamedTuple):
+    nombre: str
+    compresion: bool = True                                                   # permessage-deflate
+    max_size: Optional[int] = 2 ** 20                                         # Bytes por mensaje recibido (None: sin limite)
+    max_queue: Optional[int] = 16                                             # Mensajes recibidos sin leer antes de dejar de leer el socket
+    write_limit: int = 2 ** 15                                                # Bytes en el buffer de escritura antes de esperar en send
+    tcp_nodelay: bool = True                                                  # asyncio ya lo activa en los sockets TCP; False vuelve a Nagle
+    buffer_lectura: Optional[int] = None                                      # SO_RCVBUF en bytes (None: el del sistema)
+    ping_interval: Optional[float] = 20                                       # Segundos (None: sin pings)
+    ping_timeout: Optional[float] = 20
+    event_loop: str = LOOP_AUTOMATICO
+
+    def argumentos_connect(self) -> dict:
+        """Argumentos de websockets.connect para el perfil."""
+        return {'compression': 'deflate' if self.compresion else None,
+                'max_size': self.max_size,
+                'max_queue': self.max_queue,
+                'write_limit': self.write_limit,
+                'ping_interval': self.ping_interval,
+                'ping_timeout': self.ping_timeout}
+
+PERFILES: Dict[str, PerfilTransporte] = {
+    'por_defecto': PerfilTransporte('por_defecto', event_loop=LOOP_ASYNCIO),
+    'baja_latencia': PerfilTransporte('baja_latencia', compresion=False, max_queue=256, write_limit=0,
+                                      ping_interval=5, ping_timeout=5),
+}
+
+def ajustar_socket(websocket, perfil: PerfilTransporte):
+    """Aplica las opciones del perfil al socket de una conexion abierta."""
+    sock = websocket.transport.get_extra_info('socket')
+    if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(perfil.tcp_nodelay))
+    except OSError as e:
+        logger.warning('No se pudo ajustar TCP_NODELAY: %s', e)
+    if perfil.buffer_lectura is not None:
+        # Con la conexion ya abierta la escala de la ventana TCP quedo negociada: el buffer puede achicarse, no crecer mas alla de ella
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, perfil.buffer_lectura)
+        except OSError as e:
+            logger.warning('No se pudo ajustar SO_RCVBUF: %s', e)
+
+def fabrica_loop(event_loop: str = LOOP_AUTOMATICO):
+    """
+    Fabrica del event loop pedido. None es el loop por defecto de asyncio.
+    Si se pide uvloop y no esta instalado se usa asyncio.
+    """
+    if event_loop == LOOP_ASYNCIO:
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        if event_loop == LOOP_UVLOOP:
+            logger.warning('uvloop no esta instalado. Se usa el event loop de asyncio.')
+        return None
+    return uvloop.new_event_loop
+
+def ejecutar(corrutina: Awaitable[T], perfil: PerfilTransporte) -> T:
+    """asyncio.run con el event loop del perfil."""
+    fabrica = fabrica_loop(perfil.event_loop)
+    if fabrica is None:
+        return asyncio.run(corrutina)
+    with asyncio.Runner(loop_factory=fabrica) as runner:
+        return runner.run(corrutina)
+
+def nombre_loop() -> str:
+    """Modulo del event loop que esta corriendo (para los reportes)."""
+    return type(asyncio.get_running_loop()).__module__.split('.')[0]
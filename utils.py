@@ -7,16 +7,11 @@ from mensajes import (
                       Coordenada,
                       Ocupante,
                       CanchaData,
-                      MensajeCorrer,
-                      MensajePatear,
-                      MensajePasarPelota,
-                      MensajeMarcarAdversario,
-                      ClientMessage,
-                      correr,
-                      pasar_pelota,
-                      patear,
-                      marcar_adversario
+                      CodificadorAcciones,
+                      coordenada
                       )
+from grilla import Grilla, sector_id
+from tablas import EUCLIDEA, en_cancha
 
 logger = logging.getLogger('utils')
 
@@ -38,217 +33,241 @@ def get_cancha(mensaje: MensajeTienesLaPelota | MensajeReaccionar) -> CanchaData
     try:
         cancha: CanchaData = next(filter(lambda x: type(x) == CanchaData , mensaje.datos))
     except Exception as e:
-        logger.error(f'Error al obtener la cancha. Error: {e}')
+        logger.error('Error al obtener la cancha. Error: %s', e)
     
     return cancha
 
-def get_posicion_jugadores(mensaje: MensajeTienesLaPelota | MensajeReaccionar, equipo_id: str) -> List[Dict]:
+class CanchaIndex:
     """
-    Obtiene las posiciones de todos los jugadores de tu equipo.
+    Indice de la cancha construido en una sola pasada sobre los sectores.
+    Se arma una vez por mensaje y lo comparten todas las funciones auxiliares.
+
+    atributos:
+        cancha (CanchaData): Objeto cancha del mensaje.
+        jugadores (Dict[int, Coordenada]): Posicion de tus jugadores por numero.
+        adversarios (Dict[int, Coordenada]): Posicion de los adversarios por numero.
+        ocupantes (Dict[int, List[Ocupante]]): Ocupantes de cada sector por id.
+        poseedor (int | None): Numero del jugador que tiene la pelota.
+        poseedor_es_adversario (bool): Flag que indica si la pelota la tiene el rival.
+        pelota (Coordenada): Posicion de la pelota.
+        arco_propio (Tuple[Coordenada, Coordenada, Coordenada]): Arco de tu equipo.
+        arco_rival (Tuple[Coordenada, Coordenada, Coordenada]): Arco del equipo rival.
+        grilla (Grilla): Representacion con arrays de la cancha, se construye al primer uso.
+    """
+    __slots__ = ('cancha', 'equipo_id', 'jugadores', 'adversarios', 'ocupantes',
+                 'poseedor', 'poseedor_es_adversario', 'pelota', 'arco_propio', 'arco_rival', '_grilla')
+
+    def __init__(self, cancha: CanchaData, equipo_id: str):
+        self.cancha = cancha
+        self.equipo_id = equipo_id
+        self.jugadores: Dict[int, Coordenada] = {}
+        self.adversarios: Dict[int, Coordenada] = {}
+        self.ocupantes: Dict[int, List[Ocupante]] = {}
+        self.poseedor: int | None = None
+        self.poseedor_es_adversario = False
+        self._grilla: Grilla | None = None
+
+        id_propio = f'equipo:{equipo_id}'
+        for sector in cancha.sectores:
+            if not sector.ocupantes:
+                continue
+            # Una sola Coordenada por sector, compartida por todos sus ocupantes
+            coord = coordenada(sector.x, sector.y)
+            self.ocupantes.setdefault(sector.id, []).extend(sector.ocupantes)
+            for ocupante in sector.ocupantes:
+                es_adversario = ocupante.equipo_id != id_propio
+                equipo = self.adversarios if es_adversario else self.jugadores
+                equipo.setdefault(ocupante.numero, coord)
+                if ocupante.tiene_la_pelota == True and self.poseedor is None:
+                    self.poseedor = ocupante.numero
+                    self.poseedor_es_adversario = es_adversario
+                    self.pelota = coord
+
+        ubicacion = cancha.ubicacion_pelota
+        if ubicacion.esta_la_pelota != True and self.poseedor is None:
+            logger.info('Pelota en el aire.')
+        if ubicacion.esta_la_pelota == True or self.poseedor is None:
+            # La pelota esta en el suelo (o en el aire) y no la tiene nadie
+            self.poseedor = None
+            self.poseedor_es_adversario = False
+            self.pelota = coordenada(ubicacion.x, ubicacion.y)
+
+        if cancha.equipo1.id == id_propio:
+            self.arco_propio, self.arco_rival = cancha.equipo1.arco, cancha.equipo2.arco
+        else:
+            self.arco_propio, self.arco_rival = cancha.equipo2.arco, cancha.equipo1.arco
+
+    @property
+    def grilla(self) -> Grilla:
+        if self._grilla is None:
+            self._grilla = Grilla(self.jugadores, self.adversarios, self.pelota)
+        return self._grilla
+
+def indexar_cancha(mensaje: MensajeTienesLaPelota | MensajeReaccionar, equipo_id: str) -> CanchaIndex | None:
+    """
+    Construye el indice de la cancha de un mensaje. El indice queda guardado en el propio mensaje:
+    el estado del partido y la estrategia que lo indexan despues (con el mismo equipo) lo reutilizan.
 
     args:
         mensaje: Mensaje del servidor.
-        equipo_id: Identificador de tu equipo.
+        equipo_id (str): Identificador de tu equipo.
     returns:
-        List[Dict]: [{'numero': int, 'coord': Coordenada}]
+        CanchaIndex: Indice de la cancha. None si el mensaje no trae cancha.
     """
-    cancha = get_cancha(mensaje)
-    jugadores = []
+    indice = mensaje._indice
+    if indice is not None and indice.equipo_id == equipo_id:
+        return indice
 
+    cancha = get_cancha(mensaje)
     if not cancha:
-        logger.error('Error al obtener la posicion de los jugadores.')
-        return jugadores
-
-    for sector in cancha.sectores:
-        jugadores_sector = [{'numero': ocupante.numero, 'coord': Coordenada(x=sector.x, y=sector.y)} for ocupante in sector.ocupantes if ocupante.equipo_id == f'equipo:{equipo_id}']
-        jugadores.extend(jugadores_sector)
+        logger.error('Error al indexar la cancha.')
+        return None
 
-    return jugadores
+    indice = CanchaIndex(cancha, equipo_id=equipo_id)
+    if mensaje._indice is None:
+        mensaje._indice = indice                                              # Con otro equipo_id (calentar una estrategia) no se pisa el del partido
+    return indice
 
-def get_posicion_adversarios(mensaje: MensajeTienesLaPelota | MensajeReaccionar, equipo_id: str) -> List[Dict]:
+def get_posicion_jugadores(indice: CanchaIndex) -> List[Dict]:
     """
-    Obtiene las posiciones de todos los jugadores del equipo rival.
+    Obtiene las posiciones de todos los jugadores de tu equipo.
 
     args:
-        mensaje: Mensaje del servidor.
-        equipo_id: Identificador de tu equipo.
+        indice (CanchaIndex): Indice de la cancha.
     returns:
         List[Dict]: [{'numero': int, 'coord': Coordenada}]
     """
-    cancha = get_cancha(mensaje)
-    adversarios = []
+    return [{'numero': numero, 'coord': coord} for numero, coord in indice.jugadores.items()]
 
-    if not cancha:
-        logger.error('Error al obtener la posicion de los adversarios.')
-        return adversarios
-
-    for sector in cancha.sectores:
-        adversarios_sector = [{'numero': ocupante.numero, 'coord': Coordenada(x=sector.x, y=sector.y)} for ocupante in sector.ocupantes if ocupante.equipo_id != f'equipo:{equipo_id}']
-        adversarios.extend(adversarios_sector)
+def get_posicion_adversarios(indice: CanchaIndex) -> List[Dict]:
+    """
+    Obtiene las posiciones de todos los jugadores del equipo rival.
 
-    return adversarios
+    args:
+        indice (CanchaIndex): Indice de la cancha.
+    returns:
+        List[Dict]: [{'numero': int, 'coord': Coordenada}]
+    """
+    return [{'numero': numero, 'coord': coord} for numero, coord in indice.adversarios.items()]
 
-def get_posicion(mensaje: MensajeTienesLaPelota | MensajeReaccionar, equipo_id: str, n_jugador: int, es_adversario: bool) -> Coordenada | None:
+def get_posicion(indice: CanchaIndex, n_jugador: int, es_adversario: bool) -> Coordenada | None:
     """
     Obtiene la posicion de un jugador/adversario particular. En caso de no encontrarlo devuelve None
 
     args:
-        args:
-        mensaje: Mensaje del servidor.
-        equipo_id (str): Identificador de tu equipo.
+        indice (CanchaIndex): Indice de la cancha.
         n_jugador (int): Identificador del jugador.
         es_adversario (bool): Flag para indicar de que equipo es el jugador.
     returns:
         Coordenada: Posicion del jugador/adversario.
     """
     if es_adversario:
-        posiciones = get_posicion_adversarios(mensaje, equipo_id=equipo_id)
-    else:
-        posiciones = get_posicion_jugadores(mensaje, equipo_id=equipo_id)
-
-    for jugador in posiciones:
-        if jugador['numero'] == n_jugador:
-            return jugador['coord']
-    
-    return None
+        return indice.adversarios.get(n_jugador)
+    return indice.jugadores.get(n_jugador)
 
-def get_posicion_arco(mensaje: MensajeTienesLaPelota | MensajeReaccionar, equipo_id: str, es_adversario: bool) -> Coordenada | None:
+def get_posicion_arco(indice: CanchaIndex, es_adversario: bool) -> Coordenada:
     """
     Devuelve la posicion central del arco.
 
     args:
-        mensaje: Mensaje del servidor.
-        equipo_id (str): Identificador de tu equipo.
+        indice (CanchaIndex): Indice de la cancha.
         es_adversario (bool): Flag para indicar de que equipo se busca el arco.
     returns:
         Coordenada: Posicion central del arco.
     """
+    if es_adversario:
+        return indice.arco_rival[1]
+    return indice.arco_propio[1]
 
-    cancha = get_cancha(mensaje)
-
-    if not cancha:
-        logger.error(f'Error al obtener el arco. Mensaje: {mensaje}')
-        return None
-    
-    if es_adversario and cancha.equipo1.id != f'equipo:{equipo_id}':
-        return cancha.equipo1.arco[1]
-    else:
-        return cancha.equipo2.arco[1]
-
-def get_ubicacion_pelota(mensaje: MensajeReaccionar) -> Tuple[Coordenada, int] | None:
+def get_ubicacion_pelota(indice: CanchaIndex) -> Tuple[Coordenada, int]:
     """
-    Obtiene la ubicacion de la pelota a partir de un mensaje.
+    Obtiene la ubicacion de la pelota a partir del indice de la cancha.
     Tambien devuelve el jugador que la posee en caso de corresponder.
     En caso que no la tenga ningun jugador ni este en la posicion UbicacionPelota se asume que esta en el aire.
 
     args:
-        mensaje (MensajeReaccionar): Mensaje del servidor.
+        indice (CanchaIndex): Indice de la cancha.
     returns:
         Tuple[Coordenada, int]: Coordenada y numero del jugador que tiene la pelota.
-        None: En caso de que se produzca algun error o no se encuentre la pelota se devuelve None.
     """
-    cancha = get_cancha(mensaje)
-        
-    if not cancha:
-        logger.error(f'Error al obtener la posicion de la pelota. Mensaje: {mensaje}')
-        return (None, None)
-    
-    if cancha.ubicacion_pelota.esta_la_pelota == True:
-        return (Coordenada(x=cancha.ubicacion_pelota.x, y=cancha.ubicacion_pelota.y), None)
-
-   # Si la pelota no esta en el suelo la debe tener algun jugador 
-    for sector in cancha.sectores:
-        for ocupante in sector.ocupantes:
-            if ocupante.tiene_la_pelota == True:
-                return (Coordenada(x=sector.x, y=sector.y), ocupante.numero)
-                
-    # Valor por default en caso de no encontrar la pelota
-    logger.info(f'Pelota en el aire.')
-    return (Coordenada(x=cancha.ubicacion_pelota.x, y=cancha.ubicacion_pelota.y), None)
+    return (indice.pelota, indice.poseedor)
 
 def distancia(coord1: Coordenada, coord2: Coordenada):
+    # Dentro de la cancha la distancia sale de la tabla precalculada
+    if en_cancha(coord1.x, coord1.y) and en_cancha(coord2.x, coord2.y):
+        return EUCLIDEA.item(sector_id(coord1.x, coord1.y), sector_id(coord2.x, coord2.y))
     return sqrt((coord1.x - coord2.x)**2 + (coord1.y - coord2.y)**2)
 
-def jugador_mas_cercano_posicion(mensaje: MensajeReaccionar | MensajeTienesLaPelota, equipo_id: str, coord: Coordenada) -> int | None:
+def jugador_mas_cercano_posicion(indice: CanchaIndex, coord: Coordenada) -> int | None:
     """
     Obtiene al jugador mas cercano a una posicion utilizando la distancia euclidiana.
 
     args:
-        mensaje: Mensaje del servidor.
-        equipo_id (str): Identificador de tu equipo.
+        indice (CanchaIndex): Indice de la cancha.
         coord (Coordenada): Posicion.
 
     returns:
         int: Numero del jugador mas cercano.
     """
-    posiciones = get_posicion_jugadores(mensaje, equipo_id=equipo_id)
-
-    if len(posiciones) == 0:
+    if len(indice.jugadores) == 0:
         logger.error('Error al obtener el jugador mas cercano.')
         return None
-    
-    distancias = {jugador['numero']: distancia(coord1=jugador['coord'], coord2=coord) for jugador in posiciones}
-
-    # Esto obtiene el primer jugador que encuentre con la menor distancia
-    jugador = min(distancias, key=distancias.get)
 
-    return jugador
+    # Ante un empate devuelve el primer jugador que encuentre con la menor distancia
+    return indice.grilla.mas_cercano(coord.x, coord.y)
     
-def jugador_mas_cercano_adversario(mensaje: MensajeReaccionar | MensajeTienesLaPelota, equipo_id: str, adversario: int) -> int:
+def jugador_mas_cercano_adversario(indice: CanchaIndex, adversario: int) -> int | None:
     """
     Obtiene al jugador mas cercano a un adversario utilizando la distancia euclidiana.
 
     args:
-        mensaje: Mensaje del servidor.
-        equipo_id (str): Identificador de tu equipo.
+        indice (CanchaIndex): Indice de la cancha.
         adversario (int): Numero del adversario.
 
     returns:
         int: Numero del jugador mas cercano.
     """
-    posicion_rival = get_posicion(mensaje, equipo_id=equipo_id, n_jugador=adversario, es_adversario=True)
+    posicion_rival = get_posicion(indice, n_jugador=adversario, es_adversario=True)
 
     if posicion_rival is None:
         return None
     
-    return jugador_mas_cercano_posicion(mensaje=mensaje, equipo_id=equipo_id, coord=posicion_rival)
+    return jugador_mas_cercano_posicion(indice, coord=posicion_rival)
 
-def buscar_pelota(token: str, mensaje: MensajeReaccionar, equipo_id: str) -> MensajeCorrer | MensajeMarcarAdversario:
+def buscar_pelota(codificador: CodificadorAcciones, mensaje: MensajeReaccionar, equipo_id: str) -> str:
 
-    coord, adversario = get_ubicacion_pelota(mensaje)
+    indice = indexar_cancha(mensaje, equipo_id=equipo_id)
+    coord, adversario = get_ubicacion_pelota(indice) if indice else (None, None)
 
     if adversario:
-        jugador = jugador_mas_cercano_adversario(mensaje, equipo_id=equipo_id, adversario=adversario)
-        logger.info(f'Jugador mas cercano {jugador}')
-        return marcar_adversario(token, jugador=jugador, adversario=adversario)  
+        jugador = jugador_mas_cercano_adversario(indice, adversario=adversario)
+        logger.info('Jugador mas cercano %s', jugador)
+        return codificador.marcar_adversario(jugador=jugador, adversario=adversario)
     
     elif coord:
-        jugador = jugador_mas_cercano_posicion(mensaje, equipo_id=equipo_id, coord=coord)
-        logger.info(f'Jugador mas cercano {jugador}')
-        return correr(token, datos={"movimientos": [
+        jugador = jugador_mas_cercano_posicion(indice, coord=coord)
+        logger.info('Jugador mas cercano %s', jugador)
+        return codificador.correr([
             Movimiento(jugador_numero=jugador,
                        x=coord.x,
                        y=coord.y)
-        ]})
+        ])
     
     else:
-        logger.error(f'Error al buscar pelota. Mensaje: {mensaje}')
-        return correr(token, datos={"movimientos": [
+        logger.error('Error al buscar pelota. Mensaje: %s', mensaje)
+        return codificador.correr([
             Movimiento(jugador_numero=3,
                        x=1,
                        y=1)
-        ]})
+        ])
     
-def patear_al_arco(token: str, mensaje: MensajeTienesLaPelota, equipo_id: str):
+def patear_al_arco(codificador: CodificadorAcciones, mensaje: MensajeTienesLaPelota, equipo_id: str) -> str:
 
-    coordenada_arco = get_posicion_arco(mensaje, equipo_id=equipo_id, es_adversario=True)
+    indice = indexar_cancha(mensaje, equipo_id=equipo_id)
 
-    if coordenada_arco:
-        return patear(token, coord=coordenada_arco)
+    if indice:
+        coordenada_arco = get_posicion_arco(indice, es_adversario=True)
+        return codificador.patear(coordenada_arco.x, coordenada_arco.y)
     else:
-        logger.error(f'Error al encontrar la coordenada del arco. Mensaje: {mensaje}')
-        return patear(token, coord=Coordenada(x=10, y=10))
-
-
-
-
+        logger.error('Error al encontrar la coordenada del arco. Mensaje: %s', mensaje)
+        return codificador.patear(10, 10)